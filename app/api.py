@@ -1,11 +1,17 @@
+import codecs
 import io
 import json
 import logging
 import os
-from flask import Flask, request, jsonify, send_file
+from typing import Dict, Optional
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
-from app.core import Qwen3TTSInnoFrance
-import soundfile as sf
+from app.engine_pool import get_pool
+from app.engine_registry import get_engine, registry as engine_registry
+from app.metrics import instrument_flask, metrics_response
+from app.sinks import WavStreamSink
+from app.tracing import trace_flask
+from app.utterance_cache import response_headers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,30 +19,37 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+instrument_flask(app)
+trace_flask(app)
 
-# Initialize TTS engine
+# TTS engine, shared with the other front ends through app.engine_registry
 tts_engine = None
 
 def init_tts_engine():
     """Initialize TTS engine"""
     global tts_engine
     if tts_engine is None:
-        device = os.environ.get("DEVICE", "cuda:0")
-        tts_engine = Qwen3TTSInnoFrance(device=device)
-        logger.info("TTS engine initialized")
+        tts_engine = get_engine()
 
+def _renderer():
+    """Return what renders requests: the engine pool if configured, else the in-process engine"""
+    pool = get_pool()
+    if pool is not None:
+        return pool
+    init_tts_engine()
+    return tts_engine
 
-def _to_wav_response(audio_data, sample_rate, filename: str):
-    wav_buffer = io.BytesIO()
-    sf.write(wav_buffer, audio_data, sample_rate, format="WAV")
-    wav_buffer.seek(0)
+
+def _to_wav_response(wav_stream: io.BytesIO, filename: str, headers: Optional[Dict[str, str]] = None):
     safe_name = os.path.basename(filename) if filename else "output.wav"
-    return send_file(
-        wav_buffer,
+    response = send_file(
+        wav_stream,
         mimetype="audio/wav",
         as_attachment=True,
         download_name=safe_name,
     )
+    response.headers.update(headers or {})
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -44,14 +57,22 @@ def health_check():
     logger.info("Health check requested")
     return jsonify({"status": "healthy", "service": "qwen3-tts-inno-france"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    content, content_type = metrics_response()
+    return Response(content, mimetype=content_type)
+
+@app.route('/status', methods=['GET'])
+def engine_status():
+    """Engines loaded in this process and their memory"""
+    return jsonify(engine_registry.stats())
+
 @app.route('/voice-design', methods=['POST'])
 def voice_design():
     """Voice design endpoint"""
     try:
         logger.info("Voice design request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         # Get request data
         data = request.get_json(silent=True) or {}
         
@@ -68,16 +89,17 @@ def voice_design():
             logger.warning("Missing required parameters: text, language, instruct")
             return jsonify({"error": "Missing required parameters: text, language, instruct"}), 400
         
-        # Execute voice design in memory
-        audio_data, sample_rate = tts_engine.voice_design_cli_in_memory(
+        # Render straight into the response body
+        wav_stream = _renderer().render_voice_design(
             text=text,
             language=language,
             instruct=instruct,
+            sink=WavStreamSink(),
             speed=speed
         )
 
         logger.info("Voice design completed, returning audio data")
-        return _to_wav_response(audio_data, sample_rate, output_path)
+        return _to_wav_response(wav_stream, output_path)
         
     except Exception as e:
         logger.error(f"Voice design error: {str(e)}")
@@ -88,9 +110,6 @@ def voice_design_file():
     """Voice design via file endpoint"""
     try:
         logger.info("Voice design file request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         # Check if file is uploaded
         if 'config' not in request.files:
             logger.warning("Missing configuration file")
@@ -116,16 +135,17 @@ def voice_design_file():
             logger.warning("Missing required parameters in config: text, language, instruct")
             return jsonify({"error": "Missing required parameters: text, language, instruct"}), 400
 
-        audio_data, sample_rate = tts_engine.voice_design_cli_in_memory(
+        wav_stream = _renderer().render_voice_design(
             text=text,
             language=language,
             instruct=instruct,
+            sink=WavStreamSink(),
             speed=config.get("speed", 1.0),
         )
 
         output_path = config.get("output_path", "output_voice_design.wav")
         logger.info("Voice design file processing completed, returning audio data")
-        return _to_wav_response(audio_data, sample_rate, output_path)
+        return _to_wav_response(wav_stream, output_path)
         
     except Exception as e:
         logger.error(f"Voice design file error: {str(e)}")
@@ -136,9 +156,6 @@ def voice_clone():
     """Voice cloning endpoint"""
     try:
         logger.info("Voice cloning request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         # Get request data
         data = request.get_json(silent=True) or {}
         
@@ -162,15 +179,18 @@ def voice_clone():
                 logger.warning("Invalid speaker_configs JSON format")
                 return jsonify({"error": "Invalid speaker_configs JSON format"}), 400
 
-        # Execute voice cloning in memory
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
+        # Render straight into the response body
+        report = {}
+        wav_stream = _renderer().render_voice_clone(
             text=text,
             speaker_configs=speaker_configs,
-            speed=speed
+            sink=WavStreamSink(),
+            speed=speed,
+            report=report
         )
 
         logger.info("Voice cloning completed, returning audio data")
-        return _to_wav_response(audio_data, sample_rate, output_path)
+        return _to_wav_response(wav_stream, output_path, response_headers(report.get("utterance_cache")))
         
     except Exception as e:
         logger.error(f"Voice cloning error: {str(e)}")
@@ -181,9 +201,6 @@ def voice_clone_files():
     """Voice cloning via files endpoint"""
     try:
         logger.info("Voice cloning files request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         # Check required files
         if 'text_file' not in request.files or 'speakers_config' not in request.files:
             logger.warning("Missing required files: text_file or speakers_config")
@@ -196,7 +213,8 @@ def voice_clone_files():
             logger.warning("No file selected")
             return jsonify({"error": "No file selected"}), 400
             
-        text = text_file.read().decode('utf-8')
+        # The script is parsed line by line from the upload
+        script_lines = codecs.iterdecode(text_file.stream, 'utf-8')
         try:
             speaker_configs = json.loads(speakers_file.read().decode('utf-8'))
         except json.JSONDecodeError:
@@ -208,14 +226,17 @@ def voice_clone_files():
         speed = float(request.form.get('speed', 1.0))
 
         logger.info(f"Processing voice cloning with {len(speaker_configs)} speakers")
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
-            text=text,
+        report = {}
+        wav_stream = _renderer().render_voice_clone(
+            text=script_lines,
             speaker_configs=speaker_configs,
-            speed=speed
+            sink=WavStreamSink(),
+            speed=speed,
+            report=report
         )
 
         logger.info("Voice cloning files processing completed, returning audio data")
-        return _to_wav_response(audio_data, sample_rate, output_path)
+        return _to_wav_response(wav_stream, output_path, response_headers(report.get("utterance_cache")))
         
     except Exception as e:
         logger.error(f"Voice cloning files error: {str(e)}")
@@ -1,12 +1,21 @@
+import codecs
 import io
 import json
 import logging
 import os
-import tempfile
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from fastapi.responses import StreamingResponse
-from app.core import Qwen3TTSInnoFrance
-import soundfile as sf
+from typing import Dict, Optional
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.concurrency import endpoint_classes, get_limiter, render_request, run_request
+from app.engine_pool import get_pool
+from app.engine_registry import get_engine, registry as engine_registry
+from app.jobs import DONE, TOKEN_RESULT_SUFFIX, JobRunner, JobStore, decode_token_result, job_status
+from app.metrics import track_job_runner
+from app.planner import plan_settings_from_env, plan_voice_clone
+from app.sinks import WavStreamSink
+from app.utterance_cache import response_headers
+from app.warmup import Warmup
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,16 +23,48 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize TTS engine
+# TTS engine, shared with the other front ends through app.engine_registry
 tts_engine = None
 
+# Started with the service (see app.main), gates the readiness endpoint
+warmup = Warmup.from_env()
+
+# Optional out-of-process engine replicas, each warmed up in its own process (see app.engine_pool)
+engine_pool = get_pool()
+
 def init_tts_engine():
     """Initialize TTS engine"""
     global tts_engine
     if tts_engine is None:
-        device = os.environ.get("DEVICE", "cuda:0")
-        tts_engine = Qwen3TTSInnoFrance(device=device)
-        logger.info("TTS engine initialized")
+        tts_engine = get_engine()
+    return tts_engine
+
+def _renderer():
+    """Return what renders requests: the engine pool if configured, else the in-process engine"""
+    return engine_pool if engine_pool is not None else init_tts_engine()
+
+# Asynchronous render jobs, enabled by JOBS_DIR and started with the service (see app.main)
+job_runner = None
+if os.environ.get("JOBS_DIR"):
+    job_runner = JobRunner(
+        JobStore(os.environ["JOBS_DIR"]),
+        _renderer,
+        workers=int(os.environ.get("JOB_WORKERS", "1")),
+        ttl=float(os.environ.get("JOB_TTL_SECONDS", "86400")),
+        priority_class=endpoint_classes["jobs"],
+        result_format=os.environ.get("JOB_RESULT_FORMAT", "wav").lower(),
+        max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+    )
+    track_job_runner(job_runner)
+
+def _wav_response(stream: io.BytesIO, filename: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Return WAV bytes rendered into a stream as an attachment"""
+    # BytesIO.getvalue() hands over its buffer without copying when no views are held
+    return Response(
+        content=stream.getvalue(),
+        media_type='audio/wav',
+        headers={"Content-Disposition": f"attachment; filename={filename}", **(headers or {})}
+    )
 
 @router.get('/health')
 async def health_check():
@@ -31,8 +72,74 @@ async def health_check():
     logger.info("Health check requested")
     return {"status": "healthy", "service": "qwen3-tts-inno-france"}
 
+@router.get('/ready')
+async def readiness_check():
+    """Readiness endpoint: 503 until the startup warmup (or every pool replica) has finished"""
+    if engine_pool is not None:
+        ready = engine_pool.ready
+        return JSONResponse({"ready": ready, **engine_pool.stats()}, status_code=200 if ready else 503)
+    engine = engine_registry.peek()
+    body = {
+        "ready": warmup.ready,
+        "warmup": warmup.status(),
+        "models": engine.models.stats()["models"] if engine is not None else {},
+        # Requests waiting for the inference executor, which every render goes through
+        "queue_depth": get_limiter().stats()["queue_depth"],
+    }
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
+
+@router.get('/scheduler')
+async def scheduler_stats():
+    """Micro-batching scheduler metrics endpoint"""
+    engine = engine_registry.peek()
+    if engine is None or engine.scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **engine.scheduler.stats()}
+
+@router.get('/inference')
+async def inference_stats():
+    """Inference executor load: renders in flight, queue depth and rejections"""
+    return get_limiter().stats()
+
+@router.get('/priority')
+async def priority_stats():
+    """Priority scheduler metrics: waiting requests, preemptions and queue wait histograms per class"""
+    engine = engine_registry.peek()
+    if engine is None or engine.priority is None:
+        return {"enabled": False}
+    return {"enabled": True, "endpoint_classes": endpoint_classes, **engine.priority.stats()}
+
+@router.get('/status')
+async def engine_status():
+    """Engines loaded in this process and their memory"""
+    return engine_registry.stats()
+
+@router.get('/pool')
+async def pool_stats():
+    """Engine pool replicas, their load and voice affinity metrics"""
+    if engine_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **engine_pool.stats()}
+
+@router.get('/jobs')
+async def job_stats():
+    """Render job workers and job counts by state"""
+    if job_runner is None:
+        return {"enabled": False}
+    return {"enabled": True, **job_runner.stats()}
+
+@router.get('/models')
+async def model_stats():
+    """Model residency endpoint: which models are loaded, where, and their memory"""
+    # The engine may have been created by another front end in this process
+    engine = engine_registry.peek()
+    if engine is None:
+        return {"engine_loaded": False}
+    return {"engine_loaded": True, **engine.models.stats()}
+
 @router.post('/voice-design')
 async def voice_design(
+    request: Request,
     text: str = Form(...),
     language: str = Form(...),
     instruct: str = Form(...),
@@ -42,86 +149,71 @@ async def voice_design(
     """Voice design endpoint"""
     try:
         logger.info("Voice design request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not all([text, language, instruct]):
             logger.warning("Missing required parameters: text, language, instruct")
             raise HTTPException(status_code=400, detail="Missing required parameters: text, language, instruct")
         
-        # Execute voice design in memory
-        audio_data, sample_rate = tts_engine.voice_design_cli_in_memory(
+        # Render straight into the response body
+        wav_stream = await render_request(
+            request,
+            'voice-design',
+            init_tts_engine,
+            'render_voice_design',
             text=text,
             language=language,
             instruct=instruct,
+            sink=WavStreamSink(),
             speed=speed
         )
         
         logger.info("Voice design completed, returning audio data")
-        
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
         safe_name = os.path.basename(output_filename) if output_filename else "output_voice_design.wav"
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": f"attachment; filename={safe_name}"}
-        )
+        return _wav_response(wav_stream, safe_name)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice design error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/voice-design-file')
-async def voice_design_file(config: UploadFile = File(...)):
+async def voice_design_file(request: Request, config: UploadFile = File(...)):
     """Voice design via file endpoint"""
     try:
         logger.info("Voice design file request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not config:
             logger.warning("Missing configuration file")
             raise HTTPException(status_code=400, detail="Missing configuration file")
         
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_file:
-            # Read file content
-            file_content = await config.read()
-            temp_file.write(file_content.decode('utf-8'))
-            temp_file_path = temp_file.name
+        # Parse the uploaded configuration directly, no temporary file needed
+        file_content = await config.read()
+        design_config = json.loads(file_content.decode('utf-8'))
         
-        logger.info(f"Processing voice design from file: {temp_file_path}")
-        # Execute voice design in memory
-        audio_data, sample_rate = tts_engine.voice_design_json_in_memory(temp_file_path)
-        
-        # Delete temporary file
-        os.unlink(temp_file_path)
+        logger.info("Processing voice design from config file")
+        wav_stream = await render_request(
+            request,
+            'voice-design-file',
+            init_tts_engine,
+            'render_voice_design',
+            text=design_config['text'],
+            language=design_config['language'],
+            instruct=design_config['instruct'],
+            sink=WavStreamSink(),
+            speed=design_config.get('speed', 1.0)
+        )
         
         logger.info("Voice design file processing completed, returning audio data")
+        return _wav_response(wav_stream, "output_voice_design.wav")
         
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": "attachment; filename=output_voice_design.wav"}
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice design file error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/voice-clone')
 async def voice_clone(
+    request: Request,
     text: str = Form(...),
     speaker_configs: str = Form(...),
     speed: float = Form(1.0),
@@ -130,9 +222,6 @@ async def voice_clone(
     """Voice cloning endpoint"""
     try:
         logger.info("Voice cloning request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not all([text, speaker_configs]):
             logger.warning("Missing required parameters: text, speaker_configs")
             raise HTTPException(status_code=400, detail="Missing required parameters: text, speaker_configs")
@@ -144,34 +233,71 @@ async def voice_clone(
             logger.warning("Invalid speaker_configs JSON format")
             raise HTTPException(status_code=400, detail="Invalid speaker_configs JSON format")
         
-        # Execute voice cloning in memory
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
+        # Render straight into the response body
+        report = {}
+        wav_stream = await render_request(
+            request,
+            'voice-clone',
+            init_tts_engine,
+            'render_voice_clone',
             text=text,
             speaker_configs=speaker_configs_parsed,
-            speed=speed
+            sink=WavStreamSink(),
+            speed=speed,
+            report=report
         )
         
         logger.info("Voice cloning completed, returning audio data")
-        
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
         safe_name = os.path.basename(output_filename) if output_filename else "output_voice_clone.wav"
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": f"attachment; filename={safe_name}"}
-        )
+        return _wav_response(wav_stream, safe_name, response_headers(report.get("utterance_cache")))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice cloning error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post('/voice-clone/plan')
+async def voice_clone_plan(
+    text: str = Form(...),
+    speaker_configs: str = Form(...),
+    speed: float = Form(1.0),
+):
+    """Dry-run voice cloning endpoint returning the synthesis plan and cost estimate"""
+    try:
+        logger.info("Voice cloning plan request received")
+        
+        # Parse speaker configs
+        try:
+            speaker_configs_parsed = json.loads(speaker_configs)
+        except json.JSONDecodeError as e:
+            logger.warning("Invalid speaker_configs JSON format")
+            raise HTTPException(status_code=400, detail="Invalid speaker_configs JSON format")
+        
+        def plan():
+            # An engine in this process also knows which designed voices are cached; planning never builds one,
+            # so with an engine pool no models are loaded in the web process
+            engine = engine_registry.peek() if engine_pool is None else None
+            if engine is not None:
+                return engine.plan_voice_clone(text=text, speaker_configs=speaker_configs_parsed, speed=speed)
+            return plan_voice_clone(text, speaker_configs_parsed, speed=speed, **plan_settings_from_env())
+
+        # Checking the prompt store reads from disk, so planning stays off the event loop
+        plan = await run_in_threadpool(plan)
+        return plan.to_dict()
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.warning(f"Invalid voice cloning plan request: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Voice cloning plan error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post('/voice-clone-files')
 async def voice_clone_files(
+    request: Request,
     text_file: UploadFile = File(...),
     speakers_config: UploadFile = File(...),
     speed: float = Form(1.0),
@@ -180,59 +306,90 @@ async def voice_clone_files(
     """Voice cloning via files endpoint"""
     try:
         logger.info("Voice cloning files request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not text_file or not speakers_config:
             logger.warning("Missing required files: text_file or speakers_config")
             raise HTTPException(status_code=400, detail="Missing required files: text_file or speakers_config")
         
-        # Save uploaded files to temporary location
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.txt') as temp_text_file:
-            text_content = await text_file.read()
-            temp_text_file.write(text_content.decode('utf-8'))
-            temp_text_file_path = temp_text_file.name
-            
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_speakers_file:
-            speakers_content = await speakers_config.read()
-            temp_speakers_file.write(speakers_content.decode('utf-8'))
-            temp_speakers_file_path = temp_speakers_file.name
-        
-        # Read text content
-        with open(temp_text_file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-            
-        # Read speaker configurations
-        with open(temp_speakers_file_path, 'r', encoding='utf-8') as f:
-            speaker_configs = json.load(f)
-            
-        # Delete temporary files
-        os.unlink(temp_text_file_path)
-        os.unlink(temp_speakers_file_path)
+        # The script is parsed line by line from the upload, no temporary files needed
+        script_lines = codecs.iterdecode(text_file.file, 'utf-8')
+        speaker_configs = json.loads((await speakers_config.read()).decode('utf-8'))
         
         logger.info(f"Processing voice cloning with {len(speaker_configs)} speakers")
-        # Execute voice cloning in memory
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
-            text=text,
+        report = {}
+        wav_stream = await render_request(
+            request,
+            'voice-clone-files',
+            init_tts_engine,
+            'render_voice_clone',
+            text=script_lines,
             speaker_configs=speaker_configs,
-            speed=speed
+            sink=WavStreamSink(),
+            speed=speed,
+            report=report
         )
         
         logger.info("Voice cloning files processing completed, returning audio data")
-        
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
         safe_name = os.path.basename(output_filename) if output_filename else "output_voice_clone.wav"
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": f"attachment; filename={safe_name}"}
-        )
+        return _wav_response(wav_stream, safe_name, response_headers(report.get("utterance_cache")))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice cloning files error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+def _require_jobs() -> JobRunner:
+    if job_runner is None:
+        raise HTTPException(status_code=503, detail="Render jobs are disabled, set JOBS_DIR to enable them")
+    return job_runner
+
+@router.post('/jobs', status_code=202)
+async def create_job(
+    text: Optional[str] = Form(None),
+    speaker_configs: Optional[str] = Form(None),
+    text_file: Optional[UploadFile] = File(None),
+    speakers_config: Optional[UploadFile] = File(None),
+    speed: float = Form(1.0),
+):
+    """Queue a voice cloning render and return its job id immediately"""
+    runner = _require_jobs()
+    try:
+        if text_file is not None:
+            text = (await text_file.read()).decode('utf-8')
+        if speakers_config is not None:
+            speaker_configs = (await speakers_config.read()).decode('utf-8')
+        if not text or not speaker_configs:
+            raise HTTPException(status_code=400, detail="Missing required parameters: text or text_file, speaker_configs or speakers_config")
+        speaker_configs_parsed = json.loads(speaker_configs)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.warning("Invalid voice cloning job input")
+        raise HTTPException(status_code=400, detail="Invalid speaker configs JSON or text encoding")
+
+    job_id = runner.submit("voice_clone", {"text": text, "speaker_configs": speaker_configs_parsed, "speed": speed})
+    logger.info(f"Voice cloning job {job_id} queued")
+    return {"job_id": job_id, "state": "queued"}
+
+@router.get('/jobs/{job_id}')
+async def get_job(job_id: str):
+    """Job state, progress (chunks done out of the total) and ETA"""
+    job = _require_jobs().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+def _decode_job_result(path: str) -> io.BytesIO:
+    """Decode a token job result with the in-process engine's codec"""
+    return decode_token_result(path, init_tts_engine().token_codec)
+
+@router.get('/jobs/{job_id}/result')
+async def get_job_result(request: Request, job_id: str):
+    """Stream the audio of a finished job, decoding token results to WAV"""
+    job = _require_jobs().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["state"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['state']}" + (f": {job['error']}" if job["error"] else ""))
+    if job["result_path"].endswith(TOKEN_RESULT_SUFFIX):
+        # Decoding runs the speech tokenizer, so it waits for the engine like a job render
+        return _wav_response(await run_request(request, "jobs", _decode_job_result, job["result_path"]), f"{job_id}.wav")
+    return FileResponse(job["result_path"], media_type='audio/wav', filename=f"{job_id}.wav")
@@ -0,0 +1,181 @@
+"""
+Bounded-memory assembly of rendered audio chunks.
+
+``FileAssembler`` streams chunks straight into an open ``soundfile.SoundFile``
+so only one chunk is held at a time. ``BufferAssembler`` appends chunks to a
+preallocated float32 buffer that grows geometrically and moves to a
+memory-mapped temporary file once it passes a size threshold, so long
+renders do not have to fit in RAM.
+"""
+import logging
+import os
+import sys
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes() -> int:
+    """Return the resident set size of this process, or its peak if the current value is unavailable"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Assembler:
+    """Shared chunk bookkeeping and memory tracking"""
+
+    def __init__(self):
+        self.sample_rate: Optional[int] = None
+        self.length = 0
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+
+    def _check_sample_rate(self, sample_rate: int) -> None:
+        if self.sample_rate is None:
+            self.sample_rate = int(sample_rate)
+        elif int(sample_rate) != self.sample_rate:
+            raise ValueError(f"Chunk sample rate {sample_rate} does not match {self.sample_rate}")
+
+    def _sample_rss(self) -> None:
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return output size and the peak RSS observed while assembling"""
+        self._sample_rss()
+        return {
+            "samples": self.length,
+            "sample_rate": self.sample_rate,
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+class FileAssembler(_Assembler):
+    """Writes chunks to an audio file as they arrive"""
+
+    def __init__(self, path: Union[str, BinaryIO], subtype: Optional[str] = None, format: Optional[str] = None):
+        """
+        Initialize FileAssembler
+
+        Args:
+            path: Output file path or seekable binary stream
+            subtype: soundfile subtype (e.g. "PCM_16", "FLOAT"), format default if None
+            format: soundfile format (e.g. "WAV"), follows the extension if None; required for streams
+        """
+        super().__init__()
+        self.path = path
+        self.subtype = subtype
+        self.format = format
+        self._file: Optional[sf.SoundFile] = None
+
+    def append(self, chunk: np.ndarray, sample_rate: int) -> None:
+        """Write one mono chunk"""
+        self._check_sample_rate(sample_rate)
+        if self._file is None:
+            self._file = sf.SoundFile(self.path, mode="w", samplerate=self.sample_rate, channels=1, subtype=self.subtype, format=self.format)
+        self._file.write(np.asarray(chunk, dtype=np.float32))
+        self.length += len(chunk)
+        self._sample_rss()
+
+    def close(self) -> Union[str, BinaryIO]:
+        """Finish the file and return its path (or stream)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.path
+
+    def __enter__(self) -> "FileAssembler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BufferAssembler(_Assembler):
+    """Collects chunks in a growing float32 buffer that spills to a memory-mapped file"""
+
+    def __init__(self, initial_samples: int = 24000 * 30, spill_bytes: int = 512 * 1024 * 1024, spill_dir: Optional[str] = None):
+        """
+        Initialize BufferAssembler
+
+        Args:
+            initial_samples: Initial buffer capacity in samples
+            spill_bytes: Buffer size above which the buffer moves to a memory-mapped temp file
+            spill_dir: Directory of the temp file, system default if None
+        """
+        super().__init__()
+        self.spill_bytes = spill_bytes
+        self.spill_dir = spill_dir
+        self._buffer = np.empty(max(int(initial_samples), 1), dtype=np.float32)
+        self._spill_file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._spill_file is not None
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._buffer)
+        while capacity < needed:
+            capacity *= 2
+        nbytes = capacity * np.dtype(np.float32).itemsize
+
+        if self._spill_file is None and nbytes <= self.spill_bytes:
+            grown = np.empty(capacity, dtype=np.float32)
+            grown[:self.length] = self._buffer[:self.length]
+            self._buffer = grown
+            return
+
+        if self._spill_file is None:
+            # The file is unlinked right away and lives as long as its mapping
+            self._spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+            self._spill_file.truncate(nbytes)
+            mapped = np.memmap(self._spill_file, dtype=np.float32, mode="r+", shape=(capacity,))
+            mapped[:self.length] = self._buffer[:self.length]
+            logger.info(f"Render buffer exceeded {self.spill_bytes} bytes, spilled to a memory-mapped file")
+        else:
+            # Extend the file and remap; existing samples stay in place
+            self._buffer.flush()
+            self._spill_file.truncate(nbytes)
+            mapped = np.memmap(self._spill_file, dtype=np.float32, mode="r+", shape=(capacity,))
+        self._buffer = mapped
+
+    def append(self, chunk: np.ndarray, sample_rate: int) -> None:
+        """Append one mono chunk"""
+        self._check_sample_rate(sample_rate)
+        end = self.length + len(chunk)
+        if end > len(self._buffer):
+            self._grow(end)
+        self._buffer[self.length:end] = chunk
+        self.length = end
+        self._sample_rss()
+
+    def result(self) -> Tuple[np.ndarray, Optional[int]]:
+        """
+        Return the assembled audio without copying
+
+        Returns:
+            Tuple of (audio_data, sample_rate); audio_data is a memory-mapped array if the buffer spilled
+        """
+        return self._buffer[:self.length], self.sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["spilled"] = self.spilled
+        return stats
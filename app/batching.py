@@ -0,0 +1,39 @@
+"""
+Helpers for grouping generation work into padded batches.
+"""
+from typing import List, Sequence
+
+
+def bucket_by_length(lengths: Sequence[int], max_batch_size: int, max_length_ratio: float = 2.0) -> List[List[int]]:
+    """
+    Group item indices into length-sorted batches to minimise padding
+
+    Items are sorted by length and cut into consecutive batches of at most
+    max_batch_size. A batch is also closed early when the next item would be
+    more than max_length_ratio times longer than the shortest item in it.
+
+    Args:
+        lengths: Length of each item (e.g. text length of each chunk)
+        max_batch_size: Maximum number of items per batch
+        max_length_ratio: Maximum ratio between the longest and shortest item of a batch
+
+    Returns:
+        List of batches, each a list of indices into lengths
+    """
+    if max_batch_size < 1:
+        raise ValueError("max_batch_size must be at least 1")
+
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for index in order:
+        if current and (
+            len(current) >= max_batch_size
+            or lengths[index] > max(lengths[current[0]], 1) * max_length_ratio
+        ):
+            batches.append(current)
+            current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
@@ -5,6 +5,8 @@ from pathlib import Path
 import click
 
 from app.core import Qwen3TTSInnoFrance
+from app.planner import plan_settings_from_env, plan_voice_clone
+from app.prompt_store import VoicePromptStore
 
 
 def _build_tts(device: str, lazy_load: bool) -> Qwen3TTSInnoFrance:
@@ -28,7 +30,7 @@ def main() -> None:
     default=Path("output_voice_design.wav"),
     help="Output WAV file path",
 )
-@click.option("--speed", type=float, default=1.0, show_default=True, help="Audio speed (1.0-2.0)")
+@click.option("--speed", type=float, default=1.0, show_default=True, help="Audio speed (0.5-3.0)")
 @click.option("--device", default=os.getenv("DEVICE", "cuda:0"), show_default=True, help="Inference device")
 @click.option("--lazy-load/--no-lazy-load", default=False, show_default=True, help="Lazy model loading")
 def voice_design(text: str, language: str, instruct: str, output_path: Path, speed: float, device: str, lazy_load: bool) -> None:
@@ -106,29 +108,92 @@ def voice_design_json(config_path: Path, output_path: Path, device: str, lazy_lo
     default=Path("output_voice_clone.wav"),
     help="Output WAV file path",
 )
-@click.option("--speed", type=float, default=1.0, show_default=True, help="Audio speed (1.0-2.0)")
+@click.option("--speed", type=float, default=1.0, show_default=True, help="Audio speed (0.5-3.0)")
+@click.option("--batch-size", type=int, default=None, help="Max text chunks per batched generate call (default: $CLONE_BATCH_SIZE or 1)")
 @click.option("--device", default=os.getenv("DEVICE", "cuda:0"), show_default=True, help="Inference device")
 @click.option("--lazy-load/--no-lazy-load", default=False, show_default=True, help="Lazy model loading")
+@click.option("--dry-run", is_flag=True, default=False, help="Print the synthesis plan as JSON without loading models or rendering")
 def voice_clone(
     text_file: Path,
     speakers_config: Path,
     output_path: Path,
     speed: float,
+    batch_size: int,
     device: str,
     lazy_load: bool,
+    dry_run: bool,
 ) -> None:
     """Clone voices from text and speaker configuration."""
-    tts = _build_tts(device, lazy_load)
-    text = text_file.read_text(encoding="utf-8")
     speaker_configs = json.loads(speakers_config.read_text(encoding="utf-8"))
-    output = tts.voice_clone_with_speakers(
-        text=text,
-        speaker_configs=speaker_configs,
-        output_path=str(output_path),
-        speed=speed,
-    )
+    if dry_run:
+        # A dry run never builds an engine, so no model is loaded
+        with text_file.open("r", encoding="utf-8") as script_lines:
+            plan = plan_voice_clone(script_lines, speaker_configs, speed=speed, **plan_settings_from_env())
+        click.echo(json.dumps(plan.to_dict(), ensure_ascii=False, indent=2))
+        return
+
+    tts = _build_tts(device, lazy_load)
+    # The script is parsed line by line from the file
+    with text_file.open("r", encoding="utf-8") as script_lines:
+        report = {}
+        output = tts.voice_clone_with_speakers(
+            text=script_lines,
+            speaker_configs=speaker_configs,
+            output_path=str(output_path),
+            speed=speed,
+            batch_size=batch_size,
+            report=report,
+        )
+    cache_stats = report.get("utterance_cache")
+    if cache_stats and cache_stats["enabled"]:
+        click.echo(f"Utterance cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
     click.echo(f"Audio saved to {Path(output).resolve()}")
 
 
+@main.group("prompts")
+def prompts() -> None:
+    """Manage the persistent voice prompt store."""
+
+
+@prompts.command("build")
+@click.option(
+    "--speakers-config",
+    "speakers_config",
+    type=click.Path(exists=True, path_type=Path),
+    required=True,
+    help="Path to the speaker configuration JSON file",
+)
+@click.option("--store-dir", envvar="PROMPT_STORE_DIR", required=True, help="Prompt store directory")
+@click.option("--device", default=os.getenv("DEVICE", "cuda:0"), show_default=True, help="Inference device")
+def prompts_build(speakers_config: Path, store_dir: str, device: str) -> None:
+    """Pre-build voice clone prompts for every speaker in a configuration."""
+    tts = Qwen3TTSInnoFrance(device=device, lazy_load=True, prompt_store_dir=store_dir)
+    speaker_configs = json.loads(speakers_config.read_text(encoding="utf-8"))
+    count = tts.prebuild_voice_prompts(speaker_configs)
+    click.echo(f"Built prompts for {count} speakers in {Path(store_dir).resolve()}")
+
+
+@prompts.command("list")
+@click.option("--store-dir", envvar="PROMPT_STORE_DIR", required=True, help="Prompt store directory")
+def prompts_list(store_dir: str) -> None:
+    """List prompts in the store, most recently used first."""
+    store = VoicePromptStore(store_dir)
+    entries = store.list_entries()
+    for entry in entries:
+        ref_text = (entry.get("ref_text") or "").replace("\n", " ")
+        click.echo(f"{entry['key'][:16]}  {entry.get('size_bytes', 0):>10}  {entry.get('source', '')}  {ref_text[:40]}")
+    click.echo(f"{len(entries)} prompts, {sum(e.get('size_bytes', 0) for e in entries)} bytes")
+
+
+@prompts.command("prune")
+@click.option("--store-dir", envvar="PROMPT_STORE_DIR", required=True, help="Prompt store directory")
+@click.option("--max-bytes", type=int, required=True, help="Size budget to prune the store down to")
+def prompts_prune(store_dir: str, max_bytes: int) -> None:
+    """Evict least recently used prompts until the store fits in a size budget."""
+    store = VoicePromptStore(store_dir)
+    evicted = store.evict(max_bytes=max_bytes)
+    click.echo(f"Evicted {len(evicted)} prompts")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
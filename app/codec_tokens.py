@@ -0,0 +1,200 @@
+"""
+Compact storage of audio as speech codec tokens.
+
+The Qwen3-TTS 12 Hz speech tokenizer (``Qwen3TTSTokenizer``) represents
+audio as 12.5 frames per second of 16 codebook indices, about 400 bytes per
+second as int16, instead of 96 KB per second for 24 kHz float32 PCM.
+``SpeechTokenCodec`` encodes audio into codes and decodes them back on
+demand. Token files (``.qtc``) hold one or more records, one per chunk:
+
+    b"QTC1" then, per record:
+        uint32 sample_rate, uint32 samples, uint32 frames, uint16 quantizers,
+        frames * quantizers int16 codes (little-endian)
+
+``samples`` is the original chunk length, so decoded chunks are trimmed or
+padded back to it. Token storage is lossy (it is the model's own codec) and
+decoding costs a forward pass of the tokenizer decoder.
+"""
+import logging
+import math
+import struct
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, ContextManager, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.signal import resample_poly
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SUFFIX = ".qtc"
+
+_MAGIC = b"QTC1"
+_RECORD = struct.Struct("<IIIH")
+
+TokenRecord = Tuple[np.ndarray, int, int]  # (codes (frames, quantizers), sample_rate, samples)
+
+
+class SpeechTokenCodec:
+    """Encodes audio to speech tokenizer codes and decodes them back"""
+
+    def __init__(self, tokenizer: Union[Any, Callable[[], Any], None] = None, use: Optional[Callable[[], ContextManager[Any]]] = None):
+        """
+        Initialize SpeechTokenCodec
+
+        Args:
+            tokenizer: Qwen3TTSTokenizer (or the model's speech_tokenizer), or a
+                callable returning it so models can be loaded lazily
+            use: Instead of tokenizer, a callable returning a context manager that
+                holds the tokenizer for one call, e.g. so the engine schedules and
+                pins the model that owns it
+        """
+        if (tokenizer is None) == (use is None):
+            raise ValueError("Give either tokenizer or use")
+        self._tokenizer = tokenizer
+        self._use = use
+
+    @property
+    def tokenizer(self) -> Any:
+        if callable(getattr(self._tokenizer, "decode", None)):
+            return self._tokenizer
+        return self._tokenizer()
+
+    @contextmanager
+    def _session(self) -> Iterator[Any]:
+        if self._use is not None:
+            with self._use() as tokenizer:
+                yield tokenizer
+        else:
+            yield self.tokenizer
+
+    def encode(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        Encode mono audio into codec tokens
+
+        Args:
+            audio: Mono float audio
+            sample_rate: Sample rate of the audio
+
+        Returns:
+            int16 array of shape (frames, quantizers)
+        """
+        with self._session() as tokenizer:
+            encoded = tokenizer.encode(np.asarray(audio, dtype=np.float32), sr=int(sample_rate))
+        codes = encoded.audio_codes[0]
+        codes = codes.detach().cpu().numpy() if hasattr(codes, "detach") else np.asarray(codes)
+        if codes.ndim == 1:
+            codes = codes[:, None]
+        return codes.astype(np.int16)
+
+    def decode(self, codes: np.ndarray, samples: int, sample_rate: int) -> np.ndarray:
+        """
+        Decode codec tokens into audio of the original length and sample rate
+
+        Args:
+            codes: Array of shape (frames, quantizers)
+            samples: Length of the original audio
+            sample_rate: Sample rate of the original audio
+
+        Returns:
+            Mono float32 audio of length samples
+        """
+        with self._session() as tokenizer:
+            wavs, sr = tokenizer.decode({"audio_codes": [np.asarray(codes, dtype=np.int64)]})
+        audio = np.asarray(wavs[0], dtype=np.float32).reshape(-1)
+        if int(sr) != int(sample_rate):
+            divisor = math.gcd(int(sample_rate), int(sr))
+            audio = resample_poly(audio, int(sample_rate) // divisor, int(sr) // divisor).astype(np.float32)
+        if len(audio) >= samples:
+            return audio[:samples]
+        return np.concatenate([audio, np.zeros(samples - len(audio), dtype=np.float32)])
+
+
+def write_token_records(stream: BinaryIO, records: List[TokenRecord], header: bool = True) -> int:
+    """
+    Write token records to a binary stream
+
+    Args:
+        stream: Binary stream positioned at the start of the file, or at its end to append
+        records: List of (codes, sample_rate, samples)
+        header: Write the file magic first (False when appending)
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    if header:
+        written += stream.write(_MAGIC)
+    for codes, sample_rate, samples in records:
+        codes = np.ascontiguousarray(codes, dtype="<i2")
+        frames, quantizers = codes.shape
+        written += stream.write(_RECORD.pack(int(sample_rate), int(samples), frames, quantizers))
+        written += stream.write(codes.tobytes())
+    return written
+
+
+def iter_token_records(stream: BinaryIO) -> Iterator[TokenRecord]:
+    """
+    Read the token records of a token file one by one
+
+    Args:
+        stream: Binary stream positioned at the start of the file
+
+    Yields:
+        Tuple of (codes, sample_rate, samples)
+    """
+    if stream.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("Not a speech token file")
+    while True:
+        head = stream.read(_RECORD.size)
+        if not head:
+            return
+        if len(head) < _RECORD.size:
+            raise ValueError("Truncated speech token file")
+        sample_rate, samples, frames, quantizers = _RECORD.unpack(head)
+        data = stream.read(frames * quantizers * 2)
+        if len(data) < frames * quantizers * 2:
+            raise ValueError("Truncated speech token file")
+        yield np.frombuffer(data, dtype="<i2").reshape(frames, quantizers), sample_rate, samples
+
+
+def save_tokens(path: str, codec: SpeechTokenCodec, audio: np.ndarray, sample_rate: int) -> int:
+    """
+    Encode audio and save it as a single-record token file
+
+    Args:
+        path: Output path
+        codec: Codec used to encode the audio
+        audio: Mono float audio
+        sample_rate: Sample rate of the audio
+
+    Returns:
+        File size in bytes
+    """
+    codes = codec.encode(audio, sample_rate)
+    with open(path, "wb") as f:
+        return write_token_records(f, [(codes, sample_rate, len(audio))])
+
+
+def load_tokens(path_or_stream: Union[str, BinaryIO], codec: SpeechTokenCodec) -> Tuple[np.ndarray, int]:
+    """
+    Decode a token file back to audio
+
+    Every record is decoded separately and the chunks are concatenated.
+
+    Args:
+        path_or_stream: Token file path or binary stream
+        codec: Codec used to decode the tokens
+
+    Returns:
+        Tuple of (audio_data, sample_rate)
+    """
+    if isinstance(path_or_stream, str):
+        with open(path_or_stream, "rb") as f:
+            return load_tokens(f, codec)
+    chunks = []
+    sample_rate = None
+    for codes, sample_rate, samples in iter_token_records(path_or_stream):
+        chunks.append(codec.decode(codes, samples, sample_rate))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32), sample_rate
+    return np.concatenate(chunks), sample_rate
@@ -0,0 +1,267 @@
+"""
+Bounded inference concurrency for the async web front ends.
+
+Generation blocks for seconds to minutes, so the FastAPI handlers must not
+call the engine on the event loop. ``InferenceLimiter`` runs renders on a
+dedicated thread pool with ``concurrency`` workers and admits at most
+``max_queue`` more requests waiting for a worker. Requests beyond that are
+rejected with ``QueueFullError`` right away, which the handlers turn into a
+429 response with a ``Retry-After`` estimated from recent render durations,
+instead of piling up unbounded work. Waiting renders start in the order of
+their request priority (see app.priority): class first, then deadline, then
+arrival. A render whose deadline passes while it waits fails with
+``DeadlineExceededError`` without starting.
+
+``run_request`` and ``render_request`` are the request side shared by the
+FastAPI front ends: they run a render on the executor as a request of the
+endpoint's priority class (``endpoint_classes``) and map full queues and
+passed deadlines to 429 and 504 responses.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from app.priority import CLASSES, DeadlineExceededError, current_priority, endpoint_classes_from_env, request_priority
+from app.tracing import profiled
+
+logger = logging.getLogger(__name__)
+
+# Renders interleaved on one engine by its priority scheduler, unless INFERENCE_CONCURRENCY or
+# PRIORITY_INFERENCE_CONCURRENCY say otherwise. Model calls still run one at a time.
+DEFAULT_PRIORITY_CONCURRENCY = 4
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a render is submitted while every worker and queue slot is taken"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceLimiter:
+    """Runs blocking renders on a dedicated executor behind a bounded, priority-ordered wait queue"""
+
+    def __init__(self, concurrency: int = 1, max_queue: int = 16, retry_after: float = 5.0):
+        """
+        Initialize InferenceLimiter
+
+        Args:
+            concurrency: Renders running at the same time
+            max_queue: Renders admitted to wait for a free worker, 0 rejects whenever all workers are busy
+            retry_after: Retry-After seconds suggested before any render has finished
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._in_flight = 0
+        # Heap of (class rank, deadline, arrival, future, context, fn, args, kwargs) waiting for a worker
+        self._waiting = []
+        self._arrivals = itertools.count()
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # Exponentially weighted average render duration in seconds
+        self._avg_seconds: Optional[float] = None
+
+    def _retry_after(self) -> int:
+        # Time until the queue ahead of a new request has drained through the workers
+        per_render = self._avg_seconds if self._avg_seconds is not None else self.retry_after
+        waiting = self._admitted - self._in_flight
+        return max(1, math.ceil((waiting + 1) / self.concurrency * per_render))
+
+    def _call(self, future: Future, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            future.set_exception(e)
+        else:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+            future.set_result(result)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start the most urgent waiting renders while workers are free"""
+        while True:
+            with self._lock:
+                if self._in_flight >= self.concurrency or not self._waiting:
+                    return
+                _, deadline, _, future, context, fn, args, kwargs = heapq.heappop(self._waiting)
+                # Cancelled while waiting, its slot was already released
+                if not future.set_running_or_notify_cancel():
+                    continue
+                expired = deadline < time.monotonic()
+                if not expired:
+                    self._in_flight += 1
+            if expired:
+                future.set_exception(DeadlineExceededError("Request deadline passed while waiting for an inference slot"))
+                continue
+            self._executor.submit(context.run, self._call, future, fn, args, kwargs)
+
+    def _release(self, future: Future) -> None:
+        # Runs when the render finishes, fails or is cancelled before it started
+        with self._lock:
+            self._admitted -= 1
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Admit a render and queue it by the current request priority
+
+        Raises:
+            QueueFullError: When every worker is busy and the wait queue is full
+        """
+        with self._lock:
+            if self._admitted >= self.concurrency + self.max_queue:
+                self._rejected += 1
+                retry_after = self._retry_after()
+                logger.warning(f"Inference queue full ({self._admitted} admitted), rejecting request, retry in {retry_after}s")
+                raise QueueFullError(retry_after)
+            self._admitted += 1
+            priority = current_priority()
+            deadline = priority.deadline if priority.deadline is not None else math.inf
+            future: Future = Future()
+            # The render sees the caller's context variables, e.g. its request priority
+            heapq.heappush(self._waiting, (CLASSES.index(priority.priority_class), deadline, next(self._arrivals), future,
+                                           contextvars.copy_context(), fn, args, kwargs))
+        future.add_done_callback(self._release)
+        self._dispatch()
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking render without blocking the event loop
+
+        Raises:
+            QueueFullError: When every worker is busy and the wait queue is full
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": self._admitted - self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_render_seconds": round(self._avg_seconds, 3) if self._avg_seconds is not None else None,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            waiting, self._waiting = self._waiting, []
+        for item in waiting:
+            item[3].cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def engine_concurrency() -> int:
+    """Renders worth running at once on one engine: a scheduler batch, interleaved requests, or one"""
+    from app.scheduler import PROFILES
+
+    if os.environ.get("MICROBATCH_ENABLED", "false").lower() == "true":
+        if os.environ.get("MICROBATCH_MAX_BATCH_SIZE"):
+            return int(os.environ["MICROBATCH_MAX_BATCH_SIZE"])
+        return PROFILES.get(os.environ.get("MICROBATCH_PROFILE", "latency"), PROFILES["latency"])["max_batch_size"]
+    if os.environ.get("PRIORITY_SCHEDULING", "true").lower() == "true":
+        # Model calls still run one at a time, the priority scheduler picks whose call is next
+        return int(os.environ.get("PRIORITY_INFERENCE_CONCURRENCY", str(DEFAULT_PRIORITY_CONCURRENCY)))
+    return 1
+
+
+def default_concurrency() -> int:
+    """Renders worth running at once: engine_concurrency() on each pool replica, or on the in-process engine"""
+    from app.engine_pool import replica_specs_from_env
+
+    return engine_concurrency() * max(1, len(replica_specs_from_env()))
+
+
+_limiter: Optional[InferenceLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> InferenceLimiter:
+    """Return the process-wide limiter shared by the API and web app, configured by the environment"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            concurrency = os.environ.get("INFERENCE_CONCURRENCY")
+            _limiter = InferenceLimiter(
+                concurrency=int(concurrency) if concurrency else default_concurrency(),
+                max_queue=int(os.environ.get("INFERENCE_MAX_QUEUE", "16")),
+                retry_after=float(os.environ.get("INFERENCE_RETRY_AFTER", "5")),
+            )
+            logger.info(f"Inference limiter: {_limiter.concurrency} concurrent renders, {_limiter.max_queue} queued")
+        return _limiter
+
+
+# Priority class of each render endpoint
+endpoint_classes = endpoint_classes_from_env()
+
+
+async def run_request(request: Request, endpoint: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking call on the inference executor as a request of the endpoint's priority class
+
+    Fair share is per client (X-Client-Id header, else the client address). An
+    X-Request-Timeout header in seconds sets a deadline for getting engine turns.
+    Full queues return 429 with Retry-After, a passed deadline returns 504.
+    """
+    client = request.headers.get("X-Client-Id") or (request.client.host if request.client else "")
+    try:
+        timeout = float(request.headers.get("X-Request-Timeout") or 0) or None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
+    try:
+        with request_priority(endpoint_classes[endpoint], client=client, timeout=timeout):
+            return await get_limiter().run(profiled, lambda: fn(*args, **kwargs))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+async def render_request(request: Request, endpoint: str, engine: Callable[[], Any], method: str, **kwargs) -> Any:
+    """
+    Run a render method of the engine pool, if configured, else of the in-process engine, see run_request
+
+    Args:
+        request: HTTP request, for its client and timeout headers
+        endpoint: Endpoint name, picks the priority class
+        engine: Callable returning the front end's in-process engine
+        method: Render method name, e.g. "render_voice_clone"
+        **kwargs: Render method arguments
+    """
+    from app.engine_pool import get_pool
+
+    def render():
+        # The renderer is resolved on the executor too, so a first-use engine load never blocks the event loop
+        pool = get_pool()
+        return getattr(pool if pool is not None else engine(), method)(**kwargs)
+
+    return await run_request(request, endpoint, render)
@@ -1,13 +1,36 @@
 import torch
 import soundfile as sf
 import os
+import io
+import asyncio
+import functools
+import math
+import threading
+import time
+import base64
 import logging
-from typing import List, Dict, Tuple, Union
+import urllib.request
+from contextlib import closing, contextmanager, nullcontext
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from qwen_tts import Qwen3TTSModel
 import numpy as np
 import json
 import re
-from scipy.signal import resample
+from scipy.signal import resample_poly
+from app.prompt_cache import VoicePromptCache, hash_reference_audio, hash_voice_design
+from app.prompt_store import VoicePromptStore
+from app.batching import bucket_by_length
+from app.codec_tokens import SpeechTokenCodec
+from app.metrics import observe_generation, observe_prompt_creation
+from app.model_manager import ModelManager
+from app.pipeline import RenderPipeline
+from app.planner import DEDUP_WINDOW, SynthesisPlan, find_duplicates, plan_voice_clone, utterance_key
+from app.script_parser import SpeakerIndex, iter_script_segments
+from app.sinks import ArraySink, FileSink, RenderSink
+from app.text_splitter import split_text
+from app.timestretch import MAX_SPEED, MIN_SPEED, effective_speed, time_stretch
+from app.tracing import span
+from app.utterance_cache import UtteranceCache, hash_utterance
 
 # Configure logging
 logging.basicConfig(
@@ -16,9 +39,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Peak level of normalised chunks
+NORMALIZE_PEAK = 0.95
+
 
 class Qwen3TTSInnoFrance:
-    def __init__(self, device="cuda:0", dtype=torch.bfloat16, lazy_load=False):
+    def __init__(self, device="cuda:0", dtype=torch.bfloat16, lazy_load=False, prompt_store_dir=None):
         """
         Initialize Qwen3TTSInnoFrance class
         
@@ -26,6 +52,7 @@ class Qwen3TTSInnoFrance:
             device: Device type, default is cuda:0
             dtype: Data type, default is torch.bfloat16
             lazy_load: Whether to load models lazily, default is False
+            prompt_store_dir: Directory of the persistent prompt store, default is $PROMPT_STORE_DIR (disabled if unset)
         """
         self.device = device
         self.dtype = dtype
@@ -36,37 +63,230 @@ class Qwen3TTSInnoFrance:
         self.voice_clone_model_path = os.environ.get("VOICE_CLONE_MODEL_PATH", "Qwen/Qwen3-TTS-12Hz-1.7B-Base")
         self.attn_implementation = os.environ.get("ATTN_IMPLEMENTATION", "sdpa")
         
-        # Models will be loaded on demand if lazy_load is True
-        self.voice_design_model = None
-        self.voice_clone_model = None
+        # Each model is loaded on its first use; idle models move to CPU RAM, then out of memory (see app.model_manager)
+        self.models = ModelManager(
+            device=device,
+            device_ttl=float(os.environ["MODEL_DEVICE_TTL"]) if os.environ.get("MODEL_DEVICE_TTL") else None,
+            cpu_ttl=float(os.environ["MODEL_CPU_TTL"]) if os.environ.get("MODEL_CPU_TTL") else None,
+        )
+        self.models.register("design", functools.partial(self._load_model, "VoiceDesign", self.voice_design_model_path))
+        self.models.register("clone", functools.partial(self._load_model, "VoiceClone", self.voice_clone_model_path))
+        
+        # Voice clone prompts shared across requests, keyed by reference audio content
+        self.prompt_cache = VoicePromptCache(
+            max_entries=int(os.environ.get("PROMPT_CACHE_MAX_ENTRIES", "64")),
+            max_bytes=int(os.environ.get("PROMPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+        
+        # Designed reference voices, keyed by design text, instruction, language and seed
+        self.design_cache = VoicePromptCache(
+            max_entries=int(os.environ.get("DESIGN_CACHE_MAX_ENTRIES", "32")),
+            max_bytes=int(os.environ.get("DESIGN_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+        self.design_seed = int(os.environ.get("DESIGN_SEED", "0"))
+        
+        # Optional cross-request micro-batching scheduler (see app.scheduler)
+        self.scheduler = None
+        
+        # Optional priority and fair-share scheduler of model calls (see app.priority)
+        self.priority = None
+        
+        # Maximum number of chunks rendered per generate call (1 renders sequentially)
+        self.clone_batch_size = int(os.environ.get("CLONE_BATCH_SIZE", "1"))
+        
+        # Sampling arguments of every voice clone generate call (e.g. temperature), over the model's generate_config.json
+        self.clone_generate_kwargs = json.loads(os.environ.get("CLONE_GENERATE_KWARGS") or "{}")
+        # Seed of every voice clone generate call, None leaves sampling unseeded
+        self.clone_seed = int(os.environ["CLONE_SEED"]) if os.environ.get("CLONE_SEED") else None
+        
+        # Overlap chunk generation with CPU post-processing (see app.pipeline)
+        self.pipeline_enabled = os.environ.get("PIPELINE_ENABLED", "false").lower() == "true"
+        self.pipeline_workers = int(os.environ.get("PIPELINE_WORKERS", "2"))
+        self.pipeline_max_pending = int(os.environ.get("PIPELINE_MAX_PENDING", "4"))
+        
+        # In-memory renders larger than this move to a memory-mapped temp file
+        self.assembly_spill_bytes = int(os.environ.get("ASSEMBLY_SPILL_BYTES", str(512 * 1024 * 1024)))
+        
+        # Repeated utterances within this many chunks are rendered once (0 disables)
+        self.dedup_window = int(os.environ.get("CLONE_DEDUP_WINDOW", str(DEDUP_WINDOW)))
+        # Compute seconds per second of generated audio, used by plan_voice_clone estimates
+        self.realtime_factor = float(os.environ.get("PLAN_REALTIME_FACTOR", "1.0"))
+        
+        # Speech codec of the clone model, used for compact token storage; it schedules and pins the model like generation
+        self.token_codec = SpeechTokenCodec(use=self._use_speech_tokenizer)
+        
+        # Optional on-disk cache of rendered chunks, so re-rendering an edited script only generates changed lines
+        utterance_cache_dir = os.environ.get("UTTERANCE_CACHE_DIR")
+        self.utterance_cache = None
+        if utterance_cache_dir:
+            # "tokens" stores speech codec tokens instead of float WAV (see app.codec_tokens)
+            cache_format = os.environ.get("UTTERANCE_CACHE_FORMAT", "wav").lower()
+            self.utterance_cache = UtteranceCache(
+                utterance_cache_dir,
+                max_bytes=int(os.environ.get("UTTERANCE_CACHE_MAX_BYTES", str(4 * 1024 * 1024 * 1024))),
+                codec=self.token_codec if cache_format == "tokens" else None,
+            )
+            logger.info(f"Using utterance cache at {utterance_cache_dir}")
+        
+        # Optional on-disk prompt store shared by all workers and restarts
+        prompt_store_dir = prompt_store_dir or os.environ.get("PROMPT_STORE_DIR")
+        self.prompt_store = None
+        if prompt_store_dir:
+            self.prompt_store = VoicePromptStore(
+                prompt_store_dir,
+                max_bytes=int(os.environ.get("PROMPT_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024))),
+            )
+            logger.info(f"Using persistent prompt store at {prompt_store_dir}")
         
         # Load models immediately if not lazy loading
         if not self.lazy_load:
             self._load_models()
         else:
-            logger.info("Lazy loading enabled. Models will be loaded on demand.")
+            logger.info("Lazy loading enabled. Each model will be loaded on its first use.")
+        self.models.start()
+    
+    def _load_model(self, kind: str, model_path: str):
+        """Load one Qwen3-TTS model onto the device"""
+        logger.info(f"Loading {kind} model from {model_path}")
+        return Qwen3TTSModel.from_pretrained(
+            model_path,
+            device_map=self.device,
+            dtype=self.dtype,
+            attn_implementation=self.attn_implementation,
+        )
     
     def _load_models(self):
         """Load models if not already loaded"""
-        if self.voice_design_model is None:
-            logger.info(f"Loading VoiceDesign model from {self.voice_design_model_path}")
-            self.voice_design_model = Qwen3TTSModel.from_pretrained(
-                self.voice_design_model_path,
-                device_map=self.device,
-                dtype=self.dtype,
-                attn_implementation=self.attn_implementation,
+        self.models.get("design")
+        self.models.get("clone")
+        logger.info("Models loaded successfully")
+
+    @property
+    def voice_design_model(self):
+        """VoiceDesign model, loaded or moved back to the device on access"""
+        return self.models.get("design")
+
+    @voice_design_model.setter
+    def voice_design_model(self, model):
+        self.models.set("design", model)
+
+    @property
+    def voice_clone_model(self):
+        """VoiceClone (Base) model, loaded or moved back to the device on access"""
+        return self.models.get("clone")
+
+    @voice_clone_model.setter
+    def voice_clone_model(self, model):
+        self.models.set("clone", model)
+
+    @contextmanager
+    def _use_speech_tokenizer(self):
+        """Hold an engine turn and the voice clone model for one call of its speech tokenizer"""
+        with self._use_model("clone") as model:
+            yield model.model.speech_tokenizer
+
+    @contextmanager
+    def _use_model(self, kind: str):
+        """Hold an engine turn, when a priority scheduler is attached, and the model for one call"""
+        priority = getattr(self, "priority", None)
+        with priority.turn() if priority is not None else nullcontext():
+            with self.models.use(kind) as model:
+                yield model
+
+    def generate_design_batch(self, texts: List[str], languages: List[str], instructs: List[str]) -> Tuple[List[np.ndarray], int]:
+        """
+        Run one batched voice design generation
+        
+        Args:
+            texts: Texts to synthesize
+            languages: Language of each text
+            instructs: Voice description instruction of each text
+            
+        Returns:
+            (List of audio data, sample_rate)
+        """
+        with self._use_model("design") as model, span("generate"):
+            started = time.perf_counter()
+            wavs, sr = model.generate_voice_design(
+                text=texts,
+                language=languages,
+                instruct=instructs,
             )
+        observe_generation("design", texts, languages, wavs, sr, time.perf_counter() - started)
+        return wavs, sr
+
+    def generate_clone_batch(self, texts: List[str], languages: List[str], voice_clone_prompts: List) -> Tuple[List[np.ndarray], int]:
+        """
+        Run one batched voice clone generation
+        
+        Args:
+            texts: Texts to synthesize
+            languages: Language of each text
+            voice_clone_prompts: Voice clone prompt of each text
             
-        if self.voice_clone_model is None:
-            logger.info(f"Loading VoiceClone model from {self.voice_clone_model_path}")
-            self.voice_clone_model = Qwen3TTSModel.from_pretrained(
-                self.voice_clone_model_path,
-                device_map=self.device,
-                dtype=self.dtype,
-                attn_implementation=self.attn_implementation,
+        Returns:
+            (List of audio data, sample_rate)
+        """
+        with self._use_model("clone") as model, self._seeded(self.clone_seed), span("generate"):
+            started = time.perf_counter()
+            wavs, sr = model.generate_voice_clone(
+                text=texts,
+                language=languages,
+                # One prompt item per text
+                voice_clone_prompt=[item for prompt in voice_clone_prompts for item in prompt],
+                **self.clone_generate_kwargs,
             )
+        observe_generation("clone", texts, languages, wavs, sr, time.perf_counter() - started)
+        return wavs, sr
+
+    def _use_scheduler(self) -> bool:
+        """Whether generation should go through the cross-request micro-batching scheduler"""
+        scheduler = getattr(self, "scheduler", None)
+        return scheduler is not None and not scheduler.on_scheduler_thread()
+
+    def _generate_voice_design(self, text: str, language: str, instruct: str) -> Tuple[List[np.ndarray], int]:
+        """Generate one voice design, merged with concurrent requests when a scheduler is attached"""
+        if self._use_scheduler():
+            wav, sr = self.scheduler.submit_design(text, language, instruct).result()
+            return [wav], sr
+        return self.generate_design_batch([text], [language], [instruct])
+
+    def render_voice_design(self, text: str, language: str, instruct: str, sink: RenderSink, speed: float = 1.0) -> Any:
+        """
+        Voice design written into a render sink
+        
+        Args:
+            text: Text to synthesize
+            language: Language
+            instruct: Voice description instruction
+            sink: Destination of the audio (file, array, WAV stream, shared memory)
+            speed: Audio playback speed, range 0.5-3.0
             
-        logger.info("Models loaded successfully")
+        Returns:
+            Result of sink.close() (e.g. output path, (audio_data, sample_rate), WAV stream)
+        """
+        logger.info(f"Starting voice design for text: {text[:50]}...")
+        try:
+            wavs, sr = self._generate_voice_design(text, language, instruct)
+            
+            # Adjust audio speed
+            if speed != 1.0:
+                logger.info(f"Adjusting audio speed to {speed}x")
+                wavs[0] = self._adjust_audio_speed(wavs[0], speed, sr)
+            
+            with span("write"):
+                sink.write(wavs[0], sr)
+        except BaseException:
+            sink.abort()
+            raise
+        with span("encode"):
+            return sink.close()
+
+    def _load_design_config(self, config_path: str) -> Dict:
+        """Load a voice design JSON configuration file"""
+        logger.info(f"Loading voice design configuration from {config_path}")
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
 
     def voice_design_cli(self, text: str, language: str, instruct: str, output_path: str = "output_voice_design.wav", speed: float = 1.0) -> str:
         """
@@ -77,30 +297,15 @@ class Qwen3TTSInnoFrance:
             language: Language
             instruct: Voice description instruction
             output_path: Output file path
-            speed: Audio playback speed, range 1.0-2.0
+            speed: Audio playback speed, range 0.5-3.0
             
         Returns:
             Output file path
         """
-        # Load models if lazy loading is enabled
-        if self.lazy_load:
-            self._load_models()
-            
-        logger.info(f"Starting voice design for text: {text[:50]}...")
-        wavs, sr = self.voice_design_model.generate_voice_design(
-            text=text,
-            language=language,
-            instruct=instruct,
-        )
-        
-        # Adjust audio speed
-        if speed != 1.0:
-            logger.info(f"Adjusting audio speed to {speed}x")
-            wavs[0] = self._adjust_audio_speed(wavs[0], speed)
-        
-        sf.write(output_path, wavs[0], sr)
+        self.render_voice_design(text, language, instruct, FileSink(output_path), speed=speed)
         logger.info(f"Voice design completed, output file: {output_path}")
         return output_path
+
     def voice_design_cli_in_memory(self, text: str, language: str, instruct: str, speed: float = 1.0) -> Tuple[np.ndarray, int]:
         """
         Voice design via CLI parameters, returning audio data in memory
@@ -109,29 +314,14 @@ class Qwen3TTSInnoFrance:
             text: Text to synthesize
             language: Language
             instruct: Voice description instruction
-            speed: Audio playback speed, range 1.0-2.0
+            speed: Audio playback speed, range 0.5-3.0
             
         Returns:
             Tuple of (audio_data, sample_rate)
         """
-        # Load models if lazy loading is enabled
-        if self.lazy_load:
-            self._load_models()
-            
-        logger.info(f"Starting voice design for text: {text[:50]}...")
-        wavs, sr = self.voice_design_model.generate_voice_design(
-            text=text,
-            language=language,
-            instruct=instruct,
-        )
-        
-        # Adjust audio speed
-        if speed != 1.0:
-            logger.info(f"Adjusting audio speed to {speed}x")
-            wavs[0] = self._adjust_audio_speed(wavs[0], speed)
-        
+        audio_data, sr = self.render_voice_design(text, language, instruct, ArraySink(self.assembly_spill_bytes), speed=speed)
         logger.info("Voice design completed, returning audio data in memory")
-        return wavs[0], sr
+        return audio_data, sr
 
     def voice_design_json(self, config_path: str) -> str:
         """
@@ -143,31 +333,12 @@ class Qwen3TTSInnoFrance:
         Returns:
             Output file path
         """
-        logger.info(f"Loading voice design configuration from {config_path}")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        logger.info(f"Starting voice design for text: {config['text'][:50]}...")
-        # Load models if lazy loading is enabled
-        if self.lazy_load:
-            self._load_models()
-            
-        wavs, sr = self.voice_design_model.generate_voice_design(
-            text=config['text'],
-            language=config['language'],
-            instruct=config['instruct'],
-        )
-        
-        # Adjust audio speed
-        speed = config.get('speed', 1.0)
-        if speed != 1.0:
-            logger.info(f"Adjusting audio speed to {speed}x")
-            wavs[0] = self._adjust_audio_speed(wavs[0], speed)
-        
+        config = self._load_design_config(config_path)
         output_path = config.get('output_path', 'output_voice_design.json.wav')
-        sf.write(output_path, wavs[0], sr)
+        self.render_voice_design(config['text'], config['language'], config['instruct'], FileSink(output_path), speed=config.get('speed', 1.0))
         logger.info(f"Voice design completed, output file: {output_path}")
         return output_path
+
     def voice_design_json_in_memory(self, config_path: str) -> Tuple[np.ndarray, int]:
         """
         Voice design via JSON configuration file, returning audio data in memory
@@ -178,64 +349,31 @@ class Qwen3TTSInnoFrance:
         Returns:
             Tuple of (audio_data, sample_rate)
         """
-        logger.info(f"Loading voice design configuration from {config_path}")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        logger.info(f"Starting voice design for text: {config['text'][:50]}...")
-        # Load models if lazy loading is enabled
-        if self.lazy_load:
-            self._load_models()
-            
-        wavs, sr = self.voice_design_model.generate_voice_design(
-            text=config['text'],
-            language=config['language'],
-            instruct=config['instruct'],
+        config = self._load_design_config(config_path)
+        audio_data, sr = self.render_voice_design(
+            config['text'], config['language'], config['instruct'],
+            ArraySink(self.assembly_spill_bytes), speed=config.get('speed', 1.0),
         )
-        
-        # Adjust audio speed
-        speed = config.get('speed', 1.0)
-        if speed != 1.0:
-            logger.info(f"Adjusting audio speed to {speed}x")
-            wavs[0] = self._adjust_audio_speed(wavs[0], speed)
-        
         logger.info("Voice design completed, returning audio data in memory")
-        return wavs[0], sr
+        return audio_data, sr
 
     def _split_long_text(self, text: str, max_length: int = 300) -> List[str]:
         """
         Split long text into smaller chunks
         
+        Splits at sentence ends, then clauses, then whitespace, keeping every
+        chunk within max_length (see app.text_splitter)
+        
         Args:
             text: Input text
-            max_length: Maximum characters per chunk
+            max_length: Maximum weighted characters per chunk, CJK characters count triple
             
         Returns:
             List of split text chunks
         """
-        # If text length is less than or equal to max length, return directly
-        if len(text) <= max_length:
-            return [text]
-            
-        # Split text by sentences
-        sentences = re.split(r'[.!?。！？]', text)
-        
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            # If adding current sentence exceeds max length, save current chunk and start new chunk
-            if len(current_chunk) + len(sentence) > max_length and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence
-            else:
-                current_chunk += sentence + ("." if sentence != sentences[-1] else "")
-                
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-            
-        logger.info(f"Split text into {len(chunks)} chunks")
+        chunks = split_text(text, max_length)
+        if len(chunks) > 1:
+            logger.info(f"Split text into {len(chunks)} chunks")
         return chunks
 
     def _extract_speakers(self, text: str) -> Tuple[List[str], List[str]]:
@@ -269,333 +407,703 @@ class Qwen3TTSInnoFrance:
         logger.info(f"Extracted {len(speakers)} speakers: {set(speakers)}")
         return speakers, texts
 
-    def _adjust_audio_speed(self, audio: np.ndarray, speed: float) -> np.ndarray:
+    def _check_speed(self, speed: float) -> None:
+        """Raise ValueError if the playback speed is out of the supported range"""
+        if speed < MIN_SPEED or speed > MAX_SPEED:
+            raise ValueError(f"Playback speed must be in range {MIN_SPEED}-{MAX_SPEED}")
+
+    def _adjust_audio_speed(self, audio: np.ndarray, speed: float, sample_rate: int = 24000) -> np.ndarray:
         """
-        Adjust audio playback speed with improved quality for higher speeds
-        Uses a modified speed curve to prevent excessive pitch changes at high speeds
+        Adjust audio playback speed without changing pitch
+        Uses WSOLA time-stretching over fixed-size blocks, see app.timestretch.
+        Speeds above 1.0 are softened as before, see effective_speed
         
         Args:
             audio: Audio data
-            speed: Playback speed, range 1.0-2.0
+            speed: Playback speed, range 0.5-3.0
+            sample_rate: Sample rate of the audio
             
         Returns:
             Speed-adjusted audio data
         """
-        if speed < 1.0 or speed > 2.0:
-            raise ValueError("Playback speed must be in range 1.0-2.0")
+        self._check_speed(speed)
             
         if speed == 1.0:
             return audio
             
-        # Apply a gentler speed curve to prevent excessive pitch changes
-        # For speeds > 1.0, we apply a logarithmic scaling to reduce the effect
-        if speed > 1.0:
-            adjusted_speed = 1.0 + (speed - 1.0) * 0.7  # Reduce the speed effect for high values
-        else:
-            adjusted_speed = speed
-            
-        # Calculate new length
-        new_length = int(len(audio) / adjusted_speed)
-        
-        # Use resampling to adjust speed
-        adjusted_audio = resample(audio, new_length)
+        adjusted_speed = effective_speed(speed)
+        with span("speed"):
+            adjusted_audio = time_stretch(audio, adjusted_speed, sample_rate)
         
         logger.info(f"Adjusted audio speed from 1.0x to {speed}x (effective: {adjusted_speed:.2f}x)")
         return adjusted_audio
 
-    def voice_clone_with_speakers(self, text: str, speaker_configs: List[Dict], output_path: str = "output_voice_clone.wav", speed: float = 1.0) -> str:
+    def _load_reference_audio(self, ref_audio: Union[str, Tuple[np.ndarray, int]]) -> Tuple[np.ndarray, int]:
         """
-        Voice cloning for long texts with multiple speakers support
+        Decode reference audio into a mono float32 waveform
         
         Args:
-            text: Text to synthesize, can contain [SPEAKER0] markers
-            speaker_configs: Speaker configuration list, each config contains voice information
-            output_path: Output file path
-            speed: Audio playback speed, range 1.0-2.0
+            ref_audio: Local path, URL, base64 string or (waveform, sample_rate) tuple
             
         Returns:
-            Output file path
+            Tuple of (audio_data, sample_rate)
+        """
+        if isinstance(ref_audio, tuple) and len(ref_audio) == 2:
+            audio, sr = np.asarray(ref_audio[0]), int(ref_audio[1])
+        elif isinstance(ref_audio, str):
+            if ref_audio.startswith(("http://", "https://")):
+                with urllib.request.urlopen(ref_audio) as resp:
+                    audio, sr = sf.read(io.BytesIO(resp.read()), dtype="float32", always_2d=False)
+            elif ref_audio.startswith("data:") or (len(ref_audio) > 256 and "/" not in ref_audio and "\\" not in ref_audio):
+                payload = ref_audio.split(",", 1)[1] if ref_audio.startswith("data:") else ref_audio
+                audio, sr = sf.read(io.BytesIO(base64.b64decode(payload)), dtype="float32", always_2d=False)
+            else:
+                audio, sr = sf.read(ref_audio, dtype="float32", always_2d=False)
+        else:
+            raise TypeError(f"Unsupported ref_audio type: {type(ref_audio)}")
+        
+        # Mix down to mono like the model does
+        if audio.ndim > 1:
+            audio = np.mean(audio, axis=-1)
+        return audio.astype(np.float32, copy=False), int(sr)
+
+    def _get_voice_clone_prompt(self, ref_audio: Union[str, Tuple[np.ndarray, int]], ref_text: str, x_vector_only_mode: bool = False):
+        """
+        Get a voice clone prompt, reusing a cached one for identical reference audio
+        
+        Args:
+            ref_audio: Reference audio (path, URL, base64 or (waveform, sample_rate))
+            ref_text: Reference transcript
+            x_vector_only_mode: Whether only the speaker embedding is used
+            
+        Returns:
+            Voice clone prompt accepted by generate_voice_clone
+        """
+        return self._voice_clone_prompt_entry(ref_audio, ref_text, x_vector_only_mode)[1]
+
+    def _voice_clone_prompt_entry(self, ref_audio: Union[str, Tuple[np.ndarray, int]], ref_text: str, x_vector_only_mode: bool = False) -> Tuple[str, Any]:
+        """Return (prompt content hash, voice clone prompt), see _get_voice_clone_prompt"""
+        with span("ref_audio"):
+            audio, sr = self._load_reference_audio(ref_audio)
+        key = hash_reference_audio(audio, sr, ref_text, x_vector_only_mode, model=self.voice_clone_model_path)
+        
+        prompt = self.prompt_cache.get(key)
+        if prompt is not None:
+            logger.info(f"Voice clone prompt cache hit: {key[:12]}")
+            return key, prompt
+            
+        # Fall back to the persistent store before extracting the prompt again
+        if self.prompt_store is not None:
+            with span("prompt_store"):
+                # The clone model runs on the engine's device, so the prompt goes there without loading the model
+                prompt = self.prompt_store.get(key, device=self.device)
+            if prompt is not None:
+                logger.info(f"Voice clone prompt loaded from store: {key[:12]}")
+                self.prompt_cache.put(key, prompt)
+                return key, prompt
+            
+        logger.info(f"Voice clone prompt cache miss: {key[:12]}, creating prompt")
+        with self._use_model("clone") as model, span("prompt"):
+            started = time.perf_counter()
+            prompt = model.create_voice_clone_prompt(
+                ref_audio=(audio, sr),
+                ref_text=ref_text,
+                x_vector_only_mode=x_vector_only_mode,
+            )
+        observe_prompt_creation(time.perf_counter() - started)
+        self.prompt_cache.put(key, prompt)
+        if self.prompt_store is not None:
+            source = ref_audio if isinstance(ref_audio, str) and len(ref_audio) <= 256 else "<in-memory>"
+            self.prompt_store.put(key, prompt, metadata={"source": source, "sample_rate": sr, "duration": len(audio) / sr})
+        return key, prompt
+
+    def _rng_devices(self) -> List[int]:
+        """Return the CUDA devices whose random state generation on this engine uses"""
+        device = torch.device(self.device)
+        if device.type != "cuda":
+            return []
+        return [device.index if device.index is not None else torch.cuda.current_device()]
+
+    @contextmanager
+    def _seeded(self, seed: Optional[int]):
+        """Seed the enclosed generation on a forked generator, so other renders neither reseed it nor get reseeded"""
+        if seed is None:
+            yield
+            return
+        with torch.random.fork_rng(devices=self._rng_devices()):
+            torch.manual_seed(seed)
+            yield
+
+    def _design_reference_voice(self, design_text: str, design_instruct: str, language: str, seed: int) -> Tuple[np.ndarray, int]:
         """
-        # Extract speaker markers
-        speakers, texts = self._extract_speakers(text)
+        Get the reference audio of a designed voice, generating it only once per design
         
-        # Validate speaker count match
-        if len(speakers) != len(texts):
-            raise ValueError(f"Speaker count ({len(speakers)}) does not match text segment count ({len(texts)})")
+        Args:
+            design_text: Text spoken in the reference audio
+            design_instruct: Voice description instruction
+            language: Language
+            seed: Random seed making the design reproducible
             
-        unique_speakers = list(set(speakers))
+        Returns:
+            Tuple of (audio_data, sample_rate)
+        """
+        key = hash_voice_design(design_text, design_instruct, language, seed, model=self.voice_design_model_path)
         
-        # Handle case where no speaker tags are provided in text but we have speaker configs
-        if not speakers and len(speaker_configs) > 0:
-            # Use first speaker config for the entire text
-            unique_speakers = ["[SPEAKER0]"]
+        ref_audio = self.design_cache.get(key)
+        if ref_audio is not None:
+            logger.info(f"Designed voice cache hit: {key[:12]}")
+            return ref_audio
+            
+        if self.prompt_store is not None:
+            with span("prompt_store"):
+                ref_audio = self.prompt_store.get_design(key)
+            if ref_audio is not None:
+                logger.info(f"Designed voice loaded from store: {key[:12]}")
+                self.design_cache.put(key, ref_audio, nbytes=ref_audio[0].nbytes)
+                return ref_audio
         
-        # Create speaker mapping with improved logic
-        speaker_mapping = {}
+        logger.info(f"Designed voice cache miss: {key[:12]}, generating reference audio with seed {seed}")
+        # Seeded inside the turn, so concurrent renders cannot reseed the design in between
+        with self._use_model("design") as model, self._seeded(seed), span("design_ref"):
+            started = time.perf_counter()
+            ref_wavs, sr = model.generate_voice_design(
+                text=design_text,
+                language=language,
+                instruct=design_instruct,
+            )
+        observe_generation("design", [design_text], [language], ref_wavs, sr, time.perf_counter() - started)
+        ref_audio = (np.asarray(ref_wavs[0], dtype=np.float32), sr)
+        self.design_cache.put(key, ref_audio, nbytes=ref_audio[0].nbytes)
+        if self.prompt_store is not None:
+            self.prompt_store.put_design(key, ref_audio[0], sr, metadata={
+                "source": f"design: {design_instruct[:80]}",
+                "ref_text": design_text,
+                "language": language,
+                "seed": seed,
+            })
+        return ref_audio
+
+    def _build_speaker_prompt(self, speaker_config: Dict):
+        """
+        Create the voice clone prompt for one speaker configuration
         
-        # First, try to map by explicit speaker_tag in configs
-        for i, speaker_tag in enumerate(unique_speakers):
-            # Extract speaker number from tag
-            speaker_num = int(re.search(r'\d+', speaker_tag).group()) if re.search(r'\d+', speaker_tag) else None
+        Args:
+            speaker_config: Speaker configuration with either ref_audio or design_text/design_instruct
             
-            # Try to find matching config by speaker_tag
-            matched = False
-            for config_idx, config in enumerate(speaker_configs):
-                if 'speaker_tag' in config and config['speaker_tag'] == speaker_tag:
-                    speaker_mapping[speaker_tag] = config_idx
-                    matched = True
-                    break
+        Returns:
+            Voice clone prompt accepted by generate_voice_clone
+        """
+        return self._speaker_prompt_entry(speaker_config)[1]
+
+    def _speaker_prompt_entry(self, speaker_config: Dict) -> Tuple[str, Any]:
+        """Return (prompt content hash, voice clone prompt) of a speaker, see _build_speaker_prompt"""
+        # Voice cloning based on existing audio
+        if 'ref_audio' in speaker_config:
+            # Get ref_text from config or file
+            ref_text = speaker_config.get('ref_text', '')
+            ref_text_file = speaker_config.get('ref_text_file')
             
-            # If no explicit match, try by speaker number
-            if not matched and speaker_num is not None:
-                for config_idx, config in enumerate(speaker_configs):
-                    if 'speaker_tag' not in config and config_idx == speaker_num:
-                        speaker_mapping[speaker_tag] = config_idx
-                        matched = True
-                        break
-            
-            # If still no match, use cyclic mapping or default to first config
-            if not matched:
-                if len(speaker_configs) > 0:
-                    speaker_mapping[speaker_tag] = min(i, len(speaker_configs) - 1)
-                else:
-                    speaker_mapping[speaker_tag] = 0
+            # If ref_text_file is provided, read ref_text from file
+            if ref_text_file:
+                try:
+                    with span("ref_text"), open(ref_text_file, 'r', encoding='utf-8') as f:
+                        ref_text = f.read().strip()
+                except Exception as e:
+                    logger.warning(f"Failed to read ref_text from file {ref_text_file}: {e}. Using empty string.")
             
-        # Create voice clone prompts for each speaker
+            return self._voice_clone_prompt_entry(
+                ref_audio=speaker_config['ref_audio'],
+                ref_text=ref_text,
+                x_vector_only_mode=speaker_config.get('x_vector_only_mode', False),
+            )
+        # Voice cloning based on voice design
+        elif 'design_text' in speaker_config and 'design_instruct' in speaker_config:
+            # First get reference audio through voice design
+            ref_audio = self._design_reference_voice(
+                design_text=speaker_config['design_text'],
+                design_instruct=speaker_config['design_instruct'],
+                language=speaker_config.get('language', 'English'),
+                seed=speaker_config.get('design_seed', self.design_seed),
+            )
+            
+            # Create clone prompt using designed voice
+            return self._voice_clone_prompt_entry(
+                ref_audio=ref_audio,
+                ref_text=speaker_config['design_text'],
+            )
+        else:
+            raise ValueError(f"Invalid speaker configuration: {speaker_config}")
+
+    def prebuild_voice_prompts(self, speaker_configs: List[Dict]) -> int:
+        """
+        Create and cache voice clone prompts ahead of any synthesis request
+        
+        Args:
+            speaker_configs: Speaker configuration list, same format as for voice cloning
+            
+        Returns:
+            Number of speaker configurations processed
+        """
+        for speaker_config in speaker_configs:
+            self._build_speaker_prompt(speaker_config)
+        logger.info(f"Prebuilt voice clone prompts for {len(speaker_configs)} speakers")
+        return len(speaker_configs)
+
+    def _iter_script_chunks(self, text: Union[str, Iterable[str]]) -> Iterator[Tuple[str, str]]:
+        """Yield (speaker_tag, chunk_text) of every non-empty chunk of a script after splitting"""
+        for speaker_tag, segment_text in iter_script_segments(text):
+            # Split long text
+            for chunk in self._split_long_text(segment_text):
+                if chunk.strip():  # Process only non-empty text
+                    yield speaker_tag, chunk
+
+    def _design_cached(self, speaker_config: Dict) -> Optional[bool]:
+        """Return whether the designed reference voice of a speaker is cached, None for reference audio speakers"""
+        if 'design_text' not in speaker_config or 'design_instruct' not in speaker_config:
+            return None
+        key = hash_voice_design(
+            speaker_config['design_text'],
+            speaker_config['design_instruct'],
+            speaker_config.get('language', 'English'),
+            speaker_config.get('design_seed', self.design_seed),
+            model=self.voice_design_model_path,
+        )
+        return key in self.design_cache or (self.prompt_store is not None and self.prompt_store.has_design(key))
+
+    def plan_voice_clone(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], speed: float = 1.0) -> SynthesisPlan:
+        """
+        Compile what a voice clone render would do, without loading models or rendering
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers, or an iterable of script lines
+            speaker_configs: Speaker configuration list, each config contains voice information
+            speed: Audio playback speed, range 0.5-3.0
+            
+        Returns:
+            SynthesisPlan with the speakers and their prompt sources, the chunks after
+            splitting, the duplicate chunks rendered only once and estimated audio
+            seconds and compute cost (see app.planner)
+        """
+        return plan_voice_clone(
+            text, speaker_configs,
+            speed=speed,
+            realtime_factor=self.realtime_factor,
+            dedup_window=self.dedup_window,
+            design_cached=self._design_cached,
+        )
+
+    def _prepare_clone_chunks(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], prompt_keys: Optional[Dict] = None) -> Tuple[List[Tuple[str, str]], Dict, Dict]:
+        """
+        Resolve speakers, build their voice clone prompts and split the text into chunks
+        
+        The script is parsed incrementally and each speaker's prompt is built
+        when its tag first appears (see app.script_parser)
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers, or an iterable of script lines
+            speaker_configs: Speaker configuration list, each config contains voice information
+            prompt_keys: Optional dict filled with the prompt content hash of each speaker
+            
+        Returns:
+            (List of (speaker_tag, chunk_text) in script order, speaker prompts, speaker languages)
+        """
+        speaker_index = SpeakerIndex(speaker_configs)
         speaker_prompts = {}
         speaker_languages = {}
-        for speaker_tag in unique_speakers:
-            config_index = speaker_mapping[speaker_tag]
-            speaker_config = speaker_configs[config_index]
-            speaker_languages[speaker_tag] = speaker_config.get('language', 'English')
-            
-            # Voice cloning based on existing audio
-            if 'ref_audio' in speaker_config:
-                # Get ref_text from config or file
-                ref_text = speaker_config.get('ref_text', '')
-                ref_text_file = speaker_config.get('ref_text_file')
-                
-                # If ref_text_file is provided, read ref_text from file
-                if ref_text_file:
-                    try:
-                        with open(ref_text_file, 'r', encoding='utf-8') as f:
-                            ref_text = f.read().strip()
-                    except Exception as e:
-                        logger.warning(f"Failed to read ref_text from file {ref_text_file}: {e}. Using empty string.")
-                
-                prompt = self.voice_clone_model.create_voice_clone_prompt(
-                    ref_audio=speaker_config['ref_audio'],
-                    ref_text=ref_text,
-                    x_vector_only_mode=speaker_config.get('x_vector_only_mode', False),
-                )
-            # Voice cloning based on voice design
-            elif 'design_text' in speaker_config and 'design_instruct' in speaker_config:
-                # First generate reference audio through voice design
-                ref_wavs, sr = self.voice_design_model.generate_voice_design(
-                    text=speaker_config['design_text'],
-                    language=speaker_config.get('language', 'English'),
-                    instruct=speaker_config['design_instruct'],
-                )
-                
-                # Create clone prompt using designed voice
-                prompt = self.voice_clone_model.create_voice_clone_prompt(
-                    ref_audio=(ref_wavs[0], sr),
-                    ref_text=speaker_config['design_text'],
-                )
-            else:
-                raise ValueError(f"Invalid speaker configuration: {speaker_config}")
-                
-            speaker_prompts[speaker_tag] = prompt
-            
-        # Generate audio for each text segment
-        audio_segments = []
-        for speaker_tag, segment_text in zip(speakers, texts):
-            # If speaker_tag is not in speaker_prompts (which can happen when no tags in text), use default
+        chunks = []
+        
+        for speaker_tag, chunk in self._iter_script_chunks(text):
             if speaker_tag not in speaker_prompts:
-                if "[SPEAKER0]" in speaker_prompts:
-                    speaker_tag = "[SPEAKER0]"
-                else:
-                    # Use the first available speaker
-                    speaker_tag = list(speaker_prompts.keys())[0] if speaker_prompts else None
-                    if speaker_tag is None:
-                        raise ValueError("No speaker configurations available")
-                
-            # Load models if lazy loading is enabled
-            if self.lazy_load:
-                self._load_models()
-                
-            # Split long text
-            text_chunks = self._split_long_text(segment_text)
+                speaker_config = speaker_index.config_for(speaker_tag)
+                speaker_languages[speaker_tag] = speaker_config.get('language', 'English')
+                prompt_key, speaker_prompts[speaker_tag] = self._speaker_prompt_entry(speaker_config)
+                if prompt_keys is not None:
+                    prompt_keys[speaker_tag] = prompt_key
+            chunks.append((speaker_tag, chunk))
+                    
+        logger.info(f"Prepared {len(chunks)} chunks for {len(speaker_prompts)} speakers: {list(speaker_prompts)}")
+        return chunks, speaker_prompts, speaker_languages
+
+    def _iter_clone_chunks(self, chunks: List[Tuple[str, str]], speaker_prompts: Dict, speaker_languages: Dict, batch_size: int = 1) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """
+        Generate audio for every text chunk, yielding each chunk as soon as it and all earlier chunks are done
+        
+        With batch_size > 1, chunks are grouped into length-sorted buckets and
+        each bucket is rendered with one batched generate_voice_clone call.
+        
+        Args:
+            chunks: List of (speaker_tag, chunk_text)
+            speaker_prompts: Voice clone prompt of each speaker
+            speaker_languages: Language of each speaker
+            batch_size: Maximum number of chunks per generate call
             
-            # Generate audio for each text chunk
-            for chunk in text_chunks:
-                if chunk.strip():  # Process only non-empty text
-                    logger.info(f"Generating audio for speaker {speaker_tag} with text chunk: {chunk}")
-                    wavs, sr = self.voice_clone_model.generate_voice_clone(
+        Yields:
+            (chunk_index, audio_data, sample_rate) in the original chunk order
+        """
+        if self._use_scheduler():
+            # Submit every chunk at once so the scheduler can merge them with each other and other requests
+            futures = [
+                self.scheduler.submit_clone(chunk, speaker_languages[speaker_tag], speaker_prompts[speaker_tag])
+                for speaker_tag, chunk in chunks
+            ]
+            try:
+                for index, future in enumerate(futures):
+                    wav, sr = future.result()
+                    yield index, wav, sr
+            finally:
+                # Drop queued work if the consumer stops early
+                for future in futures:
+                    future.cancel()
+            return
+            
+        if batch_size <= 1:
+            for index, (speaker_tag, chunk) in enumerate(chunks):
+                logger.info(f"Generating audio for speaker {speaker_tag} with text chunk: {chunk}")
+                with self._use_model("clone") as model, self._seeded(self.clone_seed), span("generate"):
+                    started = time.perf_counter()
+                    wavs, sr = model.generate_voice_clone(
                         text=chunk,
                         language=speaker_languages[speaker_tag],
                         voice_clone_prompt=speaker_prompts[speaker_tag],
+                        **self.clone_generate_kwargs,
                     )
-                    audio_segments.append(wavs[0])
-                    
-        # Concatenate all audio segments
-        if not audio_segments:
-            raise ValueError("No audio segments generated from the provided input")
+                observe_generation("clone", [chunk], [speaker_languages[speaker_tag]], wavs, sr, time.perf_counter() - started)
+                yield index, wavs[0], sr
+            return
+            
+        buckets = bucket_by_length([len(chunk) for _, chunk in chunks], max_batch_size=batch_size)
+        logger.info(f"Generating {len(chunks)} chunks in {len(buckets)} batches (max batch size {batch_size})")
+        pending = {}
+        next_index = 0
+        for bucket in buckets:
+            wavs, sr = self.generate_clone_batch(
+                [chunks[i][1] for i in bucket],
+                [speaker_languages[chunks[i][0]] for i in bucket],
+                [speaker_prompts[chunks[i][0]] for i in bucket],
+            )
+            for index, wav in zip(bucket, wavs):
+                pending[index] = wav
+            # Restore the original chunk order
+            while next_index in pending:
+                yield next_index, pending.pop(next_index), sr
+                next_index += 1
 
-        final_audio = np.concatenate(audio_segments)
+    def _generate_clone_chunks(self, chunks: List[Tuple[str, str]], speaker_prompts: Dict, speaker_languages: Dict, batch_size: int = 1) -> Tuple[List[np.ndarray], int]:
+        """
+        Generate audio for every text chunk
+        
+        Args:
+            chunks: List of (speaker_tag, chunk_text)
+            speaker_prompts: Voice clone prompt of each speaker
+            speaker_languages: Language of each speaker
+            batch_size: Maximum number of chunks per generate call
+            
+        Returns:
+            (Audio of each chunk in the original order, sample rate)
+        """
+        audio_segments = []
+        sr = None
+        for _, wav, sr in self._iter_clone_chunks(chunks, speaker_prompts, speaker_languages, batch_size=batch_size):
+            audio_segments.append(wav)
+        return audio_segments, sr
 
-        # Adjust audio speed
+    def _postprocess_chunk(self, item: Tuple[np.ndarray, int, Dict], speed: float = 1.0, target_sample_rate: Optional[int] = None, normalize: bool = False, encoding: Optional[str] = None) -> Tuple[Union[np.ndarray, bytes], int, Dict]:
+        """
+        CPU post-processing of one generated chunk
+        
+        Args:
+            item: Tuple of (audio_data, sample_rate, metadata)
+            speed: Audio playback speed, range 0.5-3.0
+            target_sample_rate: Resample the chunk to this rate if set
+            normalize: Scale the chunk to a fixed peak level
+            encoding: "pcm16" to return little-endian 16-bit PCM bytes instead of float samples
+            
+        Returns:
+            Tuple of (audio_data or encoded bytes, sample_rate, metadata)
+        """
+        wav, sr, meta = item
         if speed != 1.0:
-            final_audio = self._adjust_audio_speed(final_audio, speed)
+            wav = self._adjust_audio_speed(wav, speed, sr)
+        if target_sample_rate and target_sample_rate != sr:
+            divisor = math.gcd(int(target_sample_rate), int(sr))
+            with span("resample"):
+                wav = resample_poly(wav, int(target_sample_rate) // divisor, int(sr) // divisor).astype(np.float32)
+            sr = int(target_sample_rate)
+        if normalize:
+            peak = float(np.max(np.abs(wav))) if len(wav) else 0.0
+            if peak > 0:
+                wav = wav * (NORMALIZE_PEAK / peak)
+        if encoding == "pcm16":
+            with span("pcm16"):
+                wav = (np.clip(wav, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        elif encoding is not None:
+            raise ValueError(f"Unsupported chunk encoding: {encoding}")
+        return wav, sr, meta
 
-        sf.write(output_path, final_audio, sr)
-        logger.info(f"Voice cloning completed, output file: {output_path}")
-        return output_path
-    
-    def voice_clone_with_speakers_in_memory(self, text: str, speaker_configs: List[Dict], speed: float = 1.0) -> Tuple[np.ndarray, int]:
+    def iter_voice_clone(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], speed: float = 1.0, batch_size: Optional[int] = None,
+                         pipelined: Optional[bool] = None, target_sample_rate: Optional[int] = None, normalize: bool = False,
+                         encoding: Optional[str] = None, report: Optional[Dict] = None) -> Iterator[Tuple[Union[np.ndarray, bytes], int, Dict]]:
         """
-        Voice cloning for long texts with multiple speakers support, returning audio data in memory
+        Voice cloning that yields audio chunk by chunk as soon as each one is rendered
+        
+        Nothing is generated until the first chunk is requested. Without
+        pipelining each following chunk is only generated when the caller asks
+        for it. With pipelining, generation runs ahead on its own thread while a
+        worker pool post-processes finished chunks, bounded by $PIPELINE_MAX_PENDING.
         
         Args:
             text: Text to synthesize, can contain [SPEAKER0] markers
             speaker_configs: Speaker configuration list, each config contains voice information
-            speed: Audio playback speed, range 1.0-2.0
+            speed: Audio playback speed, range 0.5-3.0, applied to each chunk
+            batch_size: Maximum chunks per batched generate call, default is $CLONE_BATCH_SIZE (1 renders sequentially)
+            pipelined: Overlap generation with post-processing, default is $PIPELINE_ENABLED
+            target_sample_rate: Resample chunks to this rate if set
+            normalize: Scale every chunk to a fixed peak level
+            encoding: "pcm16" to yield 16-bit PCM bytes instead of float samples
+            report: Optional dict filled with render statistics (pipeline stage utilisation, utterance cache hits)
             
-        Returns:
-            Tuple of (audio_data, sample_rate)
+        Yields:
+            Tuple of (audio_chunk, sample_rate, metadata) where metadata holds the
+            speaker tag, language, chunk index, chunk count and chunk text
         """
-        # Extract speaker markers
-        speakers, texts = self._extract_speakers(text)
+        self._check_speed(speed)
+        postprocess = functools.partial(
+            self._postprocess_chunk,
+            speed=speed,
+            target_sample_rate=target_sample_rate,
+            normalize=normalize,
+            encoding=encoding,
+        )
+        raw_chunks = self._iter_raw_voice_clone(text, speaker_configs, batch_size=batch_size, report=report)
         
-        # Validate speaker count match
-        if len(speakers) != len(texts):
-            raise ValueError(f"Speaker count ({len(speakers)}) does not match text segment count ({len(texts)})")
+        if pipelined is None:
+            pipelined = self.pipeline_enabled
+        if not pipelined:
+            for item in raw_chunks:
+                yield postprocess(item)
+            return
             
-        unique_speakers = list(set(speakers))
+        pipeline = RenderPipeline(postprocess, workers=self.pipeline_workers, max_pending=self.pipeline_max_pending)
+        try:
+            yield from pipeline.run(raw_chunks)
+        finally:
+            if report is not None:
+                report["pipeline"] = pipeline.stats()
+
+    def _iter_raw_voice_clone(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], batch_size: Optional[int] = None,
+                              report: Optional[Dict] = None) -> Iterator[Tuple[np.ndarray, int, Dict]]:
+        """
+        Yield (audio_data, sample_rate, metadata) of every chunk straight from the model
         
-        # Handle case where no speaker tags are provided in text but we have speaker configs
-        if not speakers and len(speaker_configs) > 0:
-            # Use first speaker config for the entire text
-            unique_speakers = ["[SPEAKER0]"]
+        A chunk repeating the (speaker, language, text) of a chunk less than
+        self.dedup_window chunks earlier reuses that chunk's audio instead of
+        being generated again. Audio is only held while a later chunk still reuses it.
+        With an utterance cache, chunks rendered by earlier requests are read
+        back from disk and only the others are generated.
+        """
+        prompt_keys = {}
+        chunks, speaker_prompts, speaker_languages = self._prepare_clone_chunks(text, speaker_configs, prompt_keys)
+        sources = find_duplicates(
+            [utterance_key(speaker_tag, speaker_languages[speaker_tag], chunk) for speaker_tag, chunk in chunks],
+            window=self.dedup_window,
+        )
+        unique = [index for index, source in enumerate(sources) if source is None]
+        if len(unique) < len(chunks):
+            logger.info(f"Rendering {len(unique)} of {len(chunks)} chunks, {len(chunks) - len(unique)} repeat earlier utterances")
         
-        # Create speaker mapping with improved logic
-        speaker_mapping = {}
+        cache_keys = {}
+        if self.utterance_cache is not None:
+            # Everything besides the prompt, language and text that changes the generated audio
+            params = {"model": self.voice_clone_model_path, "generate": self.clone_generate_kwargs}
+            for index in unique:
+                speaker_tag, chunk = chunks[index]
+                cache_keys[index] = hash_utterance(prompt_keys[speaker_tag], speaker_languages[speaker_tag], chunk,
+                                                   params=params, seed=self.clone_seed)
+        cached = {index for index, key in cache_keys.items() if key in self.utterance_cache}
+        to_render = [index for index in unique if index not in cached]
+        cache_stats = {"enabled": self.utterance_cache is not None, "hits": 0, "misses": len(to_render) if cache_keys else 0}
+        if cache_keys:
+            self.utterance_cache.record_misses(len(to_render))
+            logger.info(f"Utterance cache: {len(cached)} of {len(unique)} chunks cached")
         
-        # First, try to map by explicit speaker_tag in configs
-        for i, speaker_tag in enumerate(unique_speakers):
-            # Extract speaker number from tag
-            speaker_num = int(re.search(r'\d+', speaker_tag).group()) if re.search(r'\d+', speaker_tag) else None
-            
-            # Try to find matching config by speaker_tag
-            matched = False
-            for config_idx, config in enumerate(speaker_configs):
-                if 'speaker_tag' in config and config['speaker_tag'] == speaker_tag:
-                    speaker_mapping[speaker_tag] = config_idx
-                    matched = True
-                    break
-            
-            # If no explicit match, try by speaker number
-            if not matched and speaker_num is not None:
-                for config_idx, config in enumerate(speaker_configs):
-                    if 'speaker_tag' not in config and config_idx == speaker_num:
-                        speaker_mapping[speaker_tag] = config_idx
-                        matched = True
-                        break
-            
-            # If still no match, use cyclic mapping or default to first config
-            if not matched:
-                if len(speaker_configs) > 0:
-                    speaker_mapping[speaker_tag] = min(i, len(speaker_configs) - 1)
+        # Number of later chunks still reusing the audio of each rendered chunk
+        reuses = {}
+        for source in sources:
+            if source is not None:
+                reuses[source] = reuses.get(source, 0) + 1
+        held = {}
+        
+        rendered = self._iter_clone_chunks(
+            [chunks[index] for index in to_render], speaker_prompts, speaker_languages,
+            batch_size=batch_size or self.clone_batch_size,
+        )
+        try:
+            for index, source in enumerate(sources):
+                if source is None:
+                    entry = None
+                    if index in cached:
+                        with span("utterance_cache"):
+                            entry = self.utterance_cache.get(cache_keys[index])
+                    if entry is not None:
+                        wav, sr = entry
+                        cache_stats["hits"] += 1
+                    else:
+                        if index in cached:
+                            # Evicted since the membership check, generate it on its own
+                            with closing(self._iter_clone_chunks([chunks[index]], speaker_prompts, speaker_languages)) as single:
+                                _, wav, sr = next(single)
+                            cache_stats["misses"] += 1
+                        else:
+                            _, wav, sr = next(rendered)
+                        if index in cache_keys:
+                            self.utterance_cache.put(cache_keys[index], wav, sr)
+                    if reuses.get(index):
+                        held[index] = (wav, sr)
                 else:
-                    speaker_mapping[speaker_tag] = 0
+                    wav, sr = held[source]
+                    reuses[source] -= 1
+                    if not reuses[source]:
+                        del held[source]
+                speaker_tag, chunk = chunks[index]
+                yield wav, sr, {
+                    "speaker_tag": speaker_tag,
+                    "language": speaker_languages[speaker_tag],
+                    "chunk_index": index,
+                    "chunk_count": len(chunks),
+                    "text": chunk,
+                }
+        finally:
+            # Cancel outstanding generation if the consumer stops early
+            rendered.close()
+            if report is not None:
+                lookups = cache_stats["hits"] + cache_stats["misses"]
+                cache_stats["hit_rate"] = cache_stats["hits"] / lookups if lookups else 0.0
+                cache_stats["duplicates"] = len(chunks) - len(unique)
+                report["utterance_cache"] = cache_stats
+
+    async def aiter_voice_clone(self, text: str, speaker_configs: List[Dict], speed: float = 1.0, batch_size: Optional[int] = None) -> AsyncIterator[Tuple[np.ndarray, int, Dict]]:
+        """
+        Async variant of iter_voice_clone
+        
+        Each chunk is generated in a worker thread when the consumer awaits it,
+        so a slow consumer naturally pauses generation (backpressure) and the
+        event loop stays free while the model runs.
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers
+            speaker_configs: Speaker configuration list, each config contains voice information
+            speed: Audio playback speed, range 0.5-3.0, applied to each chunk
+            batch_size: Maximum chunks per batched generate call, default is $CLONE_BATCH_SIZE (1 renders sequentially)
             
-        # Create voice clone prompts for each speaker
-        speaker_prompts = {}
-        speaker_languages = {}
-        for speaker_tag in unique_speakers:
-            config_index = speaker_mapping[speaker_tag]
-            speaker_config = speaker_configs[config_index]
-            speaker_languages[speaker_tag] = speaker_config.get('language', 'English')
-            
-            # Voice cloning based on existing audio
-            if 'ref_audio' in speaker_config:
-                # Get ref_text from config or file
-                ref_text = speaker_config.get('ref_text', '')
-                ref_text_file = speaker_config.get('ref_text_file')
-                
-                # If ref_text_file is provided, read ref_text from file
-                if ref_text_file:
-                    try:
-                        with open(ref_text_file, 'r', encoding='utf-8') as f:
-                            ref_text = f.read().strip()
-                    except Exception as e:
-                        logger.warning(f"Failed to read ref_text from file {ref_text_file}: {e}. Using empty string.")
-                
-                prompt = self.voice_clone_model.create_voice_clone_prompt(
-                    ref_audio=speaker_config['ref_audio'],
-                    ref_text=ref_text,
-                    x_vector_only_mode=speaker_config.get('x_vector_only_mode', False),
-                )
-            # Voice cloning based on voice design
-            elif 'design_text' in speaker_config and 'design_instruct' in speaker_config:
-                # First generate reference audio through voice design
-                ref_wavs, sr = self.voice_design_model.generate_voice_design(
-                    text=speaker_config['design_text'],
-                    language=speaker_config.get('language', 'English'),
-                    instruct=speaker_config['design_instruct'],
-                )
-                
-                # Create clone prompt using designed voice
-                prompt = self.voice_clone_model.create_voice_clone_prompt(
-                    ref_audio=(ref_wavs[0], sr),
-                    ref_text=speaker_config['design_text'],
-                )
+        Yields:
+            Tuple of (audio_chunk, sample_rate, metadata), see iter_voice_clone
+        """
+        loop = asyncio.get_running_loop()
+        iterator = self.iter_voice_clone(text, speaker_configs, speed=speed, batch_size=batch_size)
+        done = object()
+        # Held while a worker thread advances the iterator, which cannot be closed in the middle of a step
+        stepping = threading.Lock()
+
+        def step():
+            with stepping:
+                return next(iterator, done)
+
+        def close():
+            with stepping:
+                iterator.close()
+
+        try:
+            while True:
+                item = await loop.run_in_executor(None, step)
+                if item is done:
+                    break
+                yield item
+        finally:
+            if stepping.acquire(blocking=False):
+                try:
+                    iterator.close()
+                finally:
+                    stepping.release()
             else:
-                raise ValueError(f"Invalid speaker configuration: {speaker_config}")
-                
-            speaker_prompts[speaker_tag] = prompt
+                # Cancelled while a worker thread generates a chunk: close on the executor once that step returns
+                loop.run_in_executor(None, close)
+
+    def render_voice_clone(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], sink: RenderSink, speed: float = 1.0, batch_size: Optional[int] = None,
+                           pipelined: Optional[bool] = None, report: Optional[Dict] = None) -> Any:
+        """
+        Voice cloning for long texts written chunk by chunk into a render sink
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers, or an iterable of script lines (e.g. an open file)
+            speaker_configs: Speaker configuration list, each config contains voice information
+            sink: Destination of the audio (file, array, WAV stream, shared memory)
+            speed: Audio playback speed, range 0.5-3.0
+            batch_size: Maximum chunks per batched generate call, default is $CLONE_BATCH_SIZE (1 renders sequentially)
+            pipelined: Overlap generation with post-processing, default is $PIPELINE_ENABLED
+            report: Optional dict filled with render statistics (pipeline utilisation, utterance cache hits, peak RSS)
             
-        # Generate audio for each text segment
-        audio_segments = []
-        for speaker_tag, segment_text in zip(speakers, texts):
-            # If speaker_tag is not in speaker_prompts (which can happen when no tags in text), use default
-            if speaker_tag not in speaker_prompts:
-                if "[SPEAKER0]" in speaker_prompts:
-                    speaker_tag = "[SPEAKER0]"
-                else:
-                    # Use the first available speaker
-                    speaker_tag = list(speaker_prompts.keys())[0] if speaker_prompts else None
-                    if speaker_tag is None:
-                        raise ValueError("No speaker configurations available")
-                
-            # Load models if lazy loading is enabled
-            if self.lazy_load:
-                self._load_models()
-                
-            # Split long text
-            text_chunks = self._split_long_text(segment_text)
+        Returns:
+            Result of sink.close()
+        """
+        try:
+            for wav, sr, _ in self.iter_voice_clone(text, speaker_configs, speed=speed, batch_size=batch_size, pipelined=pipelined, report=report):
+                with span("write"):
+                    sink.write(wav, sr)
+        except BaseException:
+            sink.abort()
+            raise
+        if report is not None:
+            report["memory"] = sink.stats()
+        with span("encode"):
+            return sink.close()
+
+    def voice_clone_with_speakers(self, text: str, speaker_configs: List[Dict], output_path: str = "output_voice_clone.wav", speed: float = 1.0, batch_size: Optional[int] = None,
+                                  pipelined: Optional[bool] = None, report: Optional[Dict] = None) -> str:
+        """
+        Voice cloning for long texts with multiple speakers support
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers
+            speaker_configs: Speaker configuration list, each config contains voice information
+            output_path: Output file path
+            speed: Audio playback speed, range 0.5-3.0
+            batch_size: Maximum chunks per batched generate call, default is $CLONE_BATCH_SIZE (1 renders sequentially)
+            pipelined: Overlap generation with post-processing, default is $PIPELINE_ENABLED
+            report: Optional dict filled with render statistics (pipeline utilisation, utterance cache hits, peak RSS)
             
-            # Generate audio for each text chunk
-            for chunk in text_chunks:
-                if chunk.strip():  # Process only non-empty text
-                    logger.info(f"Generating audio for speaker {speaker_tag} with text chunk: {chunk}")
-                    wavs, sr = self.voice_clone_model.generate_voice_clone(
-                        text=chunk,
-                        language=speaker_languages[speaker_tag],
-                        voice_clone_prompt=speaker_prompts[speaker_tag],
-                    )
-                    audio_segments.append(wavs[0])
-                    
-        # Concatenate all audio segments
-        if audio_segments:
-            final_audio = np.concatenate(audio_segments)
+        Returns:
+            Output file path
+        """
+        # Chunks are written as they arrive, the full output is never held in memory
+        sink = FileSink(output_path)
+        self.render_voice_clone(text, speaker_configs, sink, speed=speed, batch_size=batch_size, pipelined=pipelined, report=report)
+        if not sink.length:
+            raise ValueError("No audio segments generated from the provided input")
+
+        logger.info(f"Voice cloning completed, output file: {output_path}")
+        return output_path
+    
+    def voice_clone_with_speakers_in_memory(self, text: str, speaker_configs: List[Dict], speed: float = 1.0, batch_size: Optional[int] = None,
+                                            pipelined: Optional[bool] = None, report: Optional[Dict] = None) -> Tuple[np.ndarray, int]:
+        """
+        Voice cloning for long texts with multiple speakers support, returning audio data in memory
+        
+        Args:
+            text: Text to synthesize, can contain [SPEAKER0] markers
+            speaker_configs: Speaker configuration list, each config contains voice information
+            speed: Audio playback speed, range 0.5-3.0
+            batch_size: Maximum chunks per batched generate call, default is $CLONE_BATCH_SIZE (1 renders sequentially)
+            pipelined: Overlap generation with post-processing, default is $PIPELINE_ENABLED
+            report: Optional dict filled with render statistics (pipeline utilisation, utterance cache hits, peak RSS)
             
-            # Adjust audio speed
-            if speed != 1.0:
-                final_audio = self._adjust_audio_speed(final_audio, speed)
-                
+        Returns:
+            Tuple of (audio_data, sample_rate)
+        """
+        sink = ArraySink(self.assembly_spill_bytes)
+        audio_data, sr = self.render_voice_clone(text, speaker_configs, sink, speed=speed, batch_size=batch_size, pipelined=pipelined, report=report)
+        if sink.length:
             logger.info("Voice cloning completed, returning audio data in memory")
-            return final_audio, sr
+            return audio_data, sr
         else:
             # Return empty audio if no segments were generated
-            return np.array([]), 22050
\ No newline at end of file
+            return np.array([]), 22050
@@ -0,0 +1,639 @@
+"""
+Multi-replica inference pool.
+
+``EnginePool`` starts one worker process per replica, each with its own
+``Qwen3TTSInnoFrance`` pinned to a device string (``cuda:0``, ``cuda:1`` or
+``cpu`` with a thread budget), so several generations run at once. Replica
+engines are built through the process-wide engine registry, so they get the
+same priority and micro-batching schedulers as an in-process engine. Requests
+are dispatched by ``LeastLoadedRouter`` to the replica with the fewest
+requests in flight. Requests for the same voice prefer the replica that
+served that voice last, because its voice clone prompt and designed
+reference voice are already cached there, unless that replica is busier
+than the least loaded one by more than ``affinity_slack`` requests.
+
+The pool exposes ``render_voice_design`` and ``render_voice_clone`` with
+the engine's signatures. Each replica talks to this process over its own
+pipe. Audio is rendered into a ``multiprocessing.shared_memory`` segment in
+the replica; only the segment handle crosses the pipe, and the caller's
+sink reads the segment in place. Callers that track progress (e.g. render
+jobs) get the replica's chunk count over the pipe as each chunk is written.
+A replica that exits while serving fails its in-flight requests with
+``WorkerCrashedError`` and is restarted.
+
+Each request carries the caller's priority class, client and remaining
+timeout (see app.priority). A replica serves up to ``engine_concurrency()``
+requests at once on its own threads, and its priority scheduler orders
+their model calls as it would in-process.
+
+With ``INFERENCE_WORKER=true`` and no device list, the pool runs a single
+replica on ``$DEVICE``. Inference then happens outside the web server
+process, so long generations do not hold the server's GIL and a model crash
+does not take the server down.
+"""
+import builtins
+import functools
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.priority import DeadlineExceededError, current_priority, request_priority
+from app.prompt_cache import hash_reference_audio, hash_voice_design
+from app.sinks import ProgressSink, SharedMemorySink, write_shared_audio
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplicaSpec:
+    """Device and CPU thread budget of one replica"""
+    device: str
+    threads: Optional[int] = None
+
+
+def replica_specs_from_env() -> List[ReplicaSpec]:
+    """
+    Build replica specs from ENGINE_POOL_DEVICES (or INFERENCE_WORKER) and ENGINE_POOL_CPU_THREADS
+
+    CPU replicas without an explicit thread budget share the machine's cores evenly.
+    """
+    devices = [d.strip() for d in os.environ.get("ENGINE_POOL_DEVICES", "").split(",") if d.strip()]
+    if not devices and os.environ.get("INFERENCE_WORKER", "false").lower() == "true":
+        devices = [os.environ.get("DEVICE", "cuda:0")]
+    cpu_replicas = sum(1 for d in devices if d == "cpu")
+    threads = os.environ.get("ENGINE_POOL_CPU_THREADS")
+    cpu_threads = int(threads) if threads else max(1, (os.cpu_count() or 1) // max(1, cpu_replicas))
+    return [ReplicaSpec(d, cpu_threads if d == "cpu" else None) for d in devices]
+
+
+def _speaker_voice_key(speaker_config: Dict) -> str:
+    """Return the identity of a speaker's reference voice, without decoding any audio"""
+    if 'ref_audio' in speaker_config:
+        ref_audio = speaker_config['ref_audio']
+        if isinstance(ref_audio, str):
+            # Uploads are saved under fresh temp names, so a local file is named by its content
+            if os.path.isfile(ref_audio):
+                with open(ref_audio, "rb") as f:
+                    audio_id = hashlib.sha256(f.read()).hexdigest()
+            else:
+                audio_id = hashlib.sha256(ref_audio.encode("utf-8")).hexdigest()
+        else:
+            audio_id = hash_reference_audio(np.asarray(ref_audio[0]), int(ref_audio[1]))
+        x_vector_only_mode = bool(speaker_config.get('x_vector_only_mode', False))
+        ref_text = speaker_config.get('ref_text', '')
+        ref_text_file = speaker_config.get('ref_text_file')
+        if ref_text_file and not x_vector_only_mode:
+            try:
+                with open(ref_text_file, 'r', encoding='utf-8') as f:
+                    ref_text = f.read().strip()
+            except OSError:
+                ref_text = ref_text_file
+        # Same fields as the prompt cache key, ref_text is ignored in x-vector-only mode
+        return "\x1f".join(["audio", audio_id, str(x_vector_only_mode), "" if x_vector_only_mode else ref_text])
+    if 'design_text' in speaker_config and 'design_instruct' in speaker_config:
+        return "design\x1f" + hash_voice_design(
+            speaker_config['design_text'],
+            speaker_config['design_instruct'],
+            speaker_config.get('language', 'English'),
+            speaker_config.get('design_seed', int(os.environ.get("DESIGN_SEED", "0"))),
+        )
+    return "unknown"
+
+
+def voice_affinity_key(speaker_configs: List[Dict]) -> str:
+    """
+    Return a key identifying the voices of a request
+
+    The key covers what the replica caches per voice: the reference audio
+    content, transcript and clone mode, or the voice design. Other speaker
+    fields and the speaker order do not change it.
+    """
+    voices = sorted({_speaker_voice_key(speaker_config) for speaker_config in speaker_configs})
+    return hashlib.sha256("\n".join(voices).encode("utf-8")).hexdigest()
+
+
+class LeastLoadedRouter:
+    """Picks the replica with the fewest requests in flight, honouring voice affinity"""
+
+    def __init__(self, replicas: int, affinity_slack: int = 1, max_affinity_entries: int = 4096):
+        """
+        Initialize LeastLoadedRouter
+
+        Args:
+            replicas: Number of replicas
+            affinity_slack: Extra in-flight requests tolerated on the affinity replica
+            max_affinity_entries: Voices remembered, least recently used are forgotten
+        """
+        self.loads = [0] * replicas
+        self.available = [True] * replicas
+        self.affinity_slack = affinity_slack
+        self.max_affinity_entries = max_affinity_entries
+        self._affinity: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.affinity_hits = 0
+        self.affinity_misses = 0
+
+    def acquire(self, key: Optional[str] = None) -> int:
+        """
+        Choose a replica for a request and count it as in flight
+
+        Args:
+            key: Affinity key of the request, None for no affinity
+
+        Returns:
+            Replica index
+        """
+        with self._lock:
+            candidates = [i for i, ok in enumerate(self.available) if ok]
+            if not candidates:
+                raise RuntimeError("No engine replica available")
+            index = min(candidates, key=lambda i: self.loads[i])
+            if key is not None:
+                preferred = self._affinity.get(key)
+                if preferred is not None and self.available[preferred] and self.loads[preferred] <= self.loads[index] + self.affinity_slack:
+                    index = preferred
+                    self.affinity_hits += 1
+                else:
+                    self.affinity_misses += 1
+                self._affinity[key] = index
+                self._affinity.move_to_end(key)
+                if len(self._affinity) > self.max_affinity_entries:
+                    self._affinity.popitem(last=False)
+            self.loads[index] += 1
+            return index
+
+    def release(self, index: int) -> None:
+        """Mark one request of a replica as finished"""
+        with self._lock:
+            self.loads[index] -= 1
+
+    def set_available(self, index: int, available: bool) -> None:
+        """Include or exclude a replica from routing"""
+        with self._lock:
+            self.available[index] = available
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": list(self.loads),
+                "affinity_entries": len(self._affinity),
+                "affinity_hits": self.affinity_hits,
+                "affinity_misses": self.affinity_misses,
+            }
+
+
+def _default_factory(device: str):
+    """Build an engine through the registry and warm it (see app.warmup), so a replica reports ready only once it is warm"""
+    from app.engine_registry import DEFAULT_ENGINE, registry
+    from app.warmup import FAILED, Warmup
+
+    registry.configure(DEFAULT_ENGINE, device=device)
+    engine = registry.get(DEFAULT_ENGINE)
+    warmup = Warmup.from_env()
+    warmup.run(engine)
+    if warmup.state == FAILED:
+        raise RuntimeError(f"Warmup failed: {warmup.error}")
+    return engine
+
+
+def _render_shared(render: Callable[..., Any], on_chunk: Optional[Callable[[int], None]] = None, **kwargs) -> Any:
+    """Call an engine render method with a fresh shared memory sink, freeing the segment on failure"""
+    sink = SharedMemorySink() if on_chunk is None else ProgressSink(SharedMemorySink(), on_chunk)
+    try:
+        return render(sink=sink, **kwargs)
+    except Exception:
+        try:
+            sink.abort()
+        except FileNotFoundError:
+            pass  # Already aborted by the engine
+        raise
+
+
+def _op_design(engine, text: str, language: str, instruct: str, speed: float = 1.0) -> Dict[str, Any]:
+    return _render_shared(engine.render_voice_design, text=text, language=language, instruct=instruct, speed=speed)
+
+
+def _op_clone(engine, text: Union[str, List[str]], speaker_configs: List[Dict], speed: float = 1.0,
+              batch_size: Optional[int] = None, on_chunk: Optional[Callable[[int], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    report = {}
+    handle = _render_shared(engine.render_voice_clone, on_chunk=on_chunk, text=text, speaker_configs=speaker_configs, speed=speed,
+                            batch_size=batch_size, report=report)
+    return handle, report
+
+
+_OPS = {"design": _op_design, "clone": _op_clone}
+
+
+def _send_progress(send: Callable[[Tuple], None], request_id: int, chunks_done: int) -> None:
+    send(("progress", request_id, chunks_done))
+
+
+def _serve_request(engine, send: Callable[[Tuple], None], request_id: int, op: str, priority: Tuple[str, str, Optional[float]],
+                   kwargs: Dict[str, Any]) -> None:
+    """Run one request under the caller's priority and send its result"""
+    priority_class, client, timeout = priority
+    if kwargs.pop("progress", False):
+        kwargs["on_chunk"] = functools.partial(_send_progress, send, request_id)
+    try:
+        with request_priority(priority_class, client=client, timeout=timeout):
+            result = ("result", request_id, True, _OPS[op](engine, **kwargs))
+    except Exception as e:
+        # Exceptions are sent by name, not every exception type can be pickled
+        result = ("result", request_id, False, (type(e).__name__, str(e)))
+    send(result)
+
+
+def _replica_main(index: int, spec: ReplicaSpec, factory: Callable[[str], Any], conn) -> None:
+    """
+    Worker process loop: build the engine, then serve requests until a None sentinel
+
+    Audio is rendered into shared memory segments, only their handles go through the pipe.
+    Requests render on engine_concurrency() threads, which share the pipe under a lock.
+    """
+    from app.concurrency import engine_concurrency
+
+    if spec.threads:
+        # Set before torch creates its thread pools
+        os.environ["OMP_NUM_THREADS"] = str(spec.threads)
+        import torch
+        torch.set_num_threads(spec.threads)
+    try:
+        engine = factory(spec.device)
+    except Exception as e:
+        conn.send(("failed", (type(e).__name__, str(e))))
+        return
+    send_lock = threading.Lock()
+
+    def send(message: Tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    send(("ready", os.getpid()))
+    executor = ThreadPoolExecutor(max_workers=engine_concurrency(), thread_name_prefix=f"replica-{index}")
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            return
+        if item is None:
+            return
+        executor.submit(_serve_request, engine, send, *item)
+
+
+# Exceptions raised in replicas that callers handle by type, besides the built-in ones
+_EXCEPTIONS = {"DeadlineExceededError": DeadlineExceededError}
+
+
+def _rebuild_exception(error: Tuple[str, str]) -> Exception:
+    name, message = error
+    exc_type = _EXCEPTIONS.get(name) or getattr(builtins, name, None)
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        return exc_type(message)
+    return RuntimeError(f"{name}: {message}")
+
+
+def _free_result(payload: Any) -> None:
+    """Free the shared memory segment of a result nobody is waiting for"""
+    from multiprocessing import shared_memory
+
+    handle = payload[0] if isinstance(payload, tuple) else payload
+    if isinstance(handle, dict) and "name" in handle:
+        try:
+            shm = shared_memory.SharedMemory(name=handle["name"])
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class WorkerCrashedError(RuntimeError):
+    """A replica process exited while a request was in flight"""
+
+
+class _Replica:
+    def __init__(self, index: int, spec: ReplicaSpec):
+        self.index = index
+        self.spec = spec
+        self.process = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.pid: Optional[int] = None
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self.completed = 0
+        self.failed = 0
+        self.crashes = 0
+
+
+class EnginePool:
+    """Runs engine replicas in worker processes behind a least-loaded router"""
+
+    def __init__(self, specs: List[ReplicaSpec], factory: Callable[[str], Any] = _default_factory, affinity_slack: int = 1,
+                 poll_interval: float = 0.5):
+        """
+        Initialize EnginePool
+
+        Args:
+            specs: One spec per replica
+            factory: Picklable callable building an engine for a device string in the worker process
+            affinity_slack: Extra in-flight requests tolerated on a voice's affinity replica
+            poll_interval: Seconds between checks for a stop request in the I/O thread
+        """
+        if not specs:
+            raise ValueError("An engine pool needs at least one replica")
+        self.specs = specs
+        self.factory = factory
+        self.poll_interval = poll_interval
+        self.router = LeastLoadedRouter(len(specs), affinity_slack=affinity_slack)
+        # Spawned workers do not inherit CUDA state or locks held by other threads
+        self._context = multiprocessing.get_context("spawn")
+        self._replicas = [_Replica(i, spec) for i, spec in enumerate(specs)]
+        self._pending: Dict[int, Tuple[Future, int]] = {}
+        # Chunk progress callbacks of pending requests
+        self._progress: Dict[int, Callable[[int], None]] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._io_thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EnginePool":
+        """Start the worker processes; engines are built in the background"""
+        with self._start_lock:
+            if self._io_thread is not None:
+                return self
+            self._stopping.clear()
+            for replica in self._replicas:
+                self._spawn(replica)
+            self._io_thread = threading.Thread(target=self._serve, name="engine-pool-io", daemon=True)
+            self._io_thread.start()
+        return self
+
+    def _spawn(self, replica: _Replica) -> None:
+        # One pipe per replica: a worker dying mid-write cannot corrupt a channel shared with the others
+        parent_conn, child_conn = self._context.Pipe()
+        replica.ready.clear()
+        replica.conn = parent_conn
+        replica.process = self._context.Process(
+            target=_replica_main,
+            args=(replica.index, replica.spec, self.factory, child_conn),
+            name=f"engine-replica-{replica.index}",
+            daemon=True,
+        )
+        replica.process.start()
+        child_conn.close()
+        logger.info(f"Started engine replica {replica.index} on {replica.spec.device}"
+                    + (f" with {replica.spec.threads} threads" if replica.spec.threads else ""))
+
+    @property
+    def ready(self) -> bool:
+        return all(replica.ready.is_set() for replica in self._replicas)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every replica has built its engine"""
+        return all(replica.ready.wait(timeout) for replica in self._replicas)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the worker processes and fail requests still in flight"""
+        self._stopping.set()
+        if self._io_thread is not None:
+            self._io_thread.join(timeout)
+            self._io_thread = None
+        for replica in self._replicas:
+            if replica.process is None:
+                continue
+            try:
+                with replica.send_lock:
+                    replica.conn.send(None)
+            except OSError:
+                pass
+            replica.process.join(timeout)
+            if replica.process.is_alive():
+                replica.process.terminate()
+            replica.process = None
+            replica.conn.close()
+            replica.ready.clear()
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._progress = {}
+        for future, index in pending.values():
+            self.router.release(index)
+            future.set_exception(RuntimeError("Engine pool stopped"))
+
+    def _serve(self) -> None:
+        """Receive results and watch for replicas exiting, restarting replicas that crash"""
+        while not self._stopping.is_set():
+            waitables = {}
+            for replica in self._replicas:
+                if replica.process is not None:
+                    waitables[replica.conn] = replica
+                    waitables[replica.process.sentinel] = replica
+            if not waitables:
+                self._stopping.wait(self.poll_interval)
+                continue
+            for ready in multiprocessing.connection.wait(list(waitables), timeout=self.poll_interval):
+                replica = waitables[ready]
+                if replica.process is None:
+                    continue
+                if ready is replica.conn:
+                    try:
+                        self._handle(replica, replica.conn.recv())
+                    except (EOFError, OSError):
+                        pass  # The exit is handled through the process sentinel
+                elif not self._stopping.is_set():
+                    # Deliver results sent just before the exit, then restart
+                    while replica.conn.poll():
+                        try:
+                            self._handle(replica, replica.conn.recv())
+                        except (EOFError, OSError):
+                            break
+                    self._on_exit(replica)
+
+    def _handle(self, replica: _Replica, message: Tuple) -> None:
+        kind = message[0]
+        if kind == "ready":
+            replica.pid = message[1]
+            replica.error = None
+            replica.ready.set()
+            self.router.set_available(replica.index, True)
+            logger.info(f"Engine replica {replica.index} ready (pid {replica.pid})")
+        elif kind == "failed":
+            replica.error = f"{message[1][0]}: {message[1][1]}"
+            self.router.set_available(replica.index, False)
+            logger.error(f"Engine replica {replica.index} failed to start: {replica.error}")
+            self._fail_pending(replica.index, RuntimeError(f"Engine replica {replica.index} failed to start: {replica.error}"))
+        elif kind == "progress":
+            _, request_id, chunks_done = message
+            with self._pending_lock:
+                on_progress = self._progress.get(request_id)
+            if on_progress is not None:
+                try:
+                    on_progress(chunks_done)
+                except Exception as e:
+                    logger.warning(f"Progress callback of request {request_id} failed: {e}")
+        else:
+            _, request_id, ok, payload = message
+            with self._pending_lock:
+                future, _ = self._pending.pop(request_id, (None, None))
+                self._progress.pop(request_id, None)
+            if future is None:
+                if ok:
+                    _free_result(payload)
+                return
+            self.router.release(replica.index)
+            if ok:
+                replica.completed += 1
+                future.set_result(payload)
+            else:
+                replica.failed += 1
+                future.set_exception(_rebuild_exception(payload))
+
+    def _on_exit(self, replica: _Replica) -> None:
+        """Fail the requests of a replica that exited and restart it if it had been serving"""
+        replica.process.join()
+        exitcode = replica.process.exitcode
+        was_ready = replica.ready.is_set()
+        replica.process = None
+        replica.conn.close()
+        replica.ready.clear()
+        self.router.set_available(replica.index, False)
+        if not was_ready:
+            # Died while building its engine: restarting would most likely fail the same way
+            replica.error = replica.error or f"Exited with code {exitcode} during startup"
+            self._fail_pending(replica.index, RuntimeError(f"Engine replica {replica.index} failed to start: {replica.error}"))
+            return
+        replica.crashes += 1
+        failed = self._fail_pending(replica.index, WorkerCrashedError(
+            f"Engine replica {replica.index} (pid {replica.pid}) exited with code {exitcode} during the request"))
+        logger.error(f"Engine replica {replica.index} exited with code {exitcode}, failed {failed} in-flight request(s), restarting")
+        self._spawn(replica)
+
+    def _fail_pending(self, index: int, error: Exception) -> int:
+        """Fail the requests queued on one replica"""
+        with self._pending_lock:
+            failed = [request_id for request_id, (_, i) in self._pending.items() if i == index]
+            futures = [self._pending.pop(request_id)[0] for request_id in failed]
+            for request_id in failed:
+                self._progress.pop(request_id, None)
+        for future in futures:
+            self.router.release(index)
+            self._replicas[index].failed += 1
+            future.set_exception(error)
+        return len(futures)
+
+    def submit(self, op: str, affinity_key: Optional[str] = None, on_progress: Optional[Callable[[int], None]] = None, **kwargs) -> Future:
+        """
+        Queue one request on the least loaded replica, with the caller's request priority
+
+        Args:
+            op: "design" or "clone"
+            affinity_key: Key of the voices used, see voice_affinity_key
+            on_progress: Called on the pool's I/O thread with the chunks written so far ("clone" only)
+            **kwargs: Arguments of the operation
+
+        Returns:
+            Future resolving to the operation result
+        """
+        self.start()
+        caller = current_priority()
+        # Deadlines travel as the time left, monotonic clocks are not comparable across processes
+        timeout = None if caller.deadline is None else max(0.001, caller.deadline - time.monotonic())
+        priority = (caller.priority_class, caller.client, timeout)
+        index = self.router.acquire(affinity_key)
+        replica = self._replicas[index]
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = (future, index)
+            if on_progress is not None:
+                self._progress[request_id] = on_progress
+                kwargs["progress"] = True
+        try:
+            with replica.send_lock:
+                replica.conn.send((request_id, op, priority, kwargs))
+        except (OSError, AttributeError):
+            # The replica exited between routing and sending; its requests are failed on exit
+            with self._pending_lock:
+                pending = self._pending.pop(request_id, None)
+                self._progress.pop(request_id, None)
+            if pending is not None:
+                self.router.release(index)
+                future.set_exception(WorkerCrashedError(f"Engine replica {index} is not running"))
+        return future
+
+    def render_voice_design(self, text: str, language: str, instruct: str, sink: Any, speed: float = 1.0) -> Any:
+        """Render a voice design on a replica into a local sink, see Qwen3TTSInnoFrance.render_voice_design"""
+        handle = self.submit("design", text=text, language=language, instruct=instruct, speed=speed).result()
+        write_shared_audio(handle, sink)
+        return sink.close()
+
+    def render_voice_clone(self, text: Union[str, Iterable[str]], speaker_configs: List[Dict], sink: Any, speed: float = 1.0,
+                           batch_size: Optional[int] = None, report: Optional[Dict[str, Any]] = None,
+                           on_chunk: Optional[Callable[[int], None]] = None) -> Any:
+        """
+        Render a voice clone on a replica into a local sink, see Qwen3TTSInnoFrance.render_voice_clone
+
+        The replica hands over the finished audio at once, so the sink sees a single write.
+        on_chunk is called with the number of chunks the replica has written so far, as it writes them.
+        """
+        # Line iterators (e.g. uploaded files) cannot cross the process boundary
+        if not isinstance(text, str):
+            text = list(text)
+        future = self.submit("clone", affinity_key=voice_affinity_key(speaker_configs), text=text,
+                             speaker_configs=speaker_configs, speed=speed, batch_size=batch_size, on_progress=on_chunk)
+        handle, replica_report = future.result()
+        if report is not None:
+            report.update(replica_report)
+        write_shared_audio(handle, sink)
+        return sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state and load of every replica and the router's affinity counters"""
+        router = self.router.stats()
+        return {
+            "replicas": [
+                {
+                    "index": replica.index,
+                    "device": replica.spec.device,
+                    "threads": replica.spec.threads,
+                    "pid": replica.pid,
+                    "ready": replica.ready.is_set(),
+                    "alive": replica.process is not None and replica.process.is_alive(),
+                    "error": replica.error,
+                    "in_flight": router["in_flight"][replica.index],
+                    "completed": replica.completed,
+                    "failed": replica.failed,
+                    "crashes": replica.crashes,
+                }
+                for replica in self._replicas
+            ],
+            "affinity_hits": router["affinity_hits"],
+            "affinity_misses": router["affinity_misses"],
+            "affinity_entries": router["affinity_entries"],
+        }
+
+
+_pool: Optional[EnginePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[EnginePool]:
+    """Return the process-wide engine pool configured by the environment, None if not configured"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            specs = replica_specs_from_env()
+            if specs:
+                _pool = EnginePool(specs)
+        return _pool
@@ -0,0 +1,196 @@
+"""
+Process-wide registry of TTS engines.
+
+The FastAPI API and web UI routers, the Flask API and the MCP server all
+resolve their engine through this registry, so front ends mounted in one
+process share one copy of the models instead of loading one copy each.
+
+Engines are described by named configurations. The ``default`` configuration
+uses ``$DEVICE``; further configurations can be given as JSON in
+``$TTS_ENGINES``, for example::
+
+    TTS_ENGINES='{"gpu1": {"device": "cuda:1"}, "cpu": {"device": "cpu", "lazy_load": true}}'
+
+Engines are created on first use and keyed by their configuration, so two
+names with the same configuration share a single engine. The process-wide
+registry attaches the priority scheduler and, if enabled, the micro-batching
+scheduler to every engine it creates, including those of engine pool
+replicas.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+from app.assembly import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = "default"
+
+_CONFIG_KEYS = ("device", "lazy_load", "prompt_store_dir")
+
+EngineKey = Tuple[Tuple[str, Any], ...]
+
+
+def engine_key(config: Dict[str, Any]) -> EngineKey:
+    """Return the hashable key of an engine configuration"""
+    unknown = set(config) - set(_CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown engine configuration keys: {', '.join(sorted(unknown))}")
+    return tuple(sorted(config.items()))
+
+
+def _default_factory(config: Dict[str, Any]):
+    from app.core import Qwen3TTSInnoFrance
+
+    return Qwen3TTSInnoFrance(**config)
+
+
+class EngineRegistry:
+    """Named engine configurations and the engines shared by every front end"""
+
+    def __init__(self, factory: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Initialize EngineRegistry
+
+        Args:
+            factory: Callable building an engine from a configuration dict,
+                default builds a Qwen3TTSInnoFrance
+        """
+        self.factory = factory or _default_factory
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._engines: Dict[EngineKey, Any] = {}
+        self._lock = threading.Lock()
+        self._setup_hooks = []
+
+    def configure(self, name: str, **config) -> None:
+        """
+        Add or replace a named engine configuration
+
+        Args:
+            name: Engine name
+            **config: Qwen3TTSInnoFrance arguments (device, lazy_load, prompt_store_dir)
+        """
+        engine_key(config)
+        with self._lock:
+            self._configs[name] = dict(config)
+
+    def configure_from_env(self) -> None:
+        """Load the default configuration from $DEVICE and named ones from $TTS_ENGINES"""
+        self.configure(DEFAULT_ENGINE, device=os.environ.get("DEVICE", "cuda:0"))
+        engines = os.environ.get("TTS_ENGINES")
+        if engines:
+            for name, config in json.loads(engines).items():
+                self.configure(name, **config)
+
+    def add_setup_hook(self, hook: Callable[[Any], None]) -> None:
+        """
+        Run a callable on every engine once, right after it is created
+
+        Hooks added after an engine was created are run on it immediately.
+        """
+        with self._lock:
+            self._setup_hooks.append(hook)
+            engines = list(self._engines.values())
+        for engine in engines:
+            hook(engine)
+
+    def get(self, name: str = DEFAULT_ENGINE) -> Any:
+        """
+        Return the engine of a named configuration, creating it on first use
+
+        Args:
+            name: Engine name
+
+        Returns:
+            Engine shared by every configuration with the same settings
+        """
+        if not self._configs:
+            self.configure_from_env()
+        with self._lock:
+            config = self._configs.get(name)
+            if config is None:
+                raise KeyError(f"Unknown engine: {name}")
+            key = engine_key(config)
+            engine = self._engines.get(key)
+            if engine is None:
+                # Created under the lock so concurrent first requests do not load the models twice
+                engine = self.factory(dict(config))
+                for hook in self._setup_hooks:
+                    hook(engine)
+                self._engines[key] = engine
+                logger.info(f"TTS engine '{name}' initialized ({len(self._engines)} engine(s) in process)")
+            return engine
+
+    def peek(self, name: str = DEFAULT_ENGINE) -> Optional[Any]:
+        """Return the engine of a named configuration if it was created, without creating it"""
+        config = self._configs.get(name)
+        return None if config is None else self._engines.get(engine_key(config))
+
+    def engines(self) -> List[Any]:
+        """Return every engine created in this process"""
+        with self._lock:
+            return list(self._engines.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the engines in this process, their configurations and memory"""
+        engines = []
+        total_model_bytes = 0
+        with self._lock:
+            items = list(self._engines.items())
+            configs = dict(self._configs)
+        for key, engine in items:
+            models = engine.models.stats()["models"] if hasattr(engine, "models") else {}
+            model_bytes = sum(model["bytes"] for model in models.values())
+            total_model_bytes += model_bytes
+            engines.append({
+                "names": [name for name, config in configs.items() if engine_key(config) == key],
+                "config": dict(key),
+                "model_bytes": model_bytes,
+                "models": {name: model["state"] for name, model in models.items()},
+            })
+        stats = {
+            "engine_count": len(engines),
+            "configured": sorted(configs),
+            "model_bytes": total_model_bytes,
+            "rss_bytes": current_rss_bytes(),
+            "engines": engines,
+        }
+        if torch.cuda.is_available():
+            stats["cuda_allocated_bytes"] = torch.cuda.memory_allocated()
+        return stats
+
+
+def attach_scheduler(engine) -> None:
+    """Merge concurrent requests into batched model calls"""
+    from app.scheduler import MicroBatchScheduler
+
+    if os.environ.get("MICROBATCH_ENABLED", "false").lower() == "true" and engine.scheduler is None:
+        engine.scheduler = MicroBatchScheduler(
+            engine,
+            profile=os.environ.get("MICROBATCH_PROFILE", "latency"),
+            max_wait_ms=float(os.environ["MICROBATCH_MAX_WAIT_MS"]) if os.environ.get("MICROBATCH_MAX_WAIT_MS") else None,
+            max_batch_size=int(os.environ["MICROBATCH_MAX_BATCH_SIZE"]) if os.environ.get("MICROBATCH_MAX_BATCH_SIZE") else None,
+        ).start()
+
+
+def attach_priority(engine) -> None:
+    """Let interactive requests take the engine between the chunks of long renders"""
+    from app.priority import PriorityScheduler
+
+    if os.environ.get("PRIORITY_SCHEDULING", "true").lower() == "true" and engine.priority is None:
+        engine.priority = PriorityScheduler()
+
+
+registry = EngineRegistry()
+registry.add_setup_hook(attach_scheduler)
+registry.add_setup_hook(attach_priority)
+
+
+def get_engine(name: str = DEFAULT_ENGINE) -> Any:
+    """Return the process-wide engine of a named configuration"""
+    return registry.get(name)
@@ -0,0 +1,403 @@
+"""
+Asynchronous render jobs backed by a local SQLite database.
+
+Long voice clone renders are submitted as jobs instead of being rendered
+inside one HTTP request. ``JobStore`` keeps jobs in ``<root>/jobs.sqlite3``
+and finished audio in ``<root>/results/<job_id>.wav``. ``JobRunner`` drains
+queued jobs with a bounded number of worker threads, records progress
+(chunks done out of the chunks in the synthesis plan, and an ETA), and
+deletes finished jobs and their results once their TTL has passed.
+
+Jobs survive a restart: jobs that were running when the process stopped
+are queued again and rendered from the start, up to ``max_attempts``
+attempts, so a job that keeps taking the process down ends up failed. With the utterance cache
+enabled (``UTTERANCE_CACHE_DIR``), the chunks rendered before the restart
+are read back from the cache.
+
+With ``result_format="tokens"`` results are stored as speech codec tokens
+(``<job_id>.qtc``, see ``app.codec_tokens``), far smaller than WAV, and
+``decode_token_result`` turns them back into WAV when they are downloaded.
+Jobs rendered by engine pool replicas are still stored as WAV: encoding
+needs the clone model, which only the replicas load.
+"""
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.codec_tokens import SpeechTokenCodec, iter_token_records
+from app.engine_pool import EnginePool
+from app.planner import plan_settings_from_env, plan_voice_clone
+from app.priority import BATCH, request_priority
+from app.sinks import FileSink, ProgressSink, TokenFileSink, WavStreamSink
+from app.tracing import start_trace, write_trace_log
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+RESULT_FORMATS = ("wav", "tokens")
+TOKEN_RESULT_SUFFIX = ".qtc"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    chunks_total INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result_path TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+"""
+
+
+class JobStore:
+    """Jobs in a SQLite database and their results in a directory"""
+
+    def __init__(self, root_dir: str):
+        """
+        Initialize JobStore
+
+        Args:
+            root_dir: Directory holding the database and the results directory, created if missing
+        """
+        self.root_dir = root_dir
+        self.results_dir = os.path.join(root_dir, "results")
+        self.db_path = os.path.join(root_dir, "jobs.sqlite3")
+        os.makedirs(self.results_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived autocommit connection per operation, so the store can be used from any thread
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _row(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def result_path(self, job_id: str, suffix: str = ".wav") -> str:
+        return os.path.join(self.results_dir, f"{job_id}{suffix}")
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        """
+        Queue a job
+
+        Args:
+            kind: Job kind, e.g. "voice_clone"
+            params: JSON-serializable render parameters
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, state, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), QUEUED, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            return self._row(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, None if the queue is empty"""
+        with self._connect() as conn:
+            # The write lock is taken up front so two workers cannot claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT * FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1", (QUEUED,)).fetchone()
+                now = time.time()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, started_at = ?, attempts = attempts + 1, chunks_done = 0 WHERE id = ?",
+                        (RUNNING, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._row(row)
+        job.update(state=RUNNING, started_at=now, attempts=job["attempts"] + 1, chunks_done=0)
+        return job
+
+    def update_progress(self, job_id: str, chunks_done: int, chunks_total: Optional[int] = None) -> None:
+        with self._connect() as conn:
+            if chunks_total is None:
+                conn.execute("UPDATE jobs SET chunks_done = ? WHERE id = ?", (chunks_done, job_id))
+            else:
+                conn.execute("UPDATE jobs SET chunks_done = ?, chunks_total = ? WHERE id = ?", (chunks_done, chunks_total, job_id))
+
+    def finish(self, job_id: str, result_path: str, chunks_done: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, result_path = ?, chunks_done = ?, "
+                "chunks_total = COALESCE(chunks_total, ?) WHERE id = ?",
+                (DONE, time.time(), result_path, chunks_done, chunks_done, job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE id = ?", (FAILED, time.time(), error, job_id))
+
+    def requeue_running(self, max_attempts: Optional[int] = None) -> int:
+        """
+        Queue jobs left running by a previous process again
+
+        Args:
+            max_attempts: Jobs that already had this many attempts are marked failed instead, None retries forever
+
+        Returns:
+            Number of requeued jobs
+        """
+        with self._connect() as conn:
+            if max_attempts is not None:
+                failed = conn.execute(
+                    "UPDATE jobs SET state = ?, finished_at = ?, error = ? WHERE state = ? AND attempts >= ?",
+                    (FAILED, time.time(), f"Gave up after {max_attempts} interrupted attempts", RUNNING, max_attempts),
+                ).rowcount
+                if failed:
+                    logger.warning(f"Failed {failed} interrupted jobs that reached {max_attempts} attempts")
+            return conn.execute("UPDATE jobs SET state = ?, chunks_done = 0 WHERE state = ?", (QUEUED, RUNNING)).rowcount
+
+    def cleanup(self, ttl: float, now: Optional[float] = None) -> int:
+        """
+        Delete finished jobs and their results once their TTL has passed
+
+        Args:
+            ttl: Seconds a finished job is kept
+            now: Current time.time() value, for tests
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = (time.time() if now is None else now) - ttl
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, result_path FROM jobs WHERE state IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff)
+            ).fetchall()
+            for row in rows:
+                if row["result_path"] and os.path.exists(row["result_path"]):
+                    os.unlink(row["result_path"])
+                conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        if rows:
+            logger.info(f"Deleted {len(rows)} expired jobs")
+        return len(rows)
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {row["state"]: row["n"] for row in conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+
+
+def job_status(job: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Return the public status of a job, with progress and an ETA while it runs
+
+    The ETA extrapolates the time per chunk so far to the remaining chunks.
+    """
+    now = time.time() if now is None else now
+    done, total = job["chunks_done"], job["chunks_total"]
+    eta = None
+    if job["state"] == RUNNING and total and done:
+        eta = round((now - job["started_at"]) / done * (total - done), 1)
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "state": job["state"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "progress": {"chunks_done": done, "chunks_total": total, "fraction": round(done / total, 3) if total else None},
+        "eta_seconds": eta,
+        "attempts": job["attempts"],
+        "error": job["error"],
+    }
+
+
+def decode_token_result(path: str, codec: SpeechTokenCodec) -> io.BytesIO:
+    """
+    Decode a token job result into WAV bytes
+
+    Args:
+        path: Token result path (.qtc)
+        codec: Codec used to decode the tokens
+
+    Returns:
+        BytesIO holding the WAV file, rewound to the start
+    """
+    sink = WavStreamSink()
+    with open(path, "rb") as f:
+        # One record per rendered chunk, decoded one at a time
+        for codes, sample_rate, samples in iter_token_records(f):
+            sink.write(codec.decode(codes, samples, sample_rate), sample_rate)
+    return sink.close()
+
+
+class JobRunner:
+    """Renders queued jobs with a bounded number of worker threads"""
+
+    def __init__(self, store: JobStore, renderer: Callable[[], Any], workers: int = 1, ttl: float = 86400.0,
+                 poll_interval: float = 1.0, progress_interval: float = 1.0, priority_class: str = BATCH,
+                 result_format: str = "wav", max_attempts: int = 3):
+        """
+        Initialize JobRunner
+
+        Args:
+            store: Job store
+            renderer: Callable returning the engine (or engine pool) that renders jobs
+            workers: Number of jobs rendered at the same time
+            ttl: Seconds finished jobs and their results are kept
+            poll_interval: Seconds between queue checks of an idle worker
+            progress_interval: Minimum seconds between progress writes to the database
+            priority_class: Priority class of job renders when the engine has a priority scheduler
+            result_format: "wav" or "tokens" (speech codec tokens, decoded on download)
+            max_attempts: Attempts of a job interrupted by restarts before it is marked failed
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown job result format {result_format}. Choose from {list(RESULT_FORMATS)}")
+        self.store = store
+        self.renderer = renderer
+        self.workers = workers
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.priority_class = priority_class
+        self.result_format = result_format
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "JobRunner":
+        """Queue jobs interrupted by a restart again and start the workers"""
+        if self._threads:
+            return self
+        requeued = self.store.requeue_running(self.max_attempts)
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs interrupted by a restart")
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current job"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        """Queue a job and wake an idle worker"""
+        job_id = self.store.create(kind, params)
+        self._wakeup.set()
+        return job_id
+
+    def _work(self) -> None:
+        last_cleanup = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() - last_cleanup > 60.0:
+                last_cleanup = time.monotonic()
+                try:
+                    self.store.cleanup(self.ttl)
+                except Exception as e:
+                    logger.error(f"Job cleanup failed: {e}")
+            job = self.store.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: Dict[str, Any]) -> None:
+        """Render one claimed job into its result file"""
+        job_id, params = job["id"], job["params"]
+        logger.info(f"Job {job_id} started (attempt {job['attempts']})")
+        partial_path = None
+        last_write = [0.0]
+        chunks_done = [0]
+
+        def on_chunk(done: int) -> None:
+            chunks_done[0] = done
+            now = time.monotonic()
+            if now - last_write[0] >= self.progress_interval:
+                last_write[0] = now
+                self.store.update_progress(job_id, done)
+
+        try:
+            renderer = self.renderer()
+            if job["kind"] != "voice_clone":
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            # The plan gives the chunk count for progress without any engine or model
+            plan = plan_voice_clone(params["text"], params["speaker_configs"], speed=params.get("speed", 1.0), **plan_settings_from_env())
+            self.store.update_progress(job_id, 0, len(plan.chunks))
+            codec = getattr(renderer, "token_codec", None) if self.result_format == "tokens" else None
+            if self.result_format == "tokens" and codec is None:
+                logger.warning(f"Job {job_id} is stored as WAV, engine pool replicas cannot store token results")
+            suffix = TOKEN_RESULT_SUFFIX if codec is not None else ".wav"
+            path = self.store.result_path(job_id, suffix)
+            partial_path = os.path.join(self.store.results_dir, f"{job_id}.partial{suffix}")
+            render_kwargs = {}
+            if isinstance(renderer, EnginePool):
+                # A replica hands over the finished render at once, its chunk progress comes back through the pool
+                sink = FileSink(partial_path)
+                render_kwargs["on_chunk"] = on_chunk
+            elif codec is not None:
+                sink = ProgressSink(TokenFileSink(partial_path, codec), on_chunk)
+            else:
+                sink = ProgressSink(FileSink(partial_path), on_chunk)
+            # All jobs share one fair share client, so they cannot crowd out other clients
+            with start_trace(f"job {job_id}") as trace, request_priority(self.priority_class, client="jobs"):
+                renderer.render_voice_clone(
+                    text=params["text"],
+                    speaker_configs=params["speaker_configs"],
+                    sink=sink,
+                    speed=params.get("speed", 1.0),
+                    **render_kwargs,
+                )
+            write_trace_log(trace, job_id=job_id)
+            # The result appears only once complete, a restart never serves a truncated file
+            os.replace(partial_path, path)
+            self.store.finish(job_id, path, chunks_done[0])
+            logger.info(f"Job {job_id} done")
+        except Exception as e:
+            if partial_path is not None and os.path.exists(partial_path):
+                os.unlink(partial_path)
+            self.store.fail(job_id, str(e))
+            logger.error(f"Job {job_id} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "ttl_seconds": self.ttl, "result_format": self.result_format, "jobs": self.store.counts()}
@@ -1,13 +1,38 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.webapp_fastapi import router as webapp_router
-from app.api_fastapi import router as api_router
+from app.api_fastapi import router as api_router, job_runner, warmup
+from app.engine_pool import get_pool
+from app.engine_registry import get_engine
+from app.metrics import HTTPMetricsMiddleware, metrics_response
+from app.tracing import TracingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /api/health answers while /api/ready reports 503
+    engine_pool = get_pool()
+    if engine_pool is not None:
+        engine_pool.start()
+    else:
+        warmup.start(get_engine)
+    # Resumes the jobs interrupted by the last shutdown
+    if job_runner is not None:
+        job_runner.start()
+    yield
+    if job_runner is not None:
+        job_runner.stop()
+    if engine_pool is not None:
+        engine_pool.stop()
+
 
 # Create main FastAPI app
-app = FastAPI(title="Qwen3-TTS Inno France", version="1.0.0")
+app = FastAPI(title="Qwen3-TTS Inno France", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for browser usage
 app.add_middleware(
@@ -18,6 +43,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and latencies per endpoint
+app.add_middleware(HTTPMetricsMiddleware)
+
+# Per-stage Server-Timing headers, trace log and opt-in profiling
+app.add_middleware(TracingMiddleware)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint"""
+    content, content_type = metrics_response()
+    return Response(content=content, media_type=content_type)
+
+
 # Include routers
 app.include_router(webapp_router)
 app.include_router(api_router, prefix="/api")
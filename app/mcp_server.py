@@ -5,37 +5,30 @@ import argparse
 import base64
 import io
 import json
-import os
 from pathlib import Path
 from typing import Optional
 
-import soundfile as sf
 from mcp.server.fastmcp import FastMCP
 
 from app.core import Qwen3TTSInnoFrance
-
-tts_engine = None
+from app.engine_registry import get_engine
+from app.sinks import WavStreamSink
 
 
 def _get_engine() -> Qwen3TTSInnoFrance:
-    global tts_engine
-    if tts_engine is None:
-        device = os.getenv("DEVICE", "cuda:0")
-        tts_engine = Qwen3TTSInnoFrance(device=device)
-    return tts_engine
+    # Shared with the other front ends in this process
+    return get_engine()
 
 
-def _encode_wav(audio_data, sample_rate: int) -> str:
-    buffer = io.BytesIO()
-    sf.write(buffer, audio_data, sample_rate, format="WAV")
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode("utf-8")
+def _encode_wav(wav_stream: io.BytesIO) -> str:
+    return base64.b64encode(wav_stream.getbuffer()).decode("utf-8")
 
 
-def _save_wav(audio_data, sample_rate: int, output_path: str) -> str:
+def _save_wav(wav_stream: io.BytesIO, output_path: str) -> str:
+    # Reuse the encoded WAV bytes instead of encoding the audio a second time
     path = Path(output_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    sf.write(str(path), audio_data, sample_rate)
+    path.write_bytes(wav_stream.getbuffer())
     return str(path)
 
 
@@ -57,20 +50,22 @@ def create_mcp(host: str, port: int) -> FastMCP:
         """
         try:
             engine = _get_engine()
-            audio_data, sample_rate = engine.voice_design_cli_in_memory(
+            sink = WavStreamSink()
+            wav_stream = engine.render_voice_design(
                 text=text,
                 language=language,
                 instruct=instruct,
+                sink=sink,
                 speed=speed,
             )
-            encoded = _encode_wav(audio_data, sample_rate)
+            encoded = _encode_wav(wav_stream)
             saved_path = None
             if output_path:
-                saved_path = _save_wav(audio_data, sample_rate, output_path)
+                saved_path = _save_wav(wav_stream, output_path)
             return {
                 "success": True,
                 "audio_base64": encoded,
-                "sample_rate": sample_rate,
+                "sample_rate": sink.sample_rate,
                 "output_path": saved_path,
             }
         except Exception as exc:
@@ -95,21 +90,23 @@ def create_mcp(host: str, port: int) -> FastMCP:
                 raise ValueError("Config must include text, language, and instruct")
 
             engine = _get_engine()
-            audio_data, sample_rate = engine.voice_design_cli_in_memory(
+            sink = WavStreamSink()
+            wav_stream = engine.render_voice_design(
                 text=text,
                 language=language,
                 instruct=instruct,
+                sink=sink,
                 speed=config.get("speed", 1.0),
             )
-            encoded = _encode_wav(audio_data, sample_rate)
+            encoded = _encode_wav(wav_stream)
             final_output = output_path or config.get("output_path")
             saved_path = None
             if final_output:
-                saved_path = _save_wav(audio_data, sample_rate, final_output)
+                saved_path = _save_wav(wav_stream, final_output)
             return {
                 "success": True,
                 "audio_base64": encoded,
-                "sample_rate": sample_rate,
+                "sample_rate": sink.sample_rate,
                 "output_path": saved_path,
             }
         except Exception as exc:
@@ -130,20 +127,25 @@ def create_mcp(host: str, port: int) -> FastMCP:
         try:
             speaker_configs = json.loads(speaker_configs_json)
             engine = _get_engine()
-            audio_data, sample_rate = engine.voice_clone_with_speakers_in_memory(
+            sink = WavStreamSink()
+            report = {}
+            wav_stream = engine.render_voice_clone(
                 text=text,
                 speaker_configs=speaker_configs,
+                sink=sink,
                 speed=speed,
+                report=report,
             )
-            encoded = _encode_wav(audio_data, sample_rate)
+            encoded = _encode_wav(wav_stream)
             saved_path = None
             if output_path:
-                saved_path = _save_wav(audio_data, sample_rate, output_path)
+                saved_path = _save_wav(wav_stream, output_path)
             return {
                 "success": True,
                 "audio_base64": encoded,
-                "sample_rate": sample_rate,
+                "sample_rate": sink.sample_rate,
                 "output_path": saved_path,
+                "utterance_cache": report.get("utterance_cache"),
             }
         except Exception as exc:
             return {"success": False, "error": f"Voice clone failed: {str(exc)}"}
@@ -161,23 +163,29 @@ def create_mcp(host: str, port: int) -> FastMCP:
         Returns base64 WAV data and optional output file path.
         """
         try:
-            text = Path(text_path).read_text(encoding="utf-8")
             speaker_configs = json.loads(Path(speaker_configs_path).read_text(encoding="utf-8"))
             engine = _get_engine()
-            audio_data, sample_rate = engine.voice_clone_with_speakers_in_memory(
-                text=text,
-                speaker_configs=speaker_configs,
-                speed=speed,
-            )
-            encoded = _encode_wav(audio_data, sample_rate)
+            sink = WavStreamSink()
+            report = {}
+            # The script is parsed line by line from the file
+            with open(text_path, "r", encoding="utf-8") as script_lines:
+                wav_stream = engine.render_voice_clone(
+                    text=script_lines,
+                    speaker_configs=speaker_configs,
+                    sink=sink,
+                    speed=speed,
+                    report=report,
+                )
+            encoded = _encode_wav(wav_stream)
             saved_path = None
             if output_path:
-                saved_path = _save_wav(audio_data, sample_rate, output_path)
+                saved_path = _save_wav(wav_stream, output_path)
             return {
                 "success": True,
                 "audio_base64": encoded,
-                "sample_rate": sample_rate,
+                "sample_rate": sink.sample_rate,
                 "output_path": saved_path,
+                "utterance_cache": report.get("utterance_cache"),
             }
         except Exception as exc:
             return {"success": False, "error": f"Voice clone failed: {str(exc)}"}
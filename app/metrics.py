@@ -0,0 +1,255 @@
+"""
+Prometheus metrics of the service.
+
+Three layers are covered:
+
+- HTTP: request counts and latencies per endpoint (``HTTPMetricsMiddleware``
+  for FastAPI, ``instrument_flask`` for Flask).
+- Model: generation latency per call and per chunk, real-time factor per
+  model and language, chunk counts and lengths, voice clone prompt creation
+  and model load times, recorded by the engine as it works.
+- Service state, read when scraped: inference queue depth, scheduler and
+  job queues, cache hit ratios, model residency and accelerator memory.
+  Process memory and CPU come from the default process collector.
+
+``metrics_response()`` renders everything in the Prometheus text format.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import torch
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets from a short design chunk to a multi-minute render
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+HTTP_REQUESTS = Counter("tts_http_requests_total", "HTTP requests", ["endpoint", "method", "status"])
+HTTP_LATENCY = Histogram("tts_http_request_duration_seconds", "HTTP request latency", ["endpoint", "method"], buckets=LATENCY_BUCKETS)
+
+GENERATION_LATENCY = Histogram("tts_generation_seconds", "Wall time of one generate call", ["model"], buckets=LATENCY_BUCKETS)
+CHUNK_LATENCY = Histogram("tts_chunk_generation_seconds", "Generation wall time per chunk (call time shared by its chunks)", ["model"], buckets=LATENCY_BUCKETS)
+CHUNKS = Counter("tts_chunks_total", "Text chunks generated", ["model"])
+CHUNK_CHARS = Histogram("tts_chunk_text_chars", "Characters per generated chunk", ["model"], buckets=(10, 25, 50, 100, 150, 200, 300, 500, 1000))
+CHUNK_AUDIO = Histogram("tts_chunk_audio_seconds", "Audio seconds per generated chunk", ["model"], buckets=(0.5, 1, 2, 5, 10, 20, 30, 60))
+AUDIO_SECONDS = Counter("tts_generated_audio_seconds_total", "Audio seconds generated", ["model", "language"])
+WALL_SECONDS = Counter("tts_generation_wall_seconds_total", "Wall seconds spent generating", ["model", "language"])
+REALTIME_FACTOR = Histogram("tts_realtime_factor", "Audio seconds per wall second of one generate call", ["model", "language"],
+                            buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32))
+PROMPT_CREATION = Histogram("tts_prompt_creation_seconds", "Voice clone prompt extraction time", buckets=LATENCY_BUCKETS)
+MODEL_LOAD = Histogram("tts_model_load_seconds", "Model load time", ["model"], buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+
+# Job runner reported at scrape time, set by the API service when jobs are enabled
+_job_runner = None
+
+
+def track_job_runner(runner: Any) -> None:
+    global _job_runner
+    _job_runner = runner
+
+
+def observe_generation(model: str, texts: List[str], languages: List[str], wavs: List[Any], sample_rate: int, seconds: float) -> None:
+    """
+    Record one generate call
+
+    Args:
+        model: "design" or "clone"
+        texts: Text of each chunk in the call
+        languages: Language of each chunk
+        wavs: Generated audio of each chunk
+        sample_rate: Sample rate of the audio
+        seconds: Wall time of the call
+    """
+    if not texts:
+        return
+    GENERATION_LATENCY.labels(model).observe(seconds)
+    CHUNKS.labels(model).inc(len(texts))
+    per_chunk = seconds / len(texts)
+    audio_by_language: Dict[str, float] = {}
+    for text, language, wav in zip(texts, languages, wavs):
+        duration = len(wav) / sample_rate
+        CHUNK_LATENCY.labels(model).observe(per_chunk)
+        CHUNK_CHARS.labels(model).observe(len(text))
+        CHUNK_AUDIO.labels(model).observe(duration)
+        audio_by_language[language] = audio_by_language.get(language, 0.0) + duration
+    total_audio = sum(audio_by_language.values())
+    for language, audio in audio_by_language.items():
+        AUDIO_SECONDS.labels(model, language).inc(audio)
+        # The call's wall time is shared between languages in proportion to their audio
+        WALL_SECONDS.labels(model, language).inc(seconds * audio / total_audio if total_audio else 0.0)
+        if seconds > 0:
+            REALTIME_FACTOR.labels(model, language).observe(total_audio / seconds)
+
+
+def observe_prompt_creation(seconds: float) -> None:
+    PROMPT_CREATION.observe(seconds)
+
+
+def observe_model_load(model: str, seconds: float) -> None:
+    MODEL_LOAD.labels(model).observe(seconds)
+
+
+def _gauge(name: str, documentation: str, labels: Optional[List[str]] = None) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, documentation, labels=labels)
+
+
+class ServiceCollector:
+    """Reads queue, cache, model and accelerator state when Prometheus scrapes"""
+
+    def collect(self) -> Iterable[Any]:
+        from app import concurrency, engine_pool
+        from app.engine_registry import registry
+
+        limiter = concurrency._limiter
+        if limiter is not None:
+            stats = limiter.stats()
+            in_flight = _gauge("tts_inference_in_flight", "Renders running on the inference executor")
+            in_flight.add_metric([], stats["in_flight"])
+            queue = _gauge("tts_inference_queue_depth", "Renders waiting for an inference executor slot")
+            queue.add_metric([], stats["queue_depth"])
+            rejected = CounterMetricFamily("tts_inference_rejected", "Renders rejected with 429")
+            rejected.add_metric([], stats["rejected"])
+            yield from (in_flight, queue, rejected)
+
+        pool = engine_pool._pool
+        if pool is not None:
+            replicas = _gauge("tts_pool_replica_in_flight", "Requests in flight per engine pool replica", ["replica", "device"])
+            for replica in pool.stats()["replicas"]:
+                replicas.add_metric([str(replica["index"]), replica["device"]], replica["in_flight"])
+            yield replicas
+
+        if _job_runner is not None:
+            jobs = _gauge("tts_jobs", "Render jobs by state", ["state"])
+            for state, count in _job_runner.store.counts().items():
+                jobs.add_metric([state], count)
+            yield jobs
+
+        engines = registry.engines()
+        microbatch = _gauge("tts_microbatch_queue_depth", "Items waiting in the micro-batching scheduler")
+        microbatch.add_metric([], sum(e.scheduler.stats()["queue_depth"] for e in engines if getattr(e, "scheduler", None) is not None))
+        yield microbatch
+        waiting = _gauge("tts_priority_waiting", "Requests waiting for an engine turn", ["priority_class"])
+        waiting_counts: Dict[str, int] = {}
+        for engine in engines:
+            if getattr(engine, "priority", None) is not None:
+                for name, stats in engine.priority.stats()["classes"].items():
+                    waiting_counts[name] = waiting_counts.get(name, 0) + stats["waiting"]
+        for name, count in waiting_counts.items():
+            waiting.add_metric([name], count)
+        yield waiting
+
+        yield from self._cache_metrics(engines)
+        yield from self._model_metrics(engines)
+        yield from self._accelerator_metrics()
+
+    def _cache_metrics(self, engines: List[Any]) -> Iterable[Any]:
+        totals: Dict[str, Tuple[int, int]] = {}
+        for engine in engines:
+            for name in ("prompt_cache", "design_cache", "utterance_cache", "prompt_store"):
+                cache = getattr(engine, name, None)
+                if cache is None or not hasattr(cache, "stats"):
+                    continue
+                stats = cache.stats()
+                if "hits" not in stats:
+                    continue
+                hits, misses = totals.get(name, (0, 0))
+                totals[name] = (hits + stats["hits"], misses + stats["misses"])
+        hits = CounterMetricFamily("tts_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("tts_cache_misses", "Cache misses", labels=["cache"])
+        ratio = _gauge("tts_cache_hit_ratio", "Cache hits per lookup since start", ["cache"])
+        for name, (hit_count, miss_count) in totals.items():
+            hits.add_metric([name], hit_count)
+            misses.add_metric([name], miss_count)
+            lookups = hit_count + miss_count
+            ratio.add_metric([name], hit_count / lookups if lookups else 0.0)
+        yield from (hits, misses, ratio)
+
+    def _model_metrics(self, engines: List[Any]) -> Iterable[Any]:
+        resident = _gauge("tts_model_bytes", "Model weight bytes by residency state", ["model", "state"])
+        loads = CounterMetricFamily("tts_model_loads", "Model loads", labels=["model"])
+        for engine in engines:
+            if not hasattr(engine, "models"):
+                continue
+            for name, model in engine.models.stats()["models"].items():
+                resident.add_metric([name, model["state"]], model["bytes"])
+                loads.add_metric([name], model["loads"])
+        yield from (resident, loads)
+
+    def _accelerator_metrics(self) -> Iterable[Any]:
+        if not torch.cuda.is_available():
+            return
+        allocated = _gauge("tts_cuda_memory_allocated_bytes", "CUDA memory allocated by tensors", ["device"])
+        reserved = _gauge("tts_cuda_memory_reserved_bytes", "CUDA memory reserved by the caching allocator", ["device"])
+        for index in range(torch.cuda.device_count()):
+            allocated.add_metric([f"cuda:{index}"], torch.cuda.memory_allocated(index))
+            reserved.add_metric([f"cuda:{index}"], torch.cuda.memory_reserved(index))
+        yield from (allocated, reserved)
+
+
+REGISTRY.register(ServiceCollector())
+
+
+def metrics_response() -> Tuple[bytes, str]:
+    """Return the metrics in the Prometheus text format and its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """Return the route template of a request, e.g. /api/jobs/{job_id}, keeping ids out of the labels"""
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    # Routes of included routers only know their path inside the router, the prefix comes from the request path
+    path_params = scope.get("path_params", {})
+    rendered = re.sub(r"\{(\w+)(?::\w+)?\}", lambda m: str(path_params.get(m.group(1), m.group(0))), template)
+    path = scope.get("path", "")
+    if path != rendered and path.endswith(rendered):
+        return path[:-len(rendered)] + template
+    return template
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware counting requests and their latency per route template"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = _route_template(scope)
+            HTTP_REQUESTS.labels(endpoint, scope["method"], str(status[0])).inc()
+            HTTP_LATENCY.labels(endpoint, scope["method"]).observe(time.perf_counter() - started)
+
+
+def instrument_flask(app: Any) -> None:
+    """Count Flask requests and their latency per URL rule"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        if "metrics_started" in g:
+            HTTP_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - g.metrics_started)
+        return response
@@ -0,0 +1,279 @@
+"""
+Model residency management.
+
+``ModelManager`` loads each model on its first real use instead of loading
+every model up front. It records when each model was last used, and a
+background thread moves idle models down residency tiers:
+
+    device (e.g. cuda:0) --device_ttl--> CPU RAM --cpu_ttl--> unloaded
+
+The next use moves the model back to the device or reloads it. A model is
+never moved while a ``use()`` block holds it, and models injected with
+``set()`` (e.g. test doubles) are pinned and never evicted.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import torch
+
+from app.metrics import observe_model_load
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEVICE = "device"
+CPU = "cpu"
+UNLOADED = "unloaded"
+
+
+def _module_of(model: Any) -> Optional[torch.nn.Module]:
+    """Return the torch module of a model or of a Qwen3TTSModel wrapper"""
+    if isinstance(model, torch.nn.Module):
+        return model
+    module = getattr(model, "model", None)
+    return module if isinstance(module, torch.nn.Module) else None
+
+
+def model_bytes(model: Any) -> int:
+    """Return the memory held by a model's parameters and buffers"""
+    module = _module_of(model)
+    if module is None:
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    tokenizer_module = _module_of(getattr(getattr(module, "speech_tokenizer", None), "model", None))
+    if tokenizer_module is not None:
+        tensors += list(tokenizer_module.parameters()) + list(tokenizer_module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def move_model(model: Any, device: str) -> bool:
+    """
+    Move a model, including its speech tokenizer, to a device
+
+    Args:
+        model: torch module or Qwen3TTSModel wrapper
+        device: Target device
+
+    Returns:
+        False if the model has no torch module and was left in place
+    """
+    module = _module_of(model)
+    if module is None:
+        return False
+    module.to(device)
+    if hasattr(model, "device") and model is not module:
+        model.device = torch.device(device)
+    tokenizer = getattr(module, "speech_tokenizer", None)
+    tokenizer_module = _module_of(getattr(tokenizer, "model", None))
+    if tokenizer_module is not None:
+        tokenizer_module.to(device)
+        tokenizer.device = torch.device(device)
+    return True
+
+
+class _ModelSlot:
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.model: Any = None
+        self.state = UNLOADED
+        self.pinned = False
+        self.last_used = 0.0
+        self.in_use = 0
+        self.nbytes = 0
+        self.loads = 0
+        self.offloads = 0
+        self.lock = threading.RLock()
+
+
+class ModelManager:
+    """Loads models on first use and evicts idle ones to CPU RAM, then out of memory"""
+
+    def __init__(self, device: str = "cuda:0", device_ttl: Optional[float] = None, cpu_ttl: Optional[float] = None,
+                 check_interval: float = 30.0):
+        """
+        Initialize ModelManager
+
+        Args:
+            device: Device models run on
+            device_ttl: Idle seconds before a model moves from the device to CPU RAM, None keeps it on the device
+            cpu_ttl: Further idle seconds before a model is unloaded, None never unloads
+            check_interval: Seconds between idle checks of the background thread
+        """
+        self.device = device
+        self.device_ttl = device_ttl
+        self.cpu_ttl = cpu_ttl
+        self.check_interval = check_interval
+        self._slots: Dict[str, _ModelSlot] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """
+        Register a model
+
+        Args:
+            name: Model name
+            loader: Callable loading the model onto self.device
+        """
+        self._slots[name] = _ModelSlot(name, loader)
+
+    def _slot(self, name: str) -> _ModelSlot:
+        slot = self._slots.get(name)
+        if slot is None:
+            raise KeyError(f"Unknown model: {name}")
+        return slot
+
+    def get(self, name: str) -> Any:
+        """Return a model on the device, loading or moving it there if needed"""
+        slot = self._slot(name)
+        with slot.lock:
+            if slot.state == UNLOADED:
+                started = time.perf_counter()
+                with span("model_load"):
+                    slot.model = slot.loader()
+                slot.state = DEVICE
+                slot.nbytes = model_bytes(slot.model)
+                slot.loads += 1
+                elapsed = time.perf_counter() - started
+                observe_model_load(name, elapsed)
+                logger.info(f"Loaded {name} model in {elapsed:.1f}s ({slot.nbytes / 2**20:.0f} MiB)")
+            elif slot.state == CPU:
+                move_model(slot.model, self.device)
+                slot.state = DEVICE
+                logger.info(f"Moved {name} model back to {self.device}")
+            slot.last_used = time.monotonic()
+            return slot.model
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """Hold a model on the device for the duration of a block"""
+        slot = self._slot(name)
+        with slot.lock:
+            model = self.get(name)
+            slot.in_use += 1
+        try:
+            yield model
+        finally:
+            with slot.lock:
+                slot.in_use -= 1
+                slot.last_used = time.monotonic()
+
+    def set(self, name: str, model: Any) -> None:
+        """
+        Install a model instance directly, or unload the model with None
+
+        Installed models are pinned: they are never evicted or reloaded.
+        """
+        slot = self._slot(name)
+        with slot.lock:
+            slot.model = model
+            slot.state = UNLOADED if model is None else DEVICE
+            slot.pinned = model is not None
+            slot.nbytes = model_bytes(model) if model is not None else 0
+            slot.last_used = time.monotonic()
+
+    def peek(self, name: str) -> Any:
+        """Return the model if it is resident (on the device or in CPU RAM), without touching it"""
+        return self._slot(name).model
+
+    def is_resident(self, name: str) -> bool:
+        return self._slot(name).state != UNLOADED
+
+    def _offload(self, slot: _ModelSlot) -> None:
+        if not self.device.startswith(CPU):
+            move_model(slot.model, CPU)
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        slot.state = CPU
+        slot.offloads += 1
+
+    def _unload(self, slot: _ModelSlot) -> None:
+        slot.model = None
+        slot.state = UNLOADED
+        slot.nbytes = 0
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def evict_idle(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """
+        Move idle models down one or more residency tiers
+
+        Args:
+            now: Current time.monotonic() value, for tests
+
+        Returns:
+            List of (model name, new state) transitions
+        """
+        now = time.monotonic() if now is None else now
+        transitions = []
+        for slot in self._slots.values():
+            # Skip models that are busy right now instead of waiting for them
+            if not slot.lock.acquire(blocking=False):
+                continue
+            try:
+                if slot.pinned or slot.in_use:
+                    continue
+                idle = now - slot.last_used
+                if slot.state == UNLOADED:
+                    continue
+                # Past both TTLs the model is dropped directly, without a detour through CPU RAM
+                if self.cpu_ttl is not None and idle >= (self.device_ttl or 0) + self.cpu_ttl:
+                    self._unload(slot)
+                    transitions.append((slot.name, UNLOADED))
+                    logger.info(f"Unloaded idle {slot.name} model after {idle:.0f}s")
+                elif slot.state == DEVICE and self.device_ttl is not None and idle >= self.device_ttl:
+                    self._offload(slot)
+                    transitions.append((slot.name, CPU))
+                    logger.info(f"Moved idle {slot.name} model to CPU after {idle:.0f}s")
+            finally:
+                slot.lock.release()
+        return transitions
+
+    def start(self) -> "ModelManager":
+        """Start the background idle check if any TTL is configured"""
+        if self._thread is not None or (self.device_ttl is None and self.cpu_ttl is None):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-manager", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background idle check"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Model idle check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the residency state and memory of every model"""
+        now = time.monotonic()
+        models = {}
+        for slot in self._slots.values():
+            models[slot.name] = {
+                "state": slot.state,
+                "device": self.device if slot.state == DEVICE else (CPU if slot.state == CPU else None),
+                "bytes": slot.nbytes,
+                "idle_seconds": round(now - slot.last_used, 1) if slot.state != UNLOADED else None,
+                "in_use": slot.in_use,
+                "pinned": slot.pinned,
+                "loads": slot.loads,
+                "offloads": slot.offloads,
+            }
+        return {
+            "device": self.device,
+            "device_ttl": self.device_ttl,
+            "cpu_ttl": self.cpu_ttl,
+            "models": models,
+        }
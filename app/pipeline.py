@@ -0,0 +1,172 @@
+"""
+Producer/consumer render pipeline.
+
+One thread drives the chunk generator (the model), a thread pool runs the
+CPU post-processing of each chunk (speed adjustment, resampling,
+normalisation, encoding), and the caller receives finished chunks in order.
+A bounded queue between the stages keeps memory flat and lets generation of
+chunk N+1 overlap post-processing of chunk N.
+"""
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class RenderPipeline:
+    """Overlaps a generation stage with a pool of post-processing workers"""
+
+    def __init__(self, postprocess: Callable[[Any], Any], workers: int = 2, max_pending: int = 4):
+        """
+        Initialize RenderPipeline
+
+        Args:
+            postprocess: Function applied to every generated item on the worker pool
+            workers: Number of post-processing threads
+            max_pending: Maximum generated items waiting for post-processing or the consumer
+        """
+        if workers < 1 or max_pending < 1:
+            raise ValueError("workers and max_pending must be at least 1")
+        self.postprocess = postprocess
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._started = None
+        self._finished = None
+        self._items = 0
+        self._generate_busy = 0.0
+        self._postprocess_busy = 0.0
+        self._producer_blocked = 0.0
+        self._consumer_wait = 0.0
+
+    def _timed_postprocess(self, item: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return self.postprocess(item)
+        finally:
+            with self._lock:
+                self._postprocess_busy += time.perf_counter() - started
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        """
+        Run the pipeline over a source of generated items
+
+        Args:
+            source: Iterable producing items (e.g. a chunk generator), advanced on the producer thread
+
+        Yields:
+            Post-processed items in source order
+        """
+        self._reset_stats()
+        self._started = time.perf_counter()
+        pending: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_pending)
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render-postprocess")
+        stop = threading.Event()
+
+        def put(entry: Any) -> bool:
+            # Bounded put that gives up when the consumer has gone away
+            blocked_since = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    pending.put(entry, timeout=0.1)
+                    self._producer_blocked += time.perf_counter() - blocked_since
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            iterator = iter(source)
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    self._generate_busy += time.perf_counter() - started
+                    self._items += 1
+                    # Post-processing runs in the caller's context, e.g. its request trace
+                    if not put(executor.submit(contextvars.copy_context().run, self._timed_postprocess, item)):
+                        break
+            except BaseException as e:
+                put(_Failure(e))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                put(_DONE)
+
+        producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name="render-generate", daemon=True)
+        producer.start()
+        try:
+            while True:
+                waited_since = time.perf_counter()
+                entry = pending.get()
+                if isinstance(entry, Future):
+                    result = entry.result()
+                    self._consumer_wait += time.perf_counter() - waited_since
+                    yield result
+                    continue
+                self._consumer_wait += time.perf_counter() - waited_since
+                if isinstance(entry, _Failure):
+                    raise entry.error
+                break
+        finally:
+            stop.set()
+            # Unblock the producer and drop work nobody will read
+            while True:
+                try:
+                    entry = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(entry, Future):
+                    entry.cancel()
+            producer.join()
+            executor.shutdown(wait=True)
+            self._finished = time.perf_counter()
+            logger.info(f"Render pipeline finished: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return per-stage utilisation of the last run
+
+        Utilisation is busy time divided by wall time (and by the worker count
+        for the post-processing pool). A generation utilisation close to 1.0
+        means the model never waited for post-processing.
+        """
+        if self._started is None:
+            return {}
+        wall = max((self._finished or time.perf_counter()) - self._started, 1e-9)
+        with self._lock:
+            postprocess_busy = self._postprocess_busy
+        return {
+            "items": self._items,
+            "wall_seconds": wall,
+            "generate": {
+                "busy_seconds": self._generate_busy,
+                "blocked_seconds": self._producer_blocked,
+                "utilisation": self._generate_busy / wall,
+            },
+            "postprocess": {
+                "busy_seconds": postprocess_busy,
+                "workers": self.workers,
+                "utilisation": postprocess_busy / (wall * self.workers),
+            },
+            "consumer_wait_seconds": self._consumer_wait,
+        }
@@ -0,0 +1,278 @@
+"""
+Synthesis plans: what a voice clone request will render, without rendering it.
+
+``compile_plan`` turns the split chunks of a script into a ``SynthesisPlan``
+listing the speakers and where their voice prompts come from, every chunk
+with its estimated audio duration and compute cost, and the chunks that
+repeat an earlier (speaker, language, text) utterance and are rendered only
+once. Compiling a plan needs no model and reads no audio.
+
+``plan_voice_clone`` parses and splits a script the way the engine does and
+compiles its plan, so front ends and the job runner can plan requests
+without building an engine (e.g. when rendering happens in pool replicas).
+"""
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.script_parser import SpeakerIndex, iter_script_segments
+from app.text_splitter import split_text, text_weight
+from app.timestretch import MAX_SPEED, MIN_SPEED, effective_speed
+
+# Spoken weight per second at speed 1.0 (about 15 Latin or 5 CJK characters, see text_weight)
+WEIGHT_PER_SECOND = 15.0
+
+# Chunks this far apart or more are rendered separately even if identical,
+# which bounds the audio held for reuse during a render
+DEDUP_WINDOW = 64
+
+_WHITESPACE = re.compile(r"\s+")
+
+UtteranceKey = Tuple[str, str, str]
+
+
+def utterance_key(speaker_tag: str, language: str, text: str) -> UtteranceKey:
+    """
+    Return the identity of an utterance for deduplication
+
+    Args:
+        speaker_tag: Speaker tag such as [SPEAKER0]
+        language: Language the chunk is rendered in
+        text: Chunk text
+
+    Returns:
+        Tuple of (speaker_tag, language, text with whitespace collapsed)
+    """
+    return speaker_tag, language, _WHITESPACE.sub(" ", text).strip()
+
+
+def find_duplicates(keys: Sequence[UtteranceKey], window: int = DEDUP_WINDOW) -> List[Optional[int]]:
+    """
+    Find chunks that repeat an earlier utterance
+
+    Args:
+        keys: Utterance key of every chunk in script order
+        window: Maximum distance in chunks to the reused chunk, 0 disables deduplication
+
+    Returns:
+        For every chunk, the index of the earlier chunk whose audio it reuses, or None
+    """
+    sources: List[Optional[int]] = []
+    first_seen: Dict[UtteranceKey, int] = {}
+    for index, key in enumerate(keys):
+        source = first_seen.get(key)
+        if window > 0 and source is not None and index - source < window:
+            sources.append(source)
+            continue
+        # Start a new reuse window from this chunk
+        first_seen[key] = index
+        sources.append(None)
+    return sources
+
+
+def estimate_audio_seconds(text: str, speed: float = 1.0) -> float:
+    """Estimate the duration of the speech rendered for a text"""
+    return text_weight(text) / WEIGHT_PER_SECOND / speed
+
+
+@dataclass
+class SpeakerPlan:
+    """Voice prompt of one speaker"""
+
+    speaker_tag: str
+    config_index: int
+    language: str
+    # "ref_audio" or "voice_design"
+    prompt_source: str
+    ref_audio: Optional[str] = None
+    design_instruct: Optional[str] = None
+    # Whether the designed reference voice is already cached, None if unknown
+    cached: Optional[bool] = None
+    estimated_compute_seconds: float = 0.0
+
+
+@dataclass
+class ChunkPlan:
+    """One text chunk after splitting"""
+
+    index: int
+    speaker_tag: str
+    language: str
+    text: str
+    weight: int
+    estimated_audio_seconds: float
+    estimated_compute_seconds: float
+    # Index of the earlier chunk whose audio is reused, None if rendered
+    duplicate_of: Optional[int] = None
+
+
+@dataclass
+class SynthesisPlan:
+    """Everything a voice clone request will render"""
+
+    speakers: List[SpeakerPlan] = field(default_factory=list)
+    chunks: List[ChunkPlan] = field(default_factory=list)
+    speed: float = 1.0
+    realtime_factor: float = 1.0
+
+    @property
+    def rendered_chunks(self) -> List[ChunkPlan]:
+        return [chunk for chunk in self.chunks if chunk.duplicate_of is None]
+
+    @property
+    def estimated_audio_seconds(self) -> float:
+        return sum(chunk.estimated_audio_seconds for chunk in self.chunks)
+
+    @property
+    def estimated_compute_seconds(self) -> float:
+        return (sum(speaker.estimated_compute_seconds for speaker in self.speakers)
+                + sum(chunk.estimated_compute_seconds for chunk in self.chunks))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the plan as JSON-serializable data"""
+        return {
+            "speakers": [asdict(speaker) for speaker in self.speakers],
+            "chunks": [asdict(chunk) for chunk in self.chunks],
+            "summary": {
+                "speaker_count": len(self.speakers),
+                "chunk_count": len(self.chunks),
+                "rendered_chunk_count": len(self.rendered_chunks),
+                "duplicate_chunk_count": len(self.chunks) - len(self.rendered_chunks),
+                "speed": self.speed,
+                "realtime_factor": self.realtime_factor,
+                "estimated_audio_seconds": round(self.estimated_audio_seconds, 2),
+                "estimated_compute_seconds": round(self.estimated_compute_seconds, 2),
+            },
+        }
+
+
+def plan_speaker(speaker_tag: str, config_index: int, speaker_config: Dict, realtime_factor: float = 1.0,
+                 cached: Optional[bool] = None) -> SpeakerPlan:
+    """
+    Describe the voice prompt source of a speaker
+
+    Args:
+        speaker_tag: Speaker tag such as [SPEAKER0]
+        config_index: Index of the speaker's config
+        speaker_config: Speaker configuration with either ref_audio or design_text/design_instruct
+        realtime_factor: Compute seconds per second of generated audio
+        cached: Whether a designed reference voice is already cached, None if unknown
+
+    Returns:
+        SpeakerPlan; designing an uncached voice is counted as compute
+    """
+    language = speaker_config.get('language', 'English')
+    if 'ref_audio' in speaker_config:
+        ref_audio = speaker_config['ref_audio']
+        return SpeakerPlan(
+            speaker_tag=speaker_tag,
+            config_index=config_index,
+            language=language,
+            prompt_source="ref_audio",
+            ref_audio=ref_audio if isinstance(ref_audio, str) else "<array>",
+        )
+    if 'design_text' in speaker_config and 'design_instruct' in speaker_config:
+        design_seconds = estimate_audio_seconds(speaker_config['design_text']) * realtime_factor
+        return SpeakerPlan(
+            speaker_tag=speaker_tag,
+            config_index=config_index,
+            language=language,
+            prompt_source="voice_design",
+            design_instruct=speaker_config['design_instruct'],
+            cached=cached,
+            estimated_compute_seconds=0.0 if cached else design_seconds,
+        )
+    raise ValueError(f"Invalid speaker configuration: {speaker_config}")
+
+
+def compile_plan(speakers: List[SpeakerPlan], chunks: List[Tuple[str, str]], speed: float = 1.0,
+                 realtime_factor: float = 1.0, dedup_window: int = DEDUP_WINDOW) -> SynthesisPlan:
+    """
+    Build the plan of a voice clone render
+
+    Args:
+        speakers: Plan of every speaker appearing in the script
+        chunks: List of (speaker_tag, chunk_text) in script order
+        speed: Playback speed applied to the output
+        realtime_factor: Compute seconds per second of generated audio
+        dedup_window: Maximum distance in chunks between reused utterances, 0 disables deduplication
+
+    Returns:
+        SynthesisPlan
+    """
+    languages = {speaker.speaker_tag: speaker.language for speaker in speakers}
+    keys = [utterance_key(speaker_tag, languages[speaker_tag], chunk) for speaker_tag, chunk in chunks]
+    sources = find_duplicates(keys, window=dedup_window)
+
+    plan = SynthesisPlan(speakers=speakers, speed=speed, realtime_factor=realtime_factor)
+    for index, ((speaker_tag, chunk), source) in enumerate(zip(chunks, sources)):
+        generated_seconds = estimate_audio_seconds(chunk)
+        plan.chunks.append(ChunkPlan(
+            index=index,
+            speaker_tag=speaker_tag,
+            language=languages[speaker_tag],
+            text=chunk,
+            weight=text_weight(chunk),
+            estimated_audio_seconds=round(generated_seconds / effective_speed(speed), 3),
+            estimated_compute_seconds=0.0 if source is not None else round(generated_seconds * realtime_factor, 3),
+            duplicate_of=source,
+        ))
+    return plan
+
+
+def plan_settings_from_env() -> Dict[str, Any]:
+    """Return the realtime_factor and dedup_window arguments of plan_voice_clone from the environment"""
+    return {
+        "realtime_factor": float(os.environ.get("PLAN_REALTIME_FACTOR", "1.0")),
+        "dedup_window": int(os.environ.get("CLONE_DEDUP_WINDOW", str(DEDUP_WINDOW))),
+    }
+
+
+def iter_script_chunks(text: Union[str, Iterable[str]]) -> Iterator[Tuple[str, str]]:
+    """Yield (speaker_tag, chunk_text) of every non-empty chunk of a script after splitting"""
+    for speaker_tag, segment_text in iter_script_segments(text):
+        for chunk in split_text(segment_text):
+            if chunk.strip():
+                yield speaker_tag, chunk
+
+
+def plan_voice_clone(text: Union[str, Iterable[str]], speaker_configs: List[Dict], speed: float = 1.0,
+                     realtime_factor: float = 1.0, dedup_window: int = DEDUP_WINDOW,
+                     design_cached: Optional[Callable[[Dict], Optional[bool]]] = None) -> SynthesisPlan:
+    """
+    Compile what a voice clone render would do, without an engine
+
+    Args:
+        text: Text to synthesize, can contain [SPEAKER0] markers, or an iterable of script lines
+        speaker_configs: Speaker configuration list, each config contains voice information
+        speed: Audio playback speed, range 0.5-3.0
+        realtime_factor: Compute seconds per second of generated audio
+        dedup_window: Maximum distance in chunks between reused utterances, 0 disables deduplication
+        design_cached: Returns whether the designed voice of a speaker config is cached, default unknown
+
+    Returns:
+        SynthesisPlan
+
+    Raises:
+        ValueError: On an unsupported speed, unknown speaker tag or invalid speaker configuration
+    """
+    if speed < MIN_SPEED or speed > MAX_SPEED:
+        raise ValueError(f"Playback speed must be in range {MIN_SPEED}-{MAX_SPEED}")
+    speaker_index = SpeakerIndex(speaker_configs)
+    speakers = {}
+    chunks = []
+
+    for speaker_tag, chunk in iter_script_chunks(text):
+        if speaker_tag not in speakers:
+            config_idx = speaker_index.resolve(speaker_tag)
+            speaker_config = speaker_configs[config_idx]
+            cached = design_cached(speaker_config) if design_cached is not None else None
+            # A design shared by several tags is only generated for the first one
+            designed = 'design_text' in speaker_config and 'design_instruct' in speaker_config
+            if designed and any(speaker.config_index == config_idx for speaker in speakers.values()):
+                cached = True
+            speakers[speaker_tag] = plan_speaker(speaker_tag, config_idx, speaker_config, realtime_factor, cached=cached)
+        chunks.append((speaker_tag, chunk))
+
+    return compile_plan(list(speakers.values()), chunks, speed=speed, realtime_factor=realtime_factor, dedup_window=dedup_window)
@@ -0,0 +1,266 @@
+"""
+Priority and fair-share scheduling of engine turns.
+
+One engine runs one generation at a time. Without scheduling, a short voice
+design request waits until a long voice clone render has finished. With a
+``PriorityScheduler`` attached to the engine, every model call (one voice
+design, or one chunk or batch of chunks of a voice clone) takes a *turn*
+first. When a turn ends, the next turn goes to the waiting request:
+
+1. of the highest priority class (``interactive`` before ``batch``),
+2. of the client that has used the least engine time so far (fair share),
+3. with the earliest deadline, then the one that asked first.
+
+Long clones are therefore preempted at chunk boundaries and interactive
+requests interleave with them. A request whose deadline passes while it
+waits for a turn fails with ``DeadlineExceededError``.
+
+The request class, client and deadline travel with the request in a context
+variable set by ``request_priority()``; model calls made outside it run as
+``interactive`` requests of an anonymous client.
+"""
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Priority classes, most urgent first
+CLASSES = (INTERACTIVE, BATCH)
+
+# Clients tracked for fair share before idle ones are forgotten
+MAX_CLIENTS = 1024
+
+# Upper bounds of the queue wait histogram buckets in milliseconds
+WAIT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a request's deadline passes before it gets an engine turn"""
+
+
+class RequestPriority:
+    """Priority class, client and deadline of one request"""
+
+    __slots__ = ("priority_class", "client", "deadline")
+
+    def __init__(self, priority_class: str = INTERACTIVE, client: str = "", deadline: Optional[float] = None):
+        if priority_class not in CLASSES:
+            raise ValueError(f"Unknown priority class: {priority_class}. Choose from {list(CLASSES)}")
+        self.priority_class = priority_class
+        self.client = client
+        # time.monotonic() value
+        self.deadline = deadline
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_priority", default=None)
+
+
+@contextmanager
+def request_priority(priority_class: str = INTERACTIVE, client: str = "", timeout: Optional[float] = None) -> Iterator[RequestPriority]:
+    """
+    Run the enclosed renders as requests of a priority class and client
+
+    Args:
+        priority_class: "interactive" or "batch"
+        client: Client identity used for fair share
+        timeout: Seconds from now after which waiting for a turn fails, None waits forever
+    """
+    priority = RequestPriority(priority_class, client, time.monotonic() + timeout if timeout else None)
+    token = _current.set(priority)
+    try:
+        yield priority
+    finally:
+        _current.reset(token)
+
+
+def current_priority() -> RequestPriority:
+    return _current.get() or RequestPriority()
+
+
+class _Waiter:
+    __slots__ = ("rank", "priority", "seq", "enqueued_at")
+
+    def __init__(self, priority: RequestPriority, seq: int):
+        self.rank = CLASSES.index(priority.priority_class)
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+
+
+class _ClassStats:
+    __slots__ = ("turns", "expired", "preempted", "wait_sum", "wait_max", "buckets")
+
+    def __init__(self):
+        self.turns = 0
+        self.expired = 0
+        self.preempted = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, wait: float) -> None:
+        self.turns += 1
+        self.wait_sum += wait
+        self.wait_max = max(self.wait_max, wait)
+        wait_ms = wait * 1000.0
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        self.buckets[index] += 1
+
+    def to_dict(self, waiting: int) -> Dict[str, Any]:
+        # Cumulative counts per upper bound, like a Prometheus histogram
+        histogram, total = {}, 0
+        for bound, count in zip([str(b) for b in WAIT_BUCKETS_MS] + ["+Inf"], self.buckets):
+            total += count
+            histogram[bound] = total
+        return {
+            "waiting": waiting,
+            "turns": self.turns,
+            "expired": self.expired,
+            "preempted": self.preempted,
+            "queue_wait_ms": {
+                "mean": self.wait_sum / self.turns * 1000.0 if self.turns else 0.0,
+                "max": self.wait_max * 1000.0,
+                "sum": self.wait_sum * 1000.0,
+                "histogram": histogram,
+            },
+        }
+
+
+class PriorityScheduler:
+    """Hands out engine turns by priority class, client fair share and deadline"""
+
+    def __init__(self, slots: int = 1):
+        """
+        Initialize PriorityScheduler
+
+        Args:
+            slots: Model calls allowed to run at the same time on the engine
+        """
+        self.slots = slots
+        self._cond = threading.Condition()
+        self._free = slots
+        self._seq = 0
+        self._waiters: List[_Waiter] = []
+        # Engine seconds used per client, the fair share virtual time
+        self._usage: Dict[str, float] = {}
+        self._stats = {name: _ClassStats() for name in CLASSES}
+        self._local = threading.local()
+
+    def _key(self, waiter: _Waiter) -> Tuple:
+        deadline = waiter.priority.deadline
+        return (waiter.rank, self._usage.get(waiter.priority.client, 0.0), deadline if deadline is not None else math.inf, waiter.seq)
+
+    def _join(self, client: str) -> None:
+        # A client returning after being idle starts at the least usage of the active clients,
+        # so it cannot claim the engine time it did not use while away
+        active = [self._usage.get(w.priority.client, 0.0) for w in self._waiters if w.priority.client != client]
+        if active and not any(w.priority.client == client for w in self._waiters):
+            self._usage[client] = max(self._usage.get(client, 0.0), min(active))
+
+    def _acquire(self, priority: RequestPriority) -> float:
+        with self._cond:
+            self._join(priority.client)
+            self._seq += 1
+            waiter = _Waiter(priority, self._seq)
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    if self._free > 0 and min(self._waiters, key=self._key) is waiter:
+                        break
+                    if priority.deadline is not None:
+                        remaining = priority.deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats[priority.priority_class].expired += 1
+                            raise DeadlineExceededError(f"Deadline passed after waiting {time.monotonic() - waiter.enqueued_at:.1f}s for the engine")
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiters.remove(waiter)
+                # Someone else may be first now
+                self._cond.notify_all()
+            self._free -= 1
+            for other in self._waiters:
+                if other.rank > waiter.rank and other.enqueued_at < waiter.enqueued_at:
+                    self._stats[other.priority.priority_class].preempted += 1
+                    break
+            wait = time.monotonic() - waiter.enqueued_at
+            self._stats[priority.priority_class].observe(wait)
+            return wait
+
+    def _release(self, priority: RequestPriority, held: float) -> None:
+        with self._cond:
+            self._free += 1
+            self._usage[priority.client] = self._usage.get(priority.client, 0.0) + held
+            if len(self._usage) > MAX_CLIENTS:
+                # A forgotten client rejoins at the least usage of the active clients anyway
+                active = {w.priority.client for w in self._waiters}
+                self._usage = {client: used for client, used in self._usage.items() if client in active}
+            self._cond.notify_all()
+
+    @contextmanager
+    def turn(self) -> Iterator[None]:
+        """Hold an engine turn for one model call of the current request"""
+        # Model calls nested in a turn run in it
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        priority = current_priority()
+        with span("engine_wait"):
+            self._acquire(priority)
+        self._local.depth = 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            self._release(priority, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-class waiting requests, turns, preemptions and queue wait histograms"""
+        with self._cond:
+            waiting = {name: 0 for name in CLASSES}
+            for waiter in self._waiters:
+                waiting[waiter.priority.priority_class] += 1
+            return {
+                "slots": self.slots,
+                "in_use": self.slots - self._free,
+                "clients": len(self._usage),
+                "classes": {name: self._stats[name].to_dict(waiting[name]) for name in CLASSES},
+            }
+
+
+# Priority class of each render endpoint, overridden by PRIORITY_CLASSES
+DEFAULT_ENDPOINT_CLASSES = {
+    "voice-design": INTERACTIVE,
+    "voice-design-file": INTERACTIVE,
+    "voice-clone": BATCH,
+    "voice-clone-files": BATCH,
+    "jobs": BATCH,
+}
+
+
+def endpoint_classes_from_env() -> Dict[str, str]:
+    """Return the priority class of each endpoint, with PRIORITY_CLASSES (a JSON object) applied"""
+    classes = dict(DEFAULT_ENDPOINT_CLASSES)
+    if os.environ.get("PRIORITY_CLASSES"):
+        classes.update(json.loads(os.environ["PRIORITY_CLASSES"]))
+    for endpoint, priority_class in classes.items():
+        if priority_class not in CLASSES:
+            raise ValueError(f"Unknown priority class {priority_class} for endpoint {endpoint}. Choose from {list(CLASSES)}")
+    return classes
@@ -0,0 +1,171 @@
+"""
+In-memory LRU cache for voice clone prompts.
+
+Prompts are keyed by a content hash of the decoded reference audio plus the
+reference text, clone mode and clone model, so the same voice uploaded under
+different file names (or passed as an in-memory array) maps to one cache
+entry, while a different model never reuses it.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def hash_reference_audio(audio: np.ndarray, sample_rate: int, ref_text: str = "", x_vector_only_mode: bool = False,
+                         model: str = "") -> str:
+    """
+    Compute the cache key of a voice clone prompt
+
+    Args:
+        audio: Decoded mono reference audio
+        sample_rate: Sample rate of the reference audio
+        ref_text: Reference transcript
+        x_vector_only_mode: Whether only the speaker embedding is used
+        model: Path or name of the clone model that creates the prompt
+
+    Returns:
+        Hex digest identifying the prompt
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+    # Prompts hold the model's codes and speaker embedding, another model cannot use them
+    digest.update(f"|sr={int(sample_rate)}|xvec={bool(x_vector_only_mode)}|model={model}|".encode("utf-8"))
+    # ref_text is ignored by the model in x-vector-only mode
+    if not x_vector_only_mode:
+        digest.update((ref_text or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_voice_design(design_text: str, design_instruct: str, language: str, seed: int, model: str = "") -> str:
+    """
+    Compute the cache key of a designed reference voice
+
+    Args:
+        design_text: Text spoken in the designed reference audio
+        design_instruct: Voice description instruction
+        language: Language of the design text
+        seed: Random seed used for the design generation
+        model: Path or name of the voice design model that generates the voice
+
+    Returns:
+        Hex digest identifying the designed voice
+    """
+    payload = "\x1f".join([design_text, design_instruct, language, str(int(seed)), model])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_prompt_bytes(prompt: Any) -> int:
+    """
+    Estimate the memory held by a voice clone prompt
+
+    Args:
+        prompt: Prompt returned by create_voice_clone_prompt (list of prompt items)
+
+    Returns:
+        Approximate size in bytes
+    """
+    items = prompt if isinstance(prompt, (list, tuple)) else [prompt]
+    total = 0
+    for item in items:
+        for name in ("ref_code", "ref_spk_embedding"):
+            value = getattr(item, name, None)
+            if isinstance(value, torch.Tensor):
+                total += value.element_size() * value.nelement()
+            elif isinstance(value, np.ndarray):
+                total += value.nbytes
+        total += len((getattr(item, "ref_text", None) or "").encode("utf-8"))
+    return total
+
+
+class VoicePromptCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize VoicePromptCache
+
+        Args:
+            max_entries: Maximum number of cached prompts, 0 disables the cache
+            max_bytes: Maximum total size of cached prompts in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value and mark it as recently used, or None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: str, value: Any, nbytes: Optional[int] = None) -> None:
+        """
+        Insert a value, evicting least recently used entries to stay in budget
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            nbytes: Size of the value, estimated from the prompt tensors if omitted
+        """
+        if self.max_entries <= 0:
+            return
+        size = estimate_prompt_bytes(value) if nbytes is None else nbytes
+        if size > self.max_bytes:
+            logger.warning(f"Prompt {key[:12]} ({size} bytes) exceeds cache budget, not caching")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes[key]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache occupancy and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,264 @@
+"""
+Persistent on-disk store for voice clone prompts.
+
+Each prompt is saved as ``<key>.pt`` (tensors) next to a ``<key>.json``
+metadata file, where ``key`` is the content hash computed by
+``app.prompt_cache.hash_reference_audio``. Designed reference voices are
+saved the same way as ``<key>.wav`` keyed by ``hash_voice_design``. Files
+are written atomically, so several workers can share one store directory,
+and tensors are loaded lazily with memory mapping.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import torch
+from qwen_tts import VoiceClonePromptItem
+
+logger = logging.getLogger(__name__)
+
+
+def _atomic_write(path: str, write_fn) -> None:
+    """Write a file through a temporary file in the same directory and rename it into place"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class VoicePromptStore:
+    """Directory of serialized voice clone prompts with size-based eviction"""
+
+    def __init__(self, root_dir: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        """
+        Initialize VoicePromptStore
+
+        Args:
+            root_dir: Directory holding the prompt artifacts, created if missing
+            max_bytes: Maximum total size of stored prompts, least recently used are evicted first
+        """
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _tensor_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.pt")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.json")
+
+    def _audio_path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}.wav")
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        # The metadata file is written last and marks the artifact as complete
+        _atomic_write(self._meta_path(key), lambda f: f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8")))
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._meta_path(key)) and os.path.exists(self._tensor_path(key))
+
+    def get(self, key: str, device: Optional[Any] = None) -> Optional[List[VoiceClonePromptItem]]:
+        """
+        Load a prompt from disk
+
+        Args:
+            key: Prompt content hash
+            device: Device to move the tensors to, tensors stay memory-mapped on CPU if None
+
+        Returns:
+            List of prompt items, or None if the prompt is not stored
+        """
+        if key not in self:
+            return None
+        try:
+            data = torch.load(self._tensor_path(key), map_location="cpu", mmap=True, weights_only=True)
+        except Exception as e:
+            logger.warning(f"Failed to load stored prompt {key[:12]}: {e}")
+            return None
+
+        items = []
+        for item in data["items"]:
+            ref_code = item["ref_code"]
+            ref_spk_embedding = item["ref_spk_embedding"]
+            if device is not None:
+                ref_code = ref_code.to(device) if ref_code is not None else None
+                ref_spk_embedding = ref_spk_embedding.to(device)
+            items.append(VoiceClonePromptItem(
+                ref_code=ref_code,
+                ref_spk_embedding=ref_spk_embedding,
+                x_vector_only_mode=item["x_vector_only_mode"],
+                icl_mode=item["icl_mode"],
+                ref_text=item["ref_text"],
+            ))
+
+        # Mark as recently used for eviction
+        try:
+            os.utime(self._meta_path(key))
+        except OSError:
+            pass
+        return items
+
+    def put(self, key: str, prompt: List[VoiceClonePromptItem], metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save a prompt to disk atomically and evict old prompts if over budget
+
+        Args:
+            key: Prompt content hash
+            prompt: Prompt items returned by create_voice_clone_prompt
+            metadata: Extra information stored with the prompt (e.g. reference source)
+        """
+        data = {
+            "items": [
+                {
+                    "ref_code": item.ref_code.detach().cpu().contiguous() if item.ref_code is not None else None,
+                    "ref_spk_embedding": item.ref_spk_embedding.detach().cpu().contiguous(),
+                    "x_vector_only_mode": bool(item.x_vector_only_mode),
+                    "icl_mode": bool(item.icl_mode),
+                    "ref_text": item.ref_text,
+                }
+                for item in prompt
+            ]
+        }
+        tensor_path = self._tensor_path(key)
+        _atomic_write(tensor_path, lambda f: torch.save(data, f))
+
+        meta = dict(metadata or {})
+        meta.update({
+            "key": key,
+            "kind": "prompt",
+            "ref_text": prompt[0].ref_text if prompt else None,
+            "x_vector_only_mode": bool(prompt[0].x_vector_only_mode) if prompt else False,
+            "size_bytes": os.path.getsize(tensor_path),
+            "created_at": time.time(),
+        })
+        self._write_meta(key, meta)
+        logger.info(f"Stored voice clone prompt {key[:12]} in {self.root_dir}")
+        self.evict()
+
+    def has_design(self, key: str) -> bool:
+        """Return whether a designed reference voice is stored"""
+        return os.path.exists(self._meta_path(key)) and os.path.exists(self._audio_path(key))
+
+    def get_design(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Load a designed reference voice from disk
+
+        Args:
+            key: Design hash from hash_voice_design
+
+        Returns:
+            Tuple of (audio_data, sample_rate), or None if the voice is not stored
+        """
+        if not self.has_design(key):
+            return None
+        try:
+            audio, sr = sf.read(self._audio_path(key), dtype="float32")
+        except Exception as e:
+            logger.warning(f"Failed to load stored design {key[:12]}: {e}")
+            return None
+        try:
+            os.utime(self._meta_path(key))
+        except OSError:
+            pass
+        return audio, sr
+
+    def put_design(self, key: str, audio: np.ndarray, sample_rate: int, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save a designed reference voice to disk atomically
+
+        Args:
+            key: Design hash from hash_voice_design
+            audio: Designed reference audio
+            sample_rate: Sample rate of the audio
+            metadata: Extra information stored with the voice (e.g. design instruction)
+        """
+        audio_path = self._audio_path(key)
+        # 32-bit float WAV keeps samples bit-exact, so the prompt content hash stays stable
+        _atomic_write(audio_path, lambda f: sf.write(f, np.asarray(audio, dtype=np.float32), sample_rate, format="WAV", subtype="FLOAT"))
+
+        meta = dict(metadata or {})
+        meta.update({
+            "key": key,
+            "kind": "design",
+            "sample_rate": sample_rate,
+            "duration": len(audio) / sample_rate,
+            "size_bytes": os.path.getsize(audio_path),
+            "created_at": time.time(),
+        })
+        self._write_meta(key, meta)
+        logger.info(f"Stored designed voice {key[:12]} in {self.root_dir}")
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        """Remove a prompt or designed voice from the store"""
+        for path in (self._meta_path(key), self._tensor_path(key), self._audio_path(key)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def list_entries(self) -> List[Dict[str, Any]]:
+        """
+        List stored prompts and designed voices without loading their data
+
+        Returns:
+            Metadata dicts sorted from most to least recently used
+        """
+        entries = []
+        for name in os.listdir(self.root_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.root_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                meta["last_used"] = os.path.getmtime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable prompt metadata {path}: {e}")
+                continue
+            entries.append(meta)
+        entries.sort(key=lambda m: m["last_used"], reverse=True)
+        return entries
+
+    def total_bytes(self) -> int:
+        """Return the total size of stored artifacts"""
+        return sum(entry.get("size_bytes", 0) for entry in self.list_entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Remove least recently used prompts until the store fits its size budget
+
+        Args:
+            max_bytes: Size budget, defaults to the store budget
+
+        Returns:
+            Keys of the evicted prompts
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        evicted = []
+        with self._lock:
+            entries = self.list_entries()
+            total = sum(entry.get("size_bytes", 0) for entry in entries)
+            while entries and total > budget:
+                entry = entries.pop()
+                self.delete(entry["key"])
+                total -= entry.get("size_bytes", 0)
+                evicted.append(entry["key"])
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} stored prompts from {self.root_dir}")
+        return evicted
@@ -0,0 +1,193 @@
+"""
+Cross-request micro-batching scheduler.
+
+Requests submitted from different threads (e.g. concurrent HTTP requests)
+are collected for a short window and compatible work items are merged into
+one batched ``generate_voice_design`` / ``generate_voice_clone`` call. Each
+caller gets a ``concurrent.futures.Future`` resolving to ``(audio, sample_rate)``.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from app.batching import bucket_by_length
+
+logger = logging.getLogger(__name__)
+
+# Collection window and batch size presets
+PROFILES = {
+    # Keep queueing delay minimal, merge only what is already waiting
+    "latency": {"max_wait_ms": 5.0, "max_batch_size": 4},
+    # Wait longer to build larger batches
+    "throughput": {"max_wait_ms": 50.0, "max_batch_size": 16},
+}
+
+
+class _WorkItem:
+    __slots__ = ("kind", "text", "language", "extra", "future", "enqueued_at")
+
+    def __init__(self, kind: str, text: str, language: str, extra: Any):
+        self.kind = kind
+        self.text = text
+        self.language = language
+        self.extra = extra
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """Collects single-item generation requests and runs them as batches on one engine"""
+
+    def __init__(self, engine, profile: str = "latency", max_wait_ms: Optional[float] = None, max_batch_size: Optional[int] = None, max_length_ratio: float = 2.0):
+        """
+        Initialize MicroBatchScheduler
+
+        Args:
+            engine: Qwen3TTSInnoFrance instance providing generate_design_batch/generate_clone_batch
+            profile: "latency" or "throughput" preset
+            max_wait_ms: Collection window override in milliseconds
+            max_batch_size: Maximum items per model call override
+            max_length_ratio: Maximum text length ratio of items merged in one call
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown scheduler profile: {profile}. Choose from {sorted(PROFILES)}")
+        preset = PROFILES[profile]
+        self.engine = engine
+        self.profile = profile
+        self.max_wait_ms = preset["max_wait_ms"] if max_wait_ms is None else max_wait_ms
+        self.max_batch_size = preset["max_batch_size"] if max_batch_size is None else max_batch_size
+        self.max_length_ratio = max_length_ratio
+
+        self._queue: "queue.Queue[Optional[_WorkItem]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._queue_waits: deque = deque(maxlen=1024)
+
+    def start(self) -> "MicroBatchScheduler":
+        """Start the batching thread"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True)
+                self._thread.start()
+                logger.info(f"Micro-batch scheduler started (profile={self.profile}, max_wait_ms={self.max_wait_ms}, max_batch_size={self.max_batch_size})")
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the batching thread after the queued work is done"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def on_scheduler_thread(self) -> bool:
+        """Whether the caller runs on the batching thread itself"""
+        return threading.current_thread() is self._thread
+
+    def submit_design(self, text: str, language: str, instruct: str) -> Future:
+        """Queue one voice design generation"""
+        return self._submit(_WorkItem("design", text, language, instruct))
+
+    def submit_clone(self, text: str, language: str, voice_clone_prompt: List[Any]) -> Future:
+        """Queue one voice clone generation"""
+        return self._submit(_WorkItem("clone", text, language, voice_clone_prompt))
+
+    def _submit(self, item: _WorkItem) -> Future:
+        self.start()
+        self._queue.put(item)
+        return item.future
+
+    def _collect(self, first: _WorkItem) -> List[_WorkItem]:
+        """Collect items until the window of the first item closes or the batch is full"""
+        items = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this round
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            items = self._collect(first)
+            started = time.perf_counter()
+            for kind in ("design", "clone"):
+                group = [item for item in items if item.kind == kind]
+                if not group:
+                    continue
+                for bucket in bucket_by_length([len(item.text) for item in group], self.max_batch_size, self.max_length_ratio):
+                    self._execute(kind, [group[i] for i in bucket], started)
+
+    def _execute(self, kind: str, batch: List[_WorkItem], started: float) -> None:
+        # Skip items whose caller cancelled while waiting
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._queue_waits.extend(started - item.enqueued_at for item in batch)
+
+        try:
+            texts = [item.text for item in batch]
+            languages = [item.language for item in batch]
+            if kind == "design":
+                wavs, sr = self.engine.generate_design_batch(texts, languages, [item.extra for item in batch])
+            else:
+                wavs, sr = self.engine.generate_clone_batch(texts, languages, [item.extra for item in batch])
+        except Exception as e:
+            logger.error(f"Batched {kind} generation of {len(batch)} items failed: {e}")
+            for item in batch:
+                item.future.set_exception(e)
+            return
+
+        for item, wav in zip(batch, wavs):
+            item.future.set_result((wav, sr))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch size and queue wait metrics"""
+        with self._stats_lock:
+            waits = sorted(self._queue_waits)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            batches, items = self._batches, self._items
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000.0
+
+        return {
+            "profile": self.profile,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "batch_size_histogram": batch_sizes,
+            "queue_wait_ms": {
+                "mean": sum(waits) / len(waits) * 1000.0 if waits else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": waits[-1] * 1000.0 if waits else 0.0,
+            },
+        }
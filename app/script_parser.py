@@ -0,0 +1,124 @@
+"""
+Streaming parser for multi-speaker scripts.
+
+Scripts mark speaker turns with ``[SPEAKERn]`` tags. ``iter_script_segments``
+reads a script line by line and yields ``(speaker_tag, text)`` segments, so
+book-length scripts never need to be held or regex-scanned as one string.
+``SpeakerIndex`` maps tags to speaker configs with dict lookups.
+"""
+import io
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_SPEAKER = "[SPEAKER0]"
+
+_SPEAKER_TAG = re.compile(r"\[SPEAKER(\d+)\]")
+
+# Long single-speaker passages are yielded in pieces of about this many characters
+MAX_SEGMENT_CHARS = 64 * 1024
+
+
+def _iter_lines(script: Union[str, Iterable[str]]) -> Iterable[str]:
+    if isinstance(script, str):
+        return io.StringIO(script)
+    return script
+
+
+def iter_script_segments(script: Union[str, Iterable[str]], max_segment_chars: int = MAX_SEGMENT_CHARS) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the speaker segments of a script incrementally
+
+    Text before the first tag (or a script without tags) belongs to [SPEAKER0].
+    Empty segments are skipped. A passage longer than max_segment_chars is
+    yielded in several segments, split at line ends.
+
+    Args:
+        script: Script text, or an iterable of lines such as an open text file
+        max_segment_chars: Size at which a long passage is yielded in pieces
+
+    Yields:
+        Tuple of (speaker_tag, stripped segment text)
+    """
+    speaker_tag = DEFAULT_SPEAKER
+    parts: List[str] = []
+    size = 0
+
+    for line in _iter_lines(script):
+        position = 0
+        for match in _SPEAKER_TAG.finditer(line):
+            parts.append(line[position:match.start()])
+            segment = "".join(parts).strip()
+            if segment:
+                yield speaker_tag, segment
+            speaker_tag = match.group(0)
+            parts, size = [], 0
+            position = match.end()
+
+        rest = line[position:]
+        parts.append(rest)
+        size += len(rest)
+        if size >= max_segment_chars:
+            segment = "".join(parts).strip()
+            if segment:
+                yield speaker_tag, segment
+            parts, size = [], 0
+
+    segment = "".join(parts).strip()
+    if segment:
+        yield speaker_tag, segment
+
+
+class SpeakerIndex:
+    """Resolves speaker tags to speaker config indices"""
+
+    def __init__(self, speaker_configs: List[Dict]):
+        """
+        Initialize SpeakerIndex
+
+        Tags are resolved in this order: a config with a matching explicit
+        speaker_tag, the config at the tag's number if that config has no
+        speaker_tag, then the n-th distinct tag of the script maps to the n-th
+        config (clamped to the last one).
+
+        Args:
+            speaker_configs: Speaker configuration list
+        """
+        if not speaker_configs:
+            raise ValueError("No speaker configurations available")
+        self.speaker_configs = speaker_configs
+        self._explicit: Dict[str, int] = {}
+        for config_idx, config in enumerate(speaker_configs):
+            if "speaker_tag" in config:
+                self._explicit.setdefault(config["speaker_tag"], config_idx)
+        self._resolved: Dict[str, int] = {}
+
+    def resolve(self, speaker_tag: str) -> int:
+        """
+        Return the config index of a speaker tag
+
+        Args:
+            speaker_tag: Tag such as [SPEAKER1]
+
+        Returns:
+            Index into speaker_configs
+        """
+        config_idx = self._resolved.get(speaker_tag)
+        if config_idx is not None:
+            return config_idx
+
+        config_idx = self._explicit.get(speaker_tag)
+        if config_idx is None:
+            match = _SPEAKER_TAG.fullmatch(speaker_tag)
+            speaker_num: Optional[int] = int(match.group(1)) if match else None
+            if speaker_num is not None and speaker_num < len(self.speaker_configs) and "speaker_tag" not in self.speaker_configs[speaker_num]:
+                config_idx = speaker_num
+            else:
+                # Cyclic default by order of first appearance
+                config_idx = min(len(self._resolved), len(self.speaker_configs) - 1)
+
+        self._resolved[speaker_tag] = config_idx
+        return config_idx
+
+    def config_for(self, speaker_tag: str) -> Dict:
+        """Return the speaker config of a tag"""
+        return self.speaker_configs[self.resolve(speaker_tag)]
@@ -0,0 +1,348 @@
+"""
+Render sinks: destinations that rendered audio chunks are written into.
+
+The engine's render methods push every chunk into a sink as soon as it is
+post-processed, so audio goes from the model straight to its destination:
+
+- ``FileSink``: an audio file on disk
+- ``ArraySink``: an in-memory float32 array (spills to a memory-mapped file when large)
+- ``WavStreamSink``: WAV bytes in a seekable binary stream (e.g. an HTTP response body)
+- ``SharedMemorySink``: a ``multiprocessing.shared_memory`` segment another process can map
+- ``TokenFileSink``: a compact speech codec token file, decoded on demand (see app.codec_tokens)
+
+``ProgressSink`` wraps another sink and reports every chunk written.
+"""
+import io
+import logging
+import os
+from abc import ABC, abstractmethod
+from multiprocessing import shared_memory
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.assembly import BufferAssembler, FileAssembler, current_rss_bytes
+from app.codec_tokens import SpeechTokenCodec, write_token_records
+
+logger = logging.getLogger(__name__)
+
+
+class RenderSink(ABC):
+    """Destination of rendered audio chunks"""
+
+    @abstractmethod
+    def write(self, chunk: np.ndarray, sample_rate: int) -> None:
+        """Write one mono float chunk"""
+
+    @abstractmethod
+    def close(self) -> Any:
+        """Finish the output and return the sink's result"""
+
+    def abort(self) -> None:
+        """Release resources after a failed render"""
+        self.close()
+
+    @property
+    @abstractmethod
+    def length(self) -> int:
+        """Number of samples written"""
+
+    @property
+    @abstractmethod
+    def sample_rate(self) -> Optional[int]:
+        """Sample rate of the written audio, None before the first chunk"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Return output size and the peak RSS observed while writing"""
+
+
+class _AssemblerSink(RenderSink):
+    """Sink backed by an app.assembly assembler"""
+
+    _assembler: Any
+
+    def write(self, chunk: np.ndarray, sample_rate: int) -> None:
+        self._assembler.append(chunk, sample_rate)
+
+    @property
+    def length(self) -> int:
+        return self._assembler.length
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self._assembler.sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return self._assembler.stats()
+
+
+class FileSink(_AssemblerSink):
+    """Writes chunks to an audio file as they arrive"""
+
+    def __init__(self, path: str, subtype: Optional[str] = None):
+        """
+        Initialize FileSink
+
+        Args:
+            path: Output file path, the format follows the extension
+            subtype: soundfile subtype, format default if None
+        """
+        self.path = path
+        self._assembler = FileAssembler(path, subtype=subtype)
+
+    def close(self) -> str:
+        """Finish the file and return its path"""
+        return self._assembler.close()
+
+    def abort(self) -> None:
+        # Do not leave a truncated file behind
+        self._assembler.close()
+        if self._assembler.length and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class ArraySink(_AssemblerSink):
+    """Collects chunks into one float32 array"""
+
+    def __init__(self, spill_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize ArraySink
+
+        Args:
+            spill_bytes: Buffer size above which the buffer moves to a memory-mapped temp file
+        """
+        self._assembler = BufferAssembler(spill_bytes=spill_bytes)
+
+    def close(self) -> Tuple[np.ndarray, Optional[int]]:
+        """Return (audio_data, sample_rate) without copying"""
+        return self._assembler.result()
+
+
+class WavStreamSink(_AssemblerSink):
+    """Encodes chunks as WAV into a seekable binary stream"""
+
+    def __init__(self, stream: Optional[BinaryIO] = None, subtype: str = "PCM_16"):
+        """
+        Initialize WavStreamSink
+
+        Args:
+            stream: Seekable binary stream, a new BytesIO if None
+            subtype: WAV sample format
+        """
+        self.stream = stream if stream is not None else io.BytesIO()
+        self._assembler = FileAssembler(self.stream, subtype=subtype, format="WAV")
+
+    def close(self) -> BinaryIO:
+        """Finish the WAV header and return the stream, rewound to the start"""
+        self._assembler.close()
+        self.stream.seek(0)
+        return self.stream
+
+
+class SharedMemorySink(RenderSink):
+    """Collects chunks into a float32 shared memory segment"""
+
+    def __init__(self, initial_samples: int = 24000 * 30):
+        """
+        Initialize SharedMemorySink
+
+        Args:
+            initial_samples: Initial segment capacity in samples, doubled as needed
+        """
+        self._sample_rate: Optional[int] = None
+        self._length = 0
+        self._shm = shared_memory.SharedMemory(create=True, size=max(int(initial_samples), 1) * 4)
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+
+    def _view(self, shm: shared_memory.SharedMemory) -> np.ndarray:
+        return np.ndarray((shm.size // 4,), dtype=np.float32, buffer=shm.buf)
+
+    def write(self, chunk: np.ndarray, sample_rate: int) -> None:
+        if self._sample_rate is None:
+            self._sample_rate = int(sample_rate)
+        elif int(sample_rate) != self._sample_rate:
+            raise ValueError(f"Chunk sample rate {sample_rate} does not match {self._sample_rate}")
+        end = self._length + len(chunk)
+        if end * 4 > self._shm.size:
+            capacity = self._shm.size // 4
+            while capacity < end:
+                capacity *= 2
+            grown = shared_memory.SharedMemory(create=True, size=capacity * 4)
+            self._view(grown)[:self._length] = self._view(self._shm)[:self._length]
+            self._release()
+            self._shm = grown
+        self._view(self._shm)[self._length:end] = chunk
+        self._length = end
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def _release(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Hand the segment over to the reader
+
+        Returns:
+            Dict with the segment name, sample count and sample rate; the reader
+            attaches with read_shared_audio, which also unlinks the segment
+        """
+        name = self._shm.name
+        self._shm.close()
+        return {"name": name, "samples": self._length, "sample_rate": self.sample_rate}
+
+    def abort(self) -> None:
+        self._release()
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self._sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self._length,
+            "sample_rate": self.sample_rate,
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+class TokenFileSink(RenderSink):
+    """Encodes every chunk into speech codec tokens appended to a token file"""
+
+    def __init__(self, path: str, codec: SpeechTokenCodec):
+        """
+        Initialize TokenFileSink
+
+        Args:
+            path: Output token file path (.qtc), read back with app.codec_tokens.load_tokens
+            codec: Codec used to encode the chunks
+        """
+        self.path = path
+        self.codec = codec
+        self._file = open(path, "wb")
+        self._bytes = write_token_records(self._file, [])
+        self._sample_rate: Optional[int] = None
+        self._length = 0
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+
+    def write(self, chunk: np.ndarray, sample_rate: int) -> None:
+        if self._sample_rate is None:
+            self._sample_rate = int(sample_rate)
+        elif int(sample_rate) != self._sample_rate:
+            raise ValueError(f"Chunk sample rate {sample_rate} does not match {self._sample_rate}")
+        codes = self.codec.encode(chunk, sample_rate)
+        self._bytes += write_token_records(self._file, [(codes, sample_rate, len(chunk))], header=False)
+        self._length += len(chunk)
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def close(self) -> str:
+        """Finish the token file and return its path"""
+        if not self._file.closed:
+            self._file.close()
+        return self.path
+
+    def abort(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self._sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "samples": self._length,
+            "sample_rate": self.sample_rate,
+            "bytes": self._bytes,
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+        }
+
+
+class ProgressSink(RenderSink):
+    """Forwards chunks to another sink and reports every chunk written"""
+
+    def __init__(self, sink: RenderSink, on_chunk: Callable[[int], None]):
+        self.sink = sink
+        self.on_chunk = on_chunk
+        self.chunks = 0
+
+    def write(self, chunk: np.ndarray, sample_rate: int) -> None:
+        self.sink.write(chunk, sample_rate)
+        self.chunks += 1
+        self.on_chunk(self.chunks)
+
+    def close(self) -> Any:
+        return self.sink.close()
+
+    def abort(self) -> None:
+        self.sink.abort()
+
+    @property
+    def length(self) -> int:
+        return self.sink.length
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.sink.sample_rate
+
+    def stats(self) -> Dict[str, Any]:
+        return self.sink.stats()
+
+
+def read_shared_audio(handle: Dict[str, Any]) -> Tuple[np.ndarray, Optional[int]]:
+    """
+    Copy audio out of a segment written by SharedMemorySink and free the segment
+
+    Args:
+        handle: Result of SharedMemorySink.close
+
+    Returns:
+        Tuple of (audio_data, sample_rate)
+    """
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        audio = np.ndarray((handle["samples"],), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return audio, handle["sample_rate"]
+
+
+def write_shared_audio(handle: Dict[str, Any], sink: RenderSink) -> None:
+    """
+    Write audio from a segment written by SharedMemorySink into another sink and free the segment
+
+    The sink reads the mapped segment directly, without an intermediate copy.
+
+    Args:
+        handle: Result of SharedMemorySink.close
+        sink: Destination sink, left open
+    """
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        audio = np.ndarray((handle["samples"],), dtype=np.float32, buffer=shm.buf)
+        if handle["samples"]:
+            sink.write(audio, handle["sample_rate"])
+        # The view must be gone before the mapping can be closed
+        del audio
+    finally:
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # The sink failed while the view was alive; the mapping is released with it
+            pass
@@ -0,0 +1,134 @@
+"""
+Length-bounded text splitting for synthesis chunks.
+
+Text is cut at sentence ends first. A sentence that is still too long is cut
+at clause punctuation, then at whitespace, then (for unbroken runs such as
+long CJK passages without punctuation) at an arbitrary character. The
+original punctuation and spacing are kept because chunks are slices of the
+input.
+
+Length is measured as a weight rather than raw characters: a CJK character
+is about one spoken syllable, so it counts ``CJK_WEIGHT`` times a Latin
+character. This gives chunks of comparable duration across scripts.
+"""
+import math
+import re
+from typing import List, Pattern, Tuple
+
+# Weight of one CJK character relative to one Latin character
+CJK_WEIGHT = 3
+
+_CJK = re.compile(r"[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+# Zero-width split points, from coarsest to finest
+_SENTENCE_BREAK = re.compile(
+    r"(?<=[。！？])(?![。！？.!?])"            # CJK sentence end
+    r"|(?<=[.!?])(?=\s)"                      # Latin sentence end followed by whitespace
+    r"|(?<=[.!?][\"'”’)\]])(?=\s)"            # ... with a closing quote or bracket
+)
+_CLAUSE_BREAK = re.compile(r"(?<=[，；、：])|(?<=[,;:])(?=\s)")
+_WORD_BREAK = re.compile(r"(?<=\s)(?=\S)")
+
+_LEVELS: Tuple[Pattern, ...] = (_SENTENCE_BREAK, _CLAUSE_BREAK, _WORD_BREAK)
+
+Span = Tuple[int, int, int]  # (start, end, weight)
+
+
+def text_weight(text: str) -> int:
+    """
+    Return the budget weight of a text
+
+    Args:
+        text: Input text
+
+    Returns:
+        Number of characters, with CJK characters counted CJK_WEIGHT times
+    """
+    return len(text) + (CJK_WEIGHT - 1) * len(_CJK.findall(text))
+
+
+def _split_span(text: str, start: int, end: int, pattern: Pattern) -> List[Tuple[int, int]]:
+    spans = []
+    for match in pattern.finditer(text, start, end):
+        point = match.start()
+        if start < point < end:
+            spans.append((start, point))
+            start = point
+    spans.append((start, end))
+    return spans
+
+
+def _hard_cut(text: str, start: int, end: int, max_weight: int) -> List[Span]:
+    """Cut an unbreakable run into pieces of at most max_weight and about equal size"""
+    weights = [CJK_WEIGHT if _CJK.match(text, i) else 1 for i in range(start, end)]
+    total = sum(weights)
+    limit = min(max_weight, math.ceil(total / math.ceil(total / max_weight)))
+    spans = []
+    piece_start, weight = start, 0
+    for i, char_weight in zip(range(start, end), weights):
+        if weight + char_weight > limit and i > piece_start:
+            spans.append((piece_start, i, weight))
+            piece_start, weight = i, 0
+        weight += char_weight
+    spans.append((piece_start, end, weight))
+    return spans
+
+
+def _units(text: str, start: int, end: int, max_weight: int, level: int = 0) -> List[Span]:
+    """Break a span into units that each fit max_weight, using the coarsest possible split level"""
+    if level == len(_LEVELS):
+        return _hard_cut(text, start, end, max_weight)
+    units = []
+    for s, e in _split_span(text, start, end, _LEVELS[level]):
+        weight = text_weight(text[s:e])
+        if weight <= max_weight:
+            units.append((s, e, weight))
+        else:
+            units.extend(_units(text, s, e, max_weight, level + 1))
+    return units
+
+
+def _pack(units: List[Span], max_weight: int, target: float) -> List[Tuple[int, int]]:
+    """Group consecutive units into chunks close to target weight, never above max_weight"""
+    chunks = []
+    chunk_start, chunk_end, weight = None, None, 0
+    for start, end, unit_weight in units:
+        if chunk_start is not None and (
+            weight + unit_weight > max_weight
+            # Close early when that lands closer to the target than adding the unit
+            or weight + unit_weight - target > target - weight
+        ):
+            chunks.append((chunk_start, chunk_end))
+            chunk_start, weight = None, 0
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+        weight += unit_weight
+    if chunk_start is not None:
+        chunks.append((chunk_start, chunk_end))
+    return chunks
+
+
+def split_text(text: str, max_length: int = 300) -> List[str]:
+    """
+    Split text into chunks of bounded weight
+
+    Args:
+        text: Input text
+        max_length: Maximum weight per chunk (see text_weight)
+
+    Returns:
+        List of stripped, non-empty chunks; chunks are contiguous slices of the
+        input, so punctuation and inner spacing are preserved
+    """
+    if max_length < CJK_WEIGHT:
+        raise ValueError(f"max_length must be at least {CJK_WEIGHT}")
+    total = text_weight(text)
+    if total <= max_length:
+        return [text]
+
+    units = _units(text, 0, len(text), max_length)
+    # Balance chunk sizes over the smallest chunk count the bound allows
+    target = sum(weight for _, _, weight in units) / math.ceil(total / max_length)
+    chunks = [text[start:end].strip() for start, end in _pack(units, max_length, target)]
+    return [chunk for chunk in chunks if chunk]
@@ -0,0 +1,211 @@
+"""
+Pitch-preserving time-stretching with WSOLA (waveform similarity overlap-add).
+
+Audio is cut into Hann-windowed frames that are overlap-added at a fixed
+synthesis hop. The analysis hop is ``speed`` times the synthesis hop, so the
+output plays faster or slower while every frame keeps its original pitch.
+Each frame is shifted within a small tolerance to the position that best
+continues the previous frame, which avoids phase clicks.
+
+``TimeStretcher`` works block by block and only keeps about two frames of
+input and one frame of output, so memory does not depend on the length of
+the audio.
+
+Requested playback speeds go through ``effective_speed`` before stretching,
+which keeps the softer speed-up of the original resampling implementation.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Supported playback speed range
+MIN_SPEED = 0.5
+MAX_SPEED = 3.0
+
+# Samples processed per block by time_stretch
+BLOCK_SIZE = 65536
+
+# Share of a speed-up above 1.0 that is applied, e.g. speed 2.0 plays 1.7x faster
+SPEEDUP_SCALE = 0.7
+
+
+def effective_speed(speed: float) -> float:
+    """
+    Return the stretch ratio applied for a requested playback speed
+
+    Speeds above 1.0 are softened by SPEEDUP_SCALE, slower speeds are applied as is.
+
+    Args:
+        speed: Requested playback speed, range 0.5-3.0
+
+    Returns:
+        Ratio of input to output duration
+    """
+    return 1.0 + (speed - 1.0) * SPEEDUP_SCALE if speed > 1.0 else speed
+
+
+class TimeStretcher:
+    """Streaming WSOLA time-stretcher for mono float audio"""
+
+    def __init__(self, speed: float, sample_rate: int, frame_ms: float = 30.0, tolerance_ms: float = 7.5, decimation: int = 2):
+        """
+        Initialize TimeStretcher
+
+        Args:
+            speed: Playback speed, range 0.5-3.0 (2.0 halves the duration)
+            sample_rate: Sample rate of the audio
+            frame_ms: Analysis frame length in milliseconds
+            tolerance_ms: Maximum frame shift searched for the best overlap in milliseconds
+            decimation: Sample stride of the overlap search, higher is faster and coarser
+        """
+        if speed < MIN_SPEED or speed > MAX_SPEED:
+            raise ValueError(f"Playback speed must be in range {MIN_SPEED}-{MAX_SPEED}")
+        self.speed = float(speed)
+        self.sample_rate = sample_rate
+        self.synthesis_hop = max(int(sample_rate * frame_ms / 2000.0), 16)
+        self.frame_length = 2 * self.synthesis_hop
+        self.analysis_hop = self.synthesis_hop * self.speed
+        self.tolerance = max(int(sample_rate * tolerance_ms / 1000.0), 1)
+        self.decimation = max(int(decimation), 1)
+        # Periodic Hann windows at half-frame hop sum to one
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame_length) / self.frame_length)).astype(np.float32)
+
+        # Input is conceptually prefixed with half a frame of silence so the
+        # first output samples are not faded in; that much output is dropped
+        self._input = np.zeros(self.synthesis_hop, dtype=np.float32)
+        self._input_start = 0
+        self._input_count = 0
+        self._frame_index = 0
+        self._prev_pos: Optional[int] = None
+        self._overlap = np.zeros(self.synthesis_hop, dtype=np.float32)
+        self._to_drop = self.synthesis_hop
+        self._emitted = 0
+        self._flushed = False
+
+    def _input_end(self) -> int:
+        return self._input_start + len(self._input)
+
+    def _next_frame(self, final: bool) -> Optional[int]:
+        """Return the input position of the next frame, or None if more input is needed"""
+        nominal = int(round(self._frame_index * self.analysis_hop))
+        if self._prev_pos is None:
+            lo = hi = nominal
+        else:
+            lo = max(nominal - self.tolerance, 0)
+            hi = nominal + self.tolerance
+        needed = hi + self.frame_length
+        if self._prev_pos is not None:
+            needed = max(needed, self._prev_pos + self.synthesis_hop + self.frame_length)
+        if needed > self._input_end():
+            if not final:
+                return None
+            # Pad with silence past the end of the input
+            self._input = np.concatenate([self._input, np.zeros(needed - self._input_end(), dtype=np.float32)])
+        if lo == hi:
+            return lo
+
+        # Frame that would naturally follow the previous one
+        natural = self._prev_pos + self.synthesis_hop - self._input_start
+        template = self._input[natural:natural + self.frame_length:self.decimation]
+        region = self._input[lo - self._input_start:hi - self._input_start + self.frame_length:self.decimation]
+        # Cross-correlation of every candidate shift (in steps of the decimation) in one call
+        scores = np.correlate(region, template, mode="valid")
+        return lo + self.decimation * int(np.argmax(scores))
+
+    def _render(self, final: bool) -> np.ndarray:
+        out = []
+        while True:
+            pos = self._next_frame(final)
+            if pos is None:
+                break
+            start = pos - self._input_start
+            frame = self._input[start:start + self.frame_length] * self.window
+            out.append(self._overlap + frame[:self.synthesis_hop])
+            self._overlap = frame[self.synthesis_hop:].copy()
+            self._prev_pos = pos
+            self._frame_index += 1
+
+            # Drop input no future frame can reach
+            keep_from = min(
+                int(round(self._frame_index * self.analysis_hop)) - self.tolerance,
+                self._prev_pos + self.synthesis_hop,
+            )
+            if keep_from - self._input_start > self.frame_length:
+                self._input = self._input[keep_from - self._input_start:]
+                self._input_start = keep_from
+
+            if final and self._emitted + sum(len(o) for o in out) - self._to_drop >= self._target_length():
+                break
+
+        if not out:
+            return np.zeros(0, dtype=np.float32)
+        rendered = np.concatenate(out)
+        if self._to_drop:
+            dropped = min(self._to_drop, len(rendered))
+            rendered = rendered[dropped:]
+            self._to_drop -= dropped
+        if final:
+            rendered = rendered[:max(self._target_length() - self._emitted, 0)]
+        self._emitted += len(rendered)
+        return rendered
+
+    def _target_length(self) -> int:
+        return int(round(self._input_count / self.speed))
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Stretch the next block of input
+
+        Args:
+            block: Next mono samples of the input
+
+        Returns:
+            Stretched samples that are ready, may be empty
+        """
+        if self._flushed:
+            raise RuntimeError("TimeStretcher already flushed")
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        self._input = np.concatenate([self._input, block])
+        self._input_count += len(block)
+        return self._render(final=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        Stretch the remaining input
+
+        Returns:
+            Last stretched samples; the total output length is round(input_length / speed)
+        """
+        if self._flushed:
+            return np.zeros(0, dtype=np.float32)
+        self._flushed = True
+        rendered = self._render(final=True)
+        missing = self._target_length() - self._emitted
+        if missing > 0:
+            rendered = np.concatenate([rendered, np.zeros(missing, dtype=np.float32)])
+            self._emitted += missing
+        return rendered
+
+
+def time_stretch(audio: np.ndarray, speed: float, sample_rate: int, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    Change the duration of audio without changing its pitch
+
+    Args:
+        audio: Mono audio data
+        speed: Playback speed, range 0.5-3.0
+        sample_rate: Sample rate of the audio
+        block_size: Number of input samples processed per block
+
+    Returns:
+        Stretched audio of length round(len(audio) / speed)
+    """
+    if speed == 1.0:
+        return audio
+    stretcher = TimeStretcher(speed, sample_rate)
+    out = [stretcher.process(audio[i:i + block_size]) for i in range(0, len(audio), block_size)]
+    out.append(stretcher.flush())
+    return np.concatenate(out)
@@ -0,0 +1,296 @@
+"""
+Per-request stage timings and an opt-in profiler.
+
+The engine wraps its stages in ``span(name)``: reading reference text and
+audio, voice clone prompt creation, the voice design pre-pass of designed
+speakers, each generate call, waiting for an engine turn, time stretching,
+resampling, encoding and writing to the sink. Spans only cost anything
+inside a trace, which ``start_trace()`` opens for one request. The trace and
+the current span travel in context variables, so spans recorded on the
+inference executor and the render pipeline threads nest under the request
+that started them.
+
+``TracingMiddleware`` (FastAPI) and ``trace_flask`` (Flask) trace every
+request, return the per-stage totals in a ``Server-Timing`` header and the
+trace id in ``X-Trace-Id``, and append the full trace as one JSON line to
+``TRACE_LOG`` when set. With ``PROFILE_DIR`` set, a request sent with an
+``X-Profile: cprofile`` or ``X-Profile: torch`` header also has its render
+profiled, and the profile is saved as ``<PROFILE_DIR>/<trace_id>.prof``
+(cProfile) or ``.json`` (torch.profiler Chrome trace).
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spans kept per trace, later spans only count towards the stage totals
+MAX_SPANS = 2000
+
+PROFILERS = ("cprofile", "torch")
+
+
+class Trace:
+    """Nested stage timings of one request"""
+
+    def __init__(self, name: str, profile: Optional[str] = None):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.profile = profile
+        self.profile_path: Optional[str] = None
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        # Stage name -> [total seconds, count]
+        self.totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, name: str, parent: Optional[int]) -> Optional[int]:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return None
+            self.spans.append({
+                "name": name,
+                "parent": parent,
+                "start_ms": round((time.perf_counter() - self._started) * 1000.0, 3),
+                "duration_ms": None,
+                "thread": threading.current_thread().name,
+            })
+            return len(self.spans) - 1
+
+    def _close(self, index: Optional[int], name: str, duration: float) -> None:
+        with self._lock:
+            if index is not None:
+                self.spans[index]["duration_ms"] = round(duration * 1000.0, 3)
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += duration
+            total[1] += 1
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+
+    def server_timing(self) -> str:
+        """Return the stage totals as a Server-Timing header value"""
+        with self._lock:
+            totals = sorted(self.totals.items(), key=lambda item: -item[1][0])
+        metrics = [f'{name};dur={seconds * 1000.0:.1f};desc="{count}x"' for name, (seconds, count) in totals]
+        if self.duration is not None:
+            metrics.append(f"total;dur={self.duration * 1000.0:.1f}")
+        return ", ".join(metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "name": self.name,
+                "started_at": self.started_at,
+                "duration_ms": round(self.duration * 1000.0, 3) if self.duration is not None else None,
+                "stages": {name: {"total_ms": round(seconds * 1000.0, 3), "count": count} for name, (seconds, count) in self.totals.items()},
+                "spans": [dict(s) for s in self.spans],
+                "dropped_spans": self.dropped,
+                "profile": self.profile_path,
+            }
+
+
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar = contextvars.ContextVar("trace_parent", default=None)
+_log_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed stage in the current trace, if any"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    index = trace._open(name, _parent.get())
+    token = _parent.set(index)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _parent.reset(token)
+        trace._close(index, name, time.perf_counter() - started)
+
+
+def write_trace_log(trace: Trace, **fields: Any) -> None:
+    """Append a finished trace as one JSON line to TRACE_LOG, if set"""
+    path = os.environ.get("TRACE_LOG")
+    if not path:
+        return
+    record = {**trace.to_dict(), **fields}
+    try:
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to write trace log {path}: {e}")
+
+
+@contextmanager
+def start_trace(name: str, profile: Optional[str] = None) -> Iterator[Trace]:
+    """
+    Trace the enclosed work, e.g. one request or one render job
+
+    Args:
+        name: Trace name, e.g. "POST /api/voice-clone"
+        profile: "cprofile" or "torch" to profile the render run through profiled(), None to skip
+    """
+    trace = Trace(name, profile=profile)
+    token = _trace.set(trace)
+    parent_token = _parent.set(None)
+    try:
+        yield trace
+    finally:
+        _parent.reset(parent_token)
+        _trace.reset(token)
+        trace.finish()
+
+
+def profile_mode(header: Optional[str]) -> Optional[str]:
+    """Return the profiler requested by an X-Profile header, None unless PROFILE_DIR enables profiling"""
+    if not header or not os.environ.get("PROFILE_DIR"):
+        return None
+    mode = header.strip().lower()
+    if mode not in PROFILERS:
+        logger.warning(f"Ignoring unknown profiler {header!r}, choose from {list(PROFILERS)}")
+        return None
+    return mode
+
+
+class _Profiler:
+    """cProfile or torch.profiler session of one trace, saved to PROFILE_DIR when stopped"""
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        profile_dir = os.environ["PROFILE_DIR"]
+        os.makedirs(profile_dir, exist_ok=True)
+        extension = "prof" if trace.profile == "cprofile" else "json"
+        self.path = os.path.join(profile_dir, f"{trace.trace_id}.{extension}")
+        if trace.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+        else:
+            import torch
+
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities)
+
+    def start(self) -> None:
+        if self.trace.profile == "cprofile":
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self) -> None:
+        try:
+            if self.trace.profile == "cprofile":
+                self._profiler.disable()
+                self._profiler.dump_stats(self.path)
+            else:
+                self._profiler.stop()
+                self._profiler.export_chrome_trace(self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save {self.trace.profile} profile {self.path}: {e}")
+            return
+        self.trace.profile_path = self.path
+        logger.info(f"Saved {self.trace.profile} profile of {self.trace.name} to {self.path}")
+
+
+def profiled(fn: Callable[[], Any]) -> Any:
+    """
+    Call fn, under the profiler requested by the current trace if any
+
+    Call this on the thread that does the work: cProfile only sees the thread it runs on.
+    """
+    trace = _trace.get()
+    if trace is None or trace.profile is None:
+        return fn()
+    profiler = _Profiler(trace)
+    profiler.start()
+    try:
+        return fn()
+    finally:
+        profiler.stop()
+
+
+class TracingMiddleware:
+    """ASGI middleware tracing every HTTP request, see the module docstring"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        status = [500]
+        with start_trace(f"{scope['method']} {scope['path']}", profile=profile_mode(headers.get("x-profile"))) as trace:
+
+            async def send_wrapper(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    status[0] = message["status"]
+                    # The body is rendered before the response starts, so its stages are all closed
+                    trace.finish()
+                    extra = [(b"server-timing", trace.server_timing().encode("latin-1")), (b"x-trace-id", trace.trace_id.encode("latin-1"))]
+                    message = {**message, "headers": list(message.get("headers", [])) + extra}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                trace.finish()
+                write_trace_log(trace, status=status[0])
+
+
+def trace_flask(app: Any) -> None:
+    """Trace every Flask request, profiling the whole request when asked to"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_trace():
+        g.trace_context = start_trace(f"{request.method} {request.path}", profile=profile_mode(request.headers.get("X-Profile")))
+        g.trace = g.trace_context.__enter__()
+        # Flask renders on the request thread, so the profiler can wrap the whole request
+        g.trace_profiler = None
+        if g.trace.profile is not None:
+            g.trace_profiler = _Profiler(g.trace)
+            g.trace_profiler.start()
+
+    @app.after_request
+    def _add_headers(response):
+        trace = g.get("trace")
+        if trace is not None:
+            trace.finish()
+            response.headers["Server-Timing"] = trace.server_timing()
+            response.headers["X-Trace-Id"] = trace.trace_id
+            g.trace_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _end_trace(error=None):
+        trace_context = g.pop("trace_context", None)
+        if trace_context is None:
+            return
+        trace = g.pop("trace")
+        profiler = g.pop("trace_profiler", None)
+        if profiler is not None:
+            profiler.stop()
+        trace_context.__exit__(None, None, None)
+        write_trace_log(trace, status=g.pop("trace_status", 500))
@@ -0,0 +1,220 @@
+"""
+On-disk cache of rendered utterances for incremental re-rendering.
+
+Each generated chunk is saved as ``<key>.wav`` (32-bit float), or as
+``<key>.qtc`` speech codec tokens when a ``SpeechTokenCodec`` is given (about
+240x smaller, decoded on read, see app.codec_tokens), keyed by a hash of the
+voice prompt, language, normalised chunk text, generation parameters and seed. Re-rendering an edited script only generates the
+chunks whose key changed and reads the others back from disk. Audio is
+cached before speed changes and resampling, so those can differ between
+renders. Files are written atomically and the least recently used entries
+are evicted once the cache is over its size budget.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from app.codec_tokens import TOKEN_SUFFIX, SpeechTokenCodec, load_tokens, write_token_records
+from app.planner import utterance_key
+from app.prompt_store import _atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+def hash_utterance(prompt_key: str, language: str, text: str, params: Optional[Dict[str, Any]] = None, seed: Optional[int] = None) -> str:
+    """
+    Compute the cache key of a rendered utterance
+
+    Args:
+        prompt_key: Content hash of the voice clone prompt (see hash_reference_audio)
+        language: Language the chunk is rendered in
+        text: Chunk text, whitespace is normalised
+        params: Generation parameters affecting the audio (e.g. the model path)
+        seed: Random seed of the generation, None if unseeded
+
+    Returns:
+        Hex digest identifying the utterance
+    """
+    _, _, normalized = utterance_key("", language, text)
+    payload = "\x1f".join([
+        prompt_key,
+        language,
+        normalized,
+        json.dumps(params or {}, sort_keys=True),
+        "" if seed is None else str(int(seed)),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def response_headers(stats: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Return HTTP headers reporting the utterance cache statistics of one render
+
+    Args:
+        stats: report["utterance_cache"] of the render, may be None
+
+    Returns:
+        X-Utterance-Cache-* headers, empty if the cache is disabled
+    """
+    if not stats or not stats.get("enabled"):
+        return {}
+    return {
+        "X-Utterance-Cache-Hits": str(stats["hits"]),
+        "X-Utterance-Cache-Misses": str(stats["misses"]),
+        "X-Utterance-Cache-Hit-Rate": f"{stats['hit_rate']:.3f}",
+    }
+
+
+class UtteranceCache:
+    """Directory of rendered chunk audio with size-based LRU eviction"""
+
+    def __init__(self, root_dir: str, max_bytes: int = 4 * 1024 * 1024 * 1024, codec: Optional[SpeechTokenCodec] = None):
+        """
+        Initialize UtteranceCache
+
+        Args:
+            root_dir: Directory holding the cached audio, created if missing
+            max_bytes: Maximum total size of the cache, least recently used entries are evicted first
+            codec: Store utterances as speech codec tokens instead of float WAV if set
+        """
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.suffix = TOKEN_SUFFIX if codec is not None else ".wav"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(root_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._scan())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, f"{key}{self.suffix}")
+
+    def _scan(self):
+        """Return (mtime, path, size) of every cached file"""
+        entries = []
+        for name in os.listdir(self.root_dir):
+            if not name.endswith((".wav", TOKEN_SUFFIX)):
+                continue
+            path = os.path.join(self.root_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Load a cached utterance and mark it as recently used
+
+        Args:
+            key: Utterance hash from hash_utterance
+
+        Returns:
+            Tuple of (audio_data, sample_rate), or None if the utterance is not cached
+        """
+        path = self._path(key)
+        try:
+            if self.codec is not None:
+                audio, sr = load_tokens(path, self.codec)
+            else:
+                audio, sr = sf.read(path, dtype="float32")
+            os.utime(path)
+        except Exception as e:
+            if os.path.exists(path):
+                logger.warning(f"Failed to load cached utterance {key[:12]}: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return audio, sr
+
+    def record_misses(self, count: int = 1) -> None:
+        """Count lookups answered by a membership test instead of get"""
+        with self._lock:
+            self.misses += count
+
+    def put(self, key: str, audio: np.ndarray, sample_rate: int) -> None:
+        """
+        Save a rendered utterance, evicting old entries to stay in budget
+
+        Args:
+            key: Utterance hash from hash_utterance
+            audio: Mono float audio
+            sample_rate: Sample rate of the audio
+        """
+        if self.max_bytes <= 0:
+            return
+        path = self._path(key)
+        # Replacing an entry only adds the difference in size
+        try:
+            replaced_bytes = os.path.getsize(path)
+        except OSError:
+            replaced_bytes = 0
+        if self.codec is not None:
+            codes = self.codec.encode(audio, sample_rate)
+            _atomic_write(path, lambda f: write_token_records(f, [(codes, sample_rate, len(audio))]))
+        else:
+            _atomic_write(path, lambda f: sf.write(f, np.asarray(audio, dtype=np.float32), sample_rate, subtype="FLOAT", format="WAV"))
+        with self._lock:
+            self._total_bytes += os.path.getsize(path) - replaced_bytes
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used utterances until the cache fits its size budget
+
+        Args:
+            max_bytes: Size budget, defaults to the cache budget
+
+        Returns:
+            Number of evicted utterances
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._lock:
+            entries = sorted(self._scan())
+            total = sum(size for _, _, size in entries)
+            # Evict a little below the budget so puts do not rescan every time
+            target = budget * 0.9 if total > budget else budget
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            self._total_bytes = total
+            self.evictions += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} cached utterances from {self.root_dir}")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,177 @@
+"""
+Startup warmup of the TTS engine.
+
+``Warmup`` loads the configured models, runs one short voice design and one
+voice clone generation so the first request does not pay for model loading
+and first-kernel compilation, and optionally pre-builds voice clone prompts
+for a list of speakers. The clone run uses the designed warmup voice, else
+a configured reference clip, else a synthetic tone. It runs in a background thread at service startup;
+``status()`` backs the readiness endpoint, which reports not ready until the
+warmup has finished.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+WARMUP_TEXT = "Hello, this is a warmup."
+WARMUP_INSTRUCT = "A clear, neutral voice."
+
+
+def synthetic_reference(seconds: float = 2.0, sample_rate: int = 24000) -> Tuple[np.ndarray, int]:
+    """Return a voice-like tone (a 150 Hz harmonic series at a syllable-rate envelope) as clone warmup reference"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = sum(np.sin(2 * np.pi * 150.0 * k * t) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t)
+    return (0.3 * tone * envelope / np.max(np.abs(tone))).astype(np.float32), sample_rate
+
+
+class Warmup:
+    """Loads models and runs short generations before the service reports ready"""
+
+    def __init__(self, models: Optional[List[str]] = None, voices_path: Optional[str] = None,
+                 text: str = WARMUP_TEXT, language: str = "English", enabled: bool = True,
+                 ref_audio: Optional[str] = None, ref_text: Optional[str] = None):
+        """
+        Initialize Warmup
+
+        Args:
+            models: Models to load and exercise, default is ["design", "clone"]
+            voices_path: Speaker configuration JSON file whose voice clone prompts are pre-built, optional
+            text: Text generated by the warmup runs
+            language: Language of the warmup text
+            enabled: When False the service is ready immediately and models load on first use
+            ref_audio: Reference clip of the clone run when the design model is not warmed up, a synthetic tone if None
+            ref_text: Transcript of ref_audio, default is the warmup text
+        """
+        self.models = ["design", "clone"] if models is None else list(models)
+        self.voices_path = voices_path
+        self.text = text
+        self.language = language
+        self.ref_audio = ref_audio
+        self.ref_text = ref_text
+        self.state = PENDING if enabled else DISABLED
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "Warmup":
+        """Build a warmup from WARMUP_ENABLED, WARMUP_MODELS, WARMUP_VOICES, WARMUP_TEXT and WARMUP_REF_AUDIO/_TEXT"""
+        models = os.environ.get("WARMUP_MODELS", "design,clone")
+        return cls(
+            models=[name.strip() for name in models.split(",") if name.strip()],
+            voices_path=os.environ.get("WARMUP_VOICES") or None,
+            text=os.environ.get("WARMUP_TEXT", WARMUP_TEXT),
+            enabled=os.environ.get("WARMUP_ENABLED", "true").lower() == "true",
+            ref_audio=os.environ.get("WARMUP_REF_AUDIO") or None,
+            ref_text=os.environ.get("WARMUP_REF_TEXT") or None,
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.state in (READY, DISABLED)
+
+    def _step(self, name: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = fn()
+        self.timings[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"Warmup step {name} took {self.timings[name]:.2f}s")
+        return result
+
+    def run(self, engine: Any) -> Dict[str, float]:
+        """
+        Run the warmup on an engine
+
+        Args:
+            engine: Qwen3TTSInnoFrance instance
+
+        Returns:
+            Duration in seconds of each warmup step
+        """
+        if self.state == DISABLED:
+            return self.timings
+        self.state = RUNNING
+        started = time.perf_counter() - self.timings.get("engine", 0.0)
+        try:
+            for name in self.models:
+                self._step(f"load_{name}", lambda: engine.models.get(name))
+
+            # Generation calls bypass the micro-batching scheduler, warming the same kernels it uses
+            reference, ref_text = None, self.text
+            if "design" in self.models:
+                wavs, sr = self._step("design", lambda: engine.generate_design_batch(
+                    [self.text], [self.language], [WARMUP_INSTRUCT]))
+                reference = (wavs[0], sr)
+            elif self.ref_audio:
+                reference, ref_text = self.ref_audio, self.ref_text or self.text
+            else:
+                # Any audio exercises the same prompt extraction and generation kernels
+                reference = synthetic_reference()
+            if "clone" in self.models:
+                prompt = self._step("clone_prompt", lambda: engine._get_voice_clone_prompt(reference, ref_text))
+                self._step("clone", lambda: engine.generate_clone_batch([self.text], [self.language], [prompt]))
+
+            if self.voices_path:
+                with open(self.voices_path, "r", encoding="utf-8") as f:
+                    speaker_configs = json.load(f)
+                self._step("voice_prompts", lambda: engine.prebuild_voice_prompts(speaker_configs))
+
+            self.timings["total"] = round(time.perf_counter() - started, 3)
+            self.state = READY
+            logger.info(f"Warmup finished in {self.timings['total']:.1f}s")
+        except Exception as e:
+            self.error = str(e)
+            self.state = FAILED
+            logger.error(f"Warmup failed: {e}")
+        return self.timings
+
+    def start(self, engine_fn: Callable[[], Any]) -> "Warmup":
+        """
+        Run the warmup in a background thread
+
+        Args:
+            engine_fn: Callable returning the engine, called on the warmup thread
+                so engine construction does not block startup
+        """
+        if self.state != PENDING or self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run_in_thread, args=(engine_fn,), name="warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_in_thread(self, engine_fn: Callable[[], Any]) -> None:
+        self.state = RUNNING
+        try:
+            engine = self._step("engine", engine_fn)
+        except Exception as e:
+            self.error = str(e)
+            self.state = FAILED
+            logger.error(f"Warmup failed: {e}")
+            return
+        self.run(engine)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Return the warmup state, step durations and error, if any"""
+        return {
+            "state": self.state,
+            "models": self.models,
+            "timings": dict(self.timings),
+            "error": self.error,
+        }
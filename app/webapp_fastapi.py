@@ -1,13 +1,14 @@
+import codecs
 import io
 import json
 import logging
 import os
-import tempfile
 from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi.responses import Response, HTMLResponse
 from fastapi.templating import Jinja2Templates
-from app.core import Qwen3TTSInnoFrance
-import soundfile as sf
+from app.concurrency import render_request
+from app.engine_registry import get_engine
+from app.sinks import WavStreamSink
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,16 +19,24 @@ router = APIRouter()
 base_dir = os.path.dirname(os.path.abspath(__file__))
 templates = Jinja2Templates(directory=os.path.join(base_dir, "templates"))
 
-# Initialize TTS engine
+# TTS engine, shared with the other front ends through app.engine_registry
 tts_engine = None
 
 def init_tts_engine():
     """Initialize TTS engine"""
     global tts_engine
     if tts_engine is None:
-        device = os.environ.get("DEVICE", "cuda:0")
-        tts_engine = Qwen3TTSInnoFrance(device=device)
-        logger.info("TTS engine initialized")
+        tts_engine = get_engine()
+    return tts_engine
+
+def _wav_response(stream: io.BytesIO, filename: str) -> Response:
+    """Return WAV bytes rendered into a stream as an attachment"""
+    # BytesIO.getvalue() hands over its buffer without copying when no views are held
+    return Response(
+        content=stream.getvalue(),
+        media_type='audio/wav',
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -37,6 +46,7 @@ async def index(request: Request):
 
 @router.post('/voice-design')
 async def voice_design(
+    request: Request,
     text: str = Form(...),
     language: str = Form(...),
     instruct: str = Form(...),
@@ -45,85 +55,70 @@ async def voice_design(
     """Voice design endpoint"""
     try:
         logger.info("Voice design request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not all([text, language, instruct]):
             logger.warning("Missing required parameters: text, language, instruct")
             raise HTTPException(status_code=400, detail="Missing required parameters: text, language, instruct")
         
-        # Execute voice design in memory
-        audio_data, sample_rate = tts_engine.voice_design_cli_in_memory(
+        # Render straight into the response body
+        wav_stream = await render_request(
+            request,
+            'voice-design',
+            init_tts_engine,
+            'render_voice_design',
             text=text,
             language=language,
             instruct=instruct,
+            sink=WavStreamSink(),
             speed=speed
         )
         
         logger.info("Voice design completed, returning audio data")
+        return _wav_response(wav_stream, "output_voice_design.wav")
         
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": "attachment; filename=output_voice_design.wav"}
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice design error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/voice-design-file')
-async def voice_design_file(config: UploadFile = File(...)):
+async def voice_design_file(request: Request, config: UploadFile = File(...)):
     """Voice design via file endpoint"""
     try:
         logger.info("Voice design file request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not config:
             logger.warning("Missing configuration file")
             raise HTTPException(status_code=400, detail="Missing configuration file")
         
-        # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_file:
-            # Read file content
-            file_content = await config.read()
-            temp_file.write(file_content.decode('utf-8'))
-            temp_file_path = temp_file.name
-        
-        logger.info(f"Processing voice design from file: {temp_file_path}")
-        # Execute voice design in memory
-        audio_data, sample_rate = tts_engine.voice_design_json_in_memory(temp_file_path)
-        
-        # Delete temporary file
-        os.unlink(temp_file_path)
+        # Parse the uploaded configuration directly, no temporary file needed
+        file_content = await config.read()
+        design_config = json.loads(file_content.decode('utf-8'))
+        
+        logger.info("Processing voice design from config file")
+        wav_stream = await render_request(
+            request,
+            'voice-design-file',
+            init_tts_engine,
+            'render_voice_design',
+            text=design_config['text'],
+            language=design_config['language'],
+            instruct=design_config['instruct'],
+            sink=WavStreamSink(),
+            speed=design_config.get('speed', 1.0)
+        )
         
         logger.info("Voice design file processing completed, returning audio data")
+        return _wav_response(wav_stream, "output_voice_design.wav")
         
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": "attachment; filename=output_voice_design.wav"}
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice design file error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/voice-clone')
 async def voice_clone(
+    request: Request,
     text: str = Form(...),
     speaker_configs: str = Form(...),
     speed: float = Form(1.0)
@@ -131,9 +126,6 @@ async def voice_clone(
     """Voice cloning endpoint"""
     try:
         logger.info("Voice cloning request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not all([text, speaker_configs]):
             logger.warning("Missing required parameters: text, speaker_configs")
             raise HTTPException(status_code=400, detail="Missing required parameters: text, speaker_configs")
@@ -145,33 +137,30 @@ async def voice_clone(
             logger.warning("Invalid speaker_configs JSON format")
             raise HTTPException(status_code=400, detail="Invalid speaker_configs JSON format")
         
-        # Execute voice cloning in memory
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
+        # Render straight into the response body
+        wav_stream = await render_request(
+            request,
+            'voice-clone',
+            init_tts_engine,
+            'render_voice_clone',
             text=text,
             speaker_configs=speaker_configs_parsed,
+            sink=WavStreamSink(),
             speed=speed
         )
         
         logger.info("Voice cloning completed, returning audio data")
+        return _wav_response(wav_stream, "output_voice_clone.wav")
         
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": "attachment; filename=output_voice_clone.wav"}
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice cloning error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('/voice-clone-files')
 async def voice_clone_files(
+    request: Request,
     text_file: UploadFile = File(...),
     speakers_config: UploadFile = File(...),
     speed: float = Form(1.0)
@@ -179,58 +168,31 @@ async def voice_clone_files(
     """Voice cloning via files endpoint"""
     try:
         logger.info("Voice cloning files request received")
-        # Initialize TTS engine
-        init_tts_engine()
-        
         if not text_file or not speakers_config:
             logger.warning("Missing required files: text_file or speakers_config")
             raise HTTPException(status_code=400, detail="Missing required files: text_file or speakers_config")
         
-        # Save uploaded files to temporary location
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.txt') as temp_text_file:
-            text_content = await text_file.read()
-            temp_text_file.write(text_content.decode('utf-8'))
-            temp_text_file_path = temp_text_file.name
-            
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix='.json') as temp_speakers_file:
-            speakers_content = await speakers_config.read()
-            temp_speakers_file.write(speakers_content.decode('utf-8'))
-            temp_speakers_file_path = temp_speakers_file.name
-        
-        # Read text content
-        with open(temp_text_file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-            
-        # Read speaker configurations
-        with open(temp_speakers_file_path, 'r', encoding='utf-8') as f:
-            speaker_configs = json.load(f)
-            
-        # Delete temporary files
-        os.unlink(temp_text_file_path)
-        os.unlink(temp_speakers_file_path)
+        # The script is parsed line by line from the upload, no temporary files needed
+        script_lines = codecs.iterdecode(text_file.file, 'utf-8')
+        speaker_configs = json.loads((await speakers_config.read()).decode('utf-8'))
         
         logger.info(f"Processing voice cloning with {len(speaker_configs)} speakers")
-        # Execute voice cloning in memory
-        audio_data, sample_rate = tts_engine.voice_clone_with_speakers_in_memory(
-            text=text,
+        wav_stream = await render_request(
+            request,
+            'voice-clone-files',
+            init_tts_engine,
+            'render_voice_clone',
+            text=script_lines,
             speaker_configs=speaker_configs,
+            sink=WavStreamSink(),
             speed=speed
         )
         
         logger.info("Voice cloning files processing completed, returning audio data")
+        return _wav_response(wav_stream, "output_voice_clone.wav")
         
-        # Convert numpy array to WAV bytes
-        wav_buffer = io.BytesIO()
-        sf.write(wav_buffer, audio_data, sample_rate, format='WAV')
-        wav_buffer.seek(0)
-        
-        # Return audio file directly using StreamingResponse
-        return StreamingResponse(
-            wav_buffer,
-            media_type='audio/wav',
-            headers={"Content-Disposition": "attachment; filename=output_voice_clone.wav"}
-        )
-        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Voice cloning files error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
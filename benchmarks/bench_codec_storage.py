@@ -0,0 +1,104 @@
+"""
+Benchmark speech codec token storage against WAV and FLAC for rendered chunks.
+
+Usage:
+    python benchmarks/bench_codec_storage.py --tokenizer /path/to/Qwen3-TTS-12Hz-1.7B-Base/speech_tokenizer
+    python benchmarks/bench_codec_storage.py --input speech.wav --chunk-seconds 8 --device cuda:0
+
+Audio is cut into chunks like rendered utterances and every chunk is written
+to its own file in each format. The report lists the disk footprint per
+second of audio, the time to write all chunks (including encoding for
+tokens) and the time to read them back (including decoding for tokens), and
+the signal-to-noise ratio of the round trip. Without --input a synthetic
+voiced signal is used; real speech gives more representative SNR figures.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.codec_tokens import SpeechTokenCodec, TOKEN_SUFFIX, load_tokens, save_tokens
+
+
+def synthetic_voice(seconds: float, sample_rate: int) -> np.ndarray:
+    """Harmonic signal with a wandering pitch and syllable-rate amplitude envelope"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t) ** 2
+    return (0.2 * voice * envelope).astype(np.float32)
+
+
+def snr_db(reference: np.ndarray, decoded: np.ndarray) -> float:
+    noise = np.sum((reference - decoded) ** 2)
+    return float("inf") if noise == 0 else 10 * np.log10(np.sum(reference ** 2) / noise)
+
+
+def run_format(name, chunks, sample_rate, out_dir, write_fn, read_fn, suffix):
+    paths = [os.path.join(out_dir, f"{name}_{i}{suffix}") for i in range(len(chunks))]
+    started = time.perf_counter()
+    for path, chunk in zip(paths, chunks):
+        write_fn(path, chunk)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = [read_fn(path) for path in paths]
+    read_seconds = time.perf_counter() - started
+
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    audio_seconds = sum(len(chunk) for chunk in chunks) / sample_rate
+    snr = snr_db(np.concatenate(chunks), np.concatenate(decoded))
+    print(f"{name:12s} {total_bytes / audio_seconds:10.0f} B/s  write {write_seconds:7.2f} s  "
+          f"read {read_seconds:7.2f} s  SNR {snr:6.1f} dB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer", default=os.path.join(os.environ.get("VOICE_CLONE_MODEL_PATH", "Qwen/Qwen3-TTS-12Hz-1.7B-Base"), "speech_tokenizer"),
+                        help="Speech tokenizer path (default: the speech_tokenizer folder of $VOICE_CLONE_MODEL_PATH)")
+    parser.add_argument("--device", default=os.environ.get("DEVICE", "cpu"))
+    parser.add_argument("--input", default=None, help="Speech WAV file, synthetic audio if omitted")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Duration of the synthetic audio")
+    parser.add_argument("--chunk-seconds", type=float, default=8.0, help="Length of one stored utterance")
+    parser.add_argument("--skip-tokens", action="store_true", help="Only benchmark WAV and FLAC")
+    args = parser.parse_args()
+
+    if args.input:
+        audio, sample_rate = sf.read(args.input, dtype="float32", always_2d=False)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=-1)
+    else:
+        sample_rate = 24000
+        audio = synthetic_voice(args.seconds, sample_rate)
+    step = int(args.chunk_seconds * sample_rate)
+    chunks = [audio[i:i + step] for i in range(0, len(audio), step)]
+    print(f"Input: {len(audio) / sample_rate:.0f} s at {sample_rate} Hz in {len(chunks)} chunks of {args.chunk_seconds:.0f} s")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        read_wav = lambda path: sf.read(path, dtype="float32")[0]
+        run_format("wav-float32", chunks, sample_rate, out_dir,
+                   lambda path, chunk: sf.write(path, chunk, sample_rate, subtype="FLOAT"), read_wav, ".wav")
+        run_format("wav-pcm16", chunks, sample_rate, out_dir,
+                   lambda path, chunk: sf.write(path, chunk, sample_rate, subtype="PCM_16"), read_wav, ".wav")
+        run_format("flac-pcm16", chunks, sample_rate, out_dir,
+                   lambda path, chunk: sf.write(path, chunk, sample_rate, subtype="PCM_16", format="FLAC"), read_wav, ".flac")
+
+        if not args.skip_tokens:
+            from qwen_tts import Qwen3TTSTokenizer
+
+            tokenizer = Qwen3TTSTokenizer.from_pretrained(args.tokenizer, device_map=args.device)
+            codec = SpeechTokenCodec(tokenizer)
+            run_format("codec-tokens", chunks, sample_rate, out_dir,
+                       lambda path, chunk: save_tokens(path, codec, chunk, sample_rate),
+                       lambda path: load_tokens(path, codec)[0], TOKEN_SUFFIX)
+
+
+if __name__ == "__main__":
+    main()
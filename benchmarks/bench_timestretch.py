@@ -0,0 +1,65 @@
+"""
+Benchmark WSOLA time-stretching against the previous FFT resample speed change.
+
+Usage:
+    python benchmarks/bench_timestretch.py --seconds 3600 --speed 1.5
+
+The old implementation runs one FFT over the whole signal, so its time and
+memory grow with the total duration (and with large prime factors of the
+length); the WSOLA engine processes fixed-size blocks.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+from scipy.signal import resample
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.timestretch import effective_speed, time_stretch
+
+
+def fft_resample(audio: np.ndarray, speed: float) -> np.ndarray:
+    """Previous _adjust_audio_speed: resample the whole signal (pitch shifts with speed)"""
+    return resample(audio, int(len(audio) / effective_speed(speed)))
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3600.0, help="Input duration in seconds")
+    parser.add_argument("--sample-rate", type=int, default=24000)
+    parser.add_argument("--speed", type=float, default=1.5)
+    parser.add_argument("--skip-fft", action="store_true", help="Only run the WSOLA engine")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Odd length: a prime-ish factorisation is the slow case for the FFT
+    length = int(args.seconds * args.sample_rate) | 1
+    audio = (0.1 * rng.standard_normal(length)).astype(np.float32)
+    print(f"Input: {args.seconds:.0f} s at {args.sample_rate} Hz ({length} samples), speed {args.speed}x")
+    print(f"Baseline peak RSS: {peak_rss_mb():.0f} MB")
+
+    started = time.perf_counter()
+    stretched = time_stretch(audio, effective_speed(args.speed), args.sample_rate)
+    elapsed = time.perf_counter() - started
+    print(f"WSOLA:        {elapsed:8.2f} s  ({args.seconds / elapsed:7.0f}x realtime)  "
+          f"out={len(stretched)}  peak RSS {peak_rss_mb():.0f} MB")
+    del stretched
+
+    if not args.skip_fft:
+        started = time.perf_counter()
+        resampled = fft_resample(audio, args.speed)
+        elapsed = time.perf_counter() - started
+        print(f"FFT resample: {elapsed:8.2f} s  ({args.seconds / elapsed:7.0f}x realtime)  "
+              f"out={len(resampled)}  peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ setup(
         "torch>=2.6.0",
         "soundfile>=0.12.0",
         "numpy>=1.21.0",
+        "prometheus-client>=0.17.0",
         "scipy>=1.7.0",
         "flask>=2.0.0",
         "flask-cors>=3.0.0",
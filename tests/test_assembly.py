@@ -0,0 +1,126 @@
+import sys
+import os
+import tempfile
+import logging
+import numpy as np
+import soundfile as sf
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.assembly import BufferAssembler, FileAssembler
+from app.core import Qwen3TTSInnoFrance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a ramp whose length is proportional to the text length"""
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        return [np.linspace(0, 1, 100 * len(t), dtype=np.float32) for t in texts], 24000
+
+
+SCRIPT = "[SPEAKER0]Hello there.[SPEAKER1]General Kenobi.[SPEAKER0]You are a bold one."
+SPEAKERS = [
+    {"speaker_tag": "[SPEAKER0]", "ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"},
+    {"speaker_tag": "[SPEAKER1]", "ref_audio": (np.zeros(2400, dtype=np.float32), 24000), "ref_text": "one"},
+]
+
+
+def test_buffer_assembler_grows_and_spills():
+    """Test the buffer grows geometrically and keeps its content after spilling to disk"""
+    logger.info("Testing buffer assembler growth and spill...")
+
+    chunks = [np.full(1000, i, dtype=np.float32) for i in range(20)]
+    assembler = BufferAssembler(initial_samples=500, spill_bytes=16 * 1024)
+    for chunk in chunks:
+        assembler.append(chunk, 24000)
+    audio, sr = assembler.result()
+    assert sr == 24000 and audio.dtype == np.float32
+    assert np.array_equal(audio, np.concatenate(chunks))
+    assert assembler.spilled and isinstance(audio, np.memmap)
+    assert assembler.stats()["peak_rss_bytes"] > 0
+
+    small = BufferAssembler(initial_samples=500)
+    small.append(chunks[1], 24000)
+    assert not small.spilled and len(small.result()[0]) == 1000
+    try:
+        small.append(chunks[1], 16000)
+        assert False, "sample rate mismatch was accepted"
+    except ValueError:
+        pass
+    logger.info("PASS: Buffer assembler growth and spill test passed")
+
+    return True
+
+
+def test_file_assembler_and_engine_report():
+    """Test chunks stream to a file and renders report their memory use"""
+    logger.info("Testing file assembler and render memory report...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "out.wav")
+        with FileAssembler(path, subtype="FLOAT") as assembler:
+            assembler.append(np.ones(100, dtype=np.float32), 24000)
+            assembler.append(np.zeros(50, dtype=np.float32), 24000)
+        audio, sr = sf.read(path, dtype="float32")
+        assert sr == 24000 and len(audio) == 150 and audio[0] == 1.0
+
+        report = {}
+        output_path = tts.voice_clone_with_speakers(SCRIPT, SPEAKERS, os.path.join(tmp_dir, "clone.wav"), report=report)
+        expected = 100 * len("Hello there.General Kenobi.You are a bold one.")
+        assert sf.info(output_path).frames == expected
+        assert report["memory"]["samples"] == expected
+        assert report["memory"]["peak_rss_bytes"] >= report["memory"]["start_rss_bytes"]
+
+    report = {}
+    audio, sr = tts.voice_clone_with_speakers_in_memory(SCRIPT, SPEAKERS, report=report)
+    assert len(audio) == expected and report["memory"]["spilled"] is False
+    logger.info("PASS: File assembler and render memory report test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting assembly tests...\n")
+
+    tests = [
+        test_buffer_assembler_grows_and_spills,
+        test_file_assembler_and_engine_report,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,106 @@
+import sys
+import os
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.batching import bucket_by_length
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a constant signal whose length equals the text length"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        prompts = voice_clone_prompt if isinstance(text, list) else voice_clone_prompt * len(texts)
+        assert len(prompts) == len(texts)
+        self.calls.append(len(texts))
+        return [np.full(len(t), float(p), dtype=np.float32) for t, p in zip(texts, prompts)], 24000
+
+
+def test_bucket_by_length():
+    """Test length bucketing respects batch size and length ratio"""
+    logger.info("Testing length bucketing...")
+
+    lengths = [50, 10, 12, 100, 11, 48, 13]
+    buckets = bucket_by_length(lengths, max_batch_size=3)
+
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    assert all(len(bucket) <= 3 for bucket in buckets)
+    for bucket in buckets:
+        bucket_lengths = [lengths[i] for i in bucket]
+        assert max(bucket_lengths) <= 2 * min(bucket_lengths)
+    assert buckets[0] == [1, 4, 2]
+    logger.info(f"PASS: Length bucketing test passed, {len(buckets)} buckets")
+
+    return True
+
+
+def test_batched_clone_preserves_order():
+    """Test batched rendering issues fewer calls and keeps chunk order"""
+    logger.info("Testing batched voice clone rendering...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+
+    chunks = [("[SPEAKER0]", "a" * 30), ("[SPEAKER1]", "b" * 5), ("[SPEAKER0]", "c" * 28), ("[SPEAKER1]", "d" * 6)]
+    prompts = {"[SPEAKER0]": [0], "[SPEAKER1]": [1]}
+    languages = {"[SPEAKER0]": "English", "[SPEAKER1]": "English"}
+
+    sequential, _ = tts._generate_clone_chunks(chunks, prompts, languages, batch_size=1)
+    assert len(tts.voice_clone_model.calls) == 4
+
+    tts.voice_clone_model.calls = []
+    batched, sr = tts._generate_clone_chunks(chunks, prompts, languages, batch_size=8)
+    assert tts.voice_clone_model.calls == [2, 2]
+    assert sr == 24000
+    for expected, actual in zip(sequential, batched):
+        assert np.array_equal(expected, actual)
+    logger.info("PASS: Batched voice clone rendering test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting batching tests...\n")
+
+    tests = [
+        test_bucket_by_length,
+        test_batched_clone_preserves_order,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
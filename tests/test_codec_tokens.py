@@ -0,0 +1,167 @@
+import sys
+import os
+import io
+import tempfile
+import logging
+import numpy as np
+from types import SimpleNamespace
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.codec_tokens import SpeechTokenCodec, iter_token_records, load_tokens, write_token_records
+from app.sinks import TokenFileSink
+from app.utterance_cache import UtteranceCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeTokenizer:
+    """12.5 Hz, 16 codebooks at 24 kHz: each frame stores the frame mean, quantised to 1/1000"""
+
+    hop = 1920
+
+    def encode(self, audio, sr=None):
+        frames = int(np.ceil(len(audio) / self.hop))
+        padded = np.zeros(frames * self.hop, dtype=np.float32)
+        padded[:len(audio)] = audio
+        means = np.round(padded.reshape(frames, self.hop).mean(axis=1) * 1000).astype(np.int64)
+        return SimpleNamespace(audio_codes=[np.repeat(means[:, None], 16, axis=1)])
+
+    def decode(self, encoded):
+        codes = encoded["audio_codes"][0]
+        return [np.repeat(codes[:, 0] / 1000.0, self.hop).astype(np.float32)], 24000
+
+
+def test_token_records_round_trip():
+    """Test the token file format round trip and its size"""
+    logger.info("Testing token file format...")
+
+    codec = SpeechTokenCodec(FakeTokenizer())
+    audio = np.repeat(np.linspace(-0.5, 0.5, 125), 1920).astype(np.float32)[:24000 * 10 - 7]
+    codes = codec.encode(audio, 24000)
+    assert codes.shape == (125, 16) and codes.dtype == np.int16
+
+    stream = io.BytesIO()
+    size = write_token_records(stream, [(codes, 24000, len(audio)), (codes[:10], 16000, 12800)])
+    stream.seek(0)
+    records = list(iter_token_records(stream))
+    assert [(r[1], r[2]) for r in records] == [(24000, len(audio)), (16000, 12800)]
+    assert np.array_equal(records[0][0], codes)
+    # 10 s of 24 kHz audio: 960 KB as float32, about 4 KB as tokens
+    assert size < 5000 and audio.nbytes / (4 + 14 + codes.nbytes) > 200
+
+    # Decoding restores the original length and the sample rate of each record
+    decoded = codec.decode(codes, len(audio), 24000)
+    # The last frame is averaged with padding
+    assert len(decoded) == len(audio) and np.max(np.abs(decoded - audio)[:-1920]) < 1e-3
+    assert len(codec.decode(codes[:10], 12800, 16000)) == 12800
+    truncated = io.BytesIO(stream.getvalue()[:-3])
+    try:
+        list(iter_token_records(truncated))
+        assert False, "truncated file was accepted"
+    except ValueError:
+        pass
+    logger.info("PASS: Token file format test passed")
+
+    return True
+
+
+def test_token_storage_backends():
+    """Test the utterance cache and the token sink store codec tokens"""
+    logger.info("Testing token storage backends...")
+
+    loaded = []
+
+    def lazy_tokenizer():
+        loaded.append(True)
+        return FakeTokenizer()
+
+    codec = SpeechTokenCodec(lazy_tokenizer)
+    audio = np.repeat(np.linspace(-0.5, 0.5, 50), 1920).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = UtteranceCache(os.path.join(tmp_dir, "cache"), codec=codec)
+        assert not loaded
+        cache.put("key", audio, 24000)
+        assert os.listdir(cache.root_dir) == ["key.qtc"]
+        assert cache.stats()["bytes"] < audio.nbytes / 100
+        cached, sr = cache.get("key")
+        assert sr == 24000 and np.max(np.abs(cached - audio)) < 1e-3
+
+        path = os.path.join(tmp_dir, "render.qtc")
+        sink = TokenFileSink(path, codec)
+        sink.write(audio, 24000)
+        sink.write(audio[:1000], 24000)
+        assert sink.close() == path and sink.length == len(audio) + 1000
+        assert sink.stats()["bytes"] == os.path.getsize(path)
+        restored, sr = load_tokens(path, codec)
+        assert sr == 24000 and len(restored) == len(audio) + 1000
+    logger.info("PASS: Token storage backends test passed")
+
+    return True
+
+
+def test_engine_codec_holds_clone_model():
+    """Test the engine codec runs the tokenizer under an engine turn with the clone model in use"""
+    logger.info("Testing engine token codec...")
+
+    from app.priority import PriorityScheduler
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.priority = PriorityScheduler()
+    observed = []
+
+    class HeldTokenizer(FakeTokenizer):
+        def encode(self, audio, sr=None):
+            observed.append((tts.models.stats()["models"]["clone"]["in_use"], tts.priority.stats()["in_use"]))
+            return super().encode(audio, sr=sr)
+
+    tts.voice_clone_model = SimpleNamespace(model=SimpleNamespace(speech_tokenizer=HeldTokenizer()))
+    audio = np.repeat(np.linspace(-0.5, 0.5, 10), 1920).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = UtteranceCache(os.path.join(tmp_dir, "cache"), codec=tts.token_codec)
+        cache.put("key", audio, 24000)
+        cached, sr = cache.get("key")
+    assert observed == [(1, 1)] and sr == 24000 and len(cached) == len(audio)
+    assert tts.models.stats()["models"]["clone"]["in_use"] == 0
+    logger.info("PASS: Engine token codec test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting codec token tests...\n")
+
+    tests = [
+        test_token_records_round_trip,
+        test_token_storage_backends,
+        test_engine_codec_holds_clone_model,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,248 @@
+import sys
+import os
+import time
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.concurrency import InferenceLimiter, QueueFullError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BlockingEngine:
+    """Renders a short tone once released"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def render_voice_design(self, text, language, instruct, sink, speed=1.0):
+        self.started.set()
+        self.release.wait(30)
+        sink.write(np.zeros(2400, dtype=np.float32), 24000)
+        return sink.close()
+
+
+def test_limiter_bounds_queue():
+    """Test the limiter runs up to its concurrency, queues up to max_queue and rejects the rest"""
+    logger.info("Testing inference limiter...")
+
+    limiter = InferenceLimiter(concurrency=1, max_queue=1, retry_after=3.0)
+    release = threading.Event()
+    try:
+        running = limiter.submit(release.wait, 30)
+        queued = limiter.submit(lambda: "queued")
+        time.sleep(0.1)
+        try:
+            limiter.submit(lambda: "rejected")
+            assert False, "full queue did not reject"
+        except QueueFullError as e:
+            # One render waiting ahead on one worker, at the default render duration
+            assert e.retry_after == 6
+        stats = limiter.stats()
+        assert stats["in_flight"] == 1 and stats["queue_depth"] == 1 and stats["rejected"] == 1
+
+        release.set()
+        assert running.result(5) and queued.result(5) == "queued"
+        failing = limiter.submit(lambda: 1 / 0)
+        assert isinstance(failing.exception(5), ZeroDivisionError)
+        time.sleep(0.05)
+        stats = limiter.stats()
+        assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+        assert stats["completed"] == 2 and stats["failed"] == 1 and stats["avg_render_seconds"] is not None
+    finally:
+        release.set()
+        limiter.shutdown()
+    logger.info("PASS: Inference limiter test passed")
+
+    return True
+
+
+def test_limiter_admits_by_priority():
+    """Test waiting renders start by priority class and deadline, and expired ones fail without running"""
+    logger.info("Testing priority admission...")
+
+    from app.priority import BATCH, INTERACTIVE, DeadlineExceededError, request_priority
+
+    limiter = InferenceLimiter(concurrency=1, max_queue=4)
+    release = threading.Event()
+    order = []
+    try:
+        running = limiter.submit(release.wait, 30)
+        with request_priority(BATCH, client="jobs"):
+            batch = limiter.submit(order.append, "batch")
+        with request_priority(INTERACTIVE, client="b"):
+            later = limiter.submit(order.append, "interactive")
+        with request_priority(INTERACTIVE, client="a", timeout=10):
+            urgent = limiter.submit(order.append, "deadline")
+        with request_priority(INTERACTIVE, client="c", timeout=0.01):
+            expired = limiter.submit(order.append, "expired")
+        time.sleep(0.05)
+        release.set()
+        for future in (running, batch, later, urgent):
+            future.result(5)
+        assert isinstance(expired.exception(5), DeadlineExceededError)
+        assert order == ["deadline", "interactive", "batch"]
+
+        # A render cancelled while waiting frees its queue slot and never runs
+        release.clear()
+        running = limiter.submit(release.wait, 30)
+        cancelled = limiter.submit(order.append, "cancelled")
+        assert cancelled.cancel() and limiter.stats()["queue_depth"] == 0
+        release.set()
+        running.result(5)
+        assert limiter.submit(lambda: "next").result(5) == "next" and "cancelled" not in order
+    finally:
+        release.set()
+        limiter.shutdown()
+    logger.info("PASS: Priority admission test passed")
+
+    return True
+
+
+def test_default_concurrency():
+    """Test the default concurrency follows priority scheduling, micro-batching and the pool size"""
+    logger.info("Testing default concurrency...")
+
+    from app.concurrency import DEFAULT_PRIORITY_CONCURRENCY, default_concurrency
+
+    names = ("ENGINE_POOL_DEVICES", "INFERENCE_WORKER", "MICROBATCH_ENABLED", "PRIORITY_SCHEDULING", "PRIORITY_INFERENCE_CONCURRENCY")
+    saved = {name: os.environ.pop(name, None) for name in names}
+    try:
+        assert default_concurrency() == DEFAULT_PRIORITY_CONCURRENCY
+        os.environ["PRIORITY_INFERENCE_CONCURRENCY"] = "2"
+        assert default_concurrency() == 2
+        # Each replica interleaves requests on its own priority scheduler
+        os.environ["ENGINE_POOL_DEVICES"] = "cpu,cpu,cpu"
+        assert default_concurrency() == 6
+        os.environ["PRIORITY_SCHEDULING"] = "false"
+        assert default_concurrency() == 3
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    logger.info("PASS: Default concurrency test passed")
+
+    return True
+
+
+def test_health_responsive_during_render():
+    """Test /health answers while a long render runs, and a full queue returns 429 with Retry-After"""
+    logger.info("Testing non-blocking endpoints...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+    import app.webapp_fastapi as webapp_fastapi
+    from app import concurrency
+
+    app = FastAPI()
+    app.include_router(webapp_fastapi.router)
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    engine = BlockingEngine()
+    saved = api_fastapi.tts_engine, webapp_fastapi.tts_engine, concurrency._limiter
+    api_fastapi.tts_engine = webapp_fastapi.tts_engine = engine
+    concurrency._limiter = InferenceLimiter(concurrency=1, max_queue=0)
+    form = {"text": "Hello", "language": "English", "instruct": "calm"}
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        render = executor.submit(client.post, "/api/voice-design", data=form)
+        assert engine.started.wait(10)
+
+        started = time.perf_counter()
+        assert client.get("/api/health").status_code == 200
+        assert client.get("/health").status_code == 200
+        assert time.perf_counter() - started < 2.0 and not render.done()
+        stats = client.get("/api/inference").json()
+        assert stats["in_flight"] == 1 and stats["queue_depth"] == 0
+
+        for path in ("/api/voice-design", "/voice-design"):
+            response = client.post(path, data=form)
+            assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
+
+        engine.release.set()
+        response = render.result(10)
+        assert response.status_code == 200 and response.content[:4] == b"RIFF"
+        assert client.get("/api/inference").json()["rejected"] == 2
+    finally:
+        engine.release.set()
+        executor.shutdown()
+        concurrency._limiter.shutdown()
+        api_fastapi.tts_engine, webapp_fastapi.tts_engine, concurrency._limiter = saved
+    logger.info("PASS: Non-blocking endpoints test passed")
+
+    return True
+
+
+def test_run_request_passes_arguments():
+    """Test run_request hands positional and keyword arguments to the call, under the endpoint's priority class"""
+    logger.info("Testing run_request arguments...")
+
+    import asyncio
+    from types import SimpleNamespace
+    from app import concurrency
+    from app.priority import current_priority
+
+    def call(path, scale=1):
+        priority = current_priority()
+        return path, scale, priority.priority_class, priority.client
+
+    request = SimpleNamespace(headers={"X-Client-Id": "alice"}, client=None)
+    saved = concurrency._limiter
+    concurrency._limiter = InferenceLimiter(concurrency=1, max_queue=0)
+    try:
+        result = asyncio.run(concurrency.run_request(request, "jobs", call, "result.qtc", scale=2))
+        assert result == ("result.qtc", 2, concurrency.endpoint_classes["jobs"], "alice")
+    finally:
+        concurrency._limiter.shutdown()
+        concurrency._limiter = saved
+    logger.info("PASS: run_request arguments test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting concurrency tests...\n")
+
+    tests = [
+        test_limiter_bounds_queue,
+        test_limiter_admits_by_priority,
+        test_default_concurrency,
+        test_health_responsive_during_render,
+        test_run_request_passes_arguments,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
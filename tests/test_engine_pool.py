@@ -0,0 +1,292 @@
+import sys
+import os
+import json
+import time
+import tempfile
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.engine_pool import EnginePool, LeastLoadedRouter, ReplicaSpec, WorkerCrashedError, voice_affinity_key
+from app.jobs import DONE, JobRunner, JobStore
+from app.priority import BATCH, CLASSES, DeadlineExceededError, current_priority, request_priority
+from app.sinks import ArraySink
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeEngine:
+    """Renders the worker's pid as a constant signal after a short delay"""
+
+    def __init__(self, device):
+        self.device = device
+
+    def _render(self, sink, delay):
+        time.sleep(delay)
+        sink.write(np.full(100, os.getpid(), dtype=np.float32), 24000)
+        return sink.close()
+
+    def render_voice_design(self, text, language, instruct, sink, speed=1.0):
+        if not text:
+            raise ValueError("Empty text")
+        if text == "crash":
+            os._exit(3)
+        if text == "late":
+            raise DeadlineExceededError("Request deadline passed")
+        if text == "priority":
+            # Encodes the request priority the replica renders under
+            priority = current_priority()
+            sink.write(np.array([CLASSES.index(priority.priority_class), len(priority.client), priority.deadline is not None],
+                                dtype=np.float32), 24000)
+            return sink.close()
+        return self._render(sink, 0.3)
+
+    def render_voice_clone(self, text, speaker_configs, sink, speed=1.0, batch_size=None, report=None):
+        lines = text.splitlines() if isinstance(text, str) else text
+        report["lines"] = len(lines)
+        # One chunk per line
+        for _ in lines[1:]:
+            sink.write(np.full(100, os.getpid(), dtype=np.float32), 24000)
+        return self._render(sink, 0.05)
+
+
+def broken_factory(device):
+    raise RuntimeError("no weights")
+
+
+def test_router_prefers_affinity_within_slack():
+    """Test requests go to the least loaded replica unless their voice's replica is close enough"""
+    logger.info("Testing least-loaded router...")
+
+    router = LeastLoadedRouter(3, affinity_slack=1)
+    assert [router.acquire() for _ in range(3)] == [0, 1, 2]
+    router.release(1)
+    assert router.acquire("voice-a") == 1
+    # Within slack of the least loaded replica, voice-a sticks to replica 1
+    assert router.acquire("voice-a") == 1
+    assert router.acquire("voice-a") == 1
+    # Now replica 1 is two requests ahead and voice-a moves
+    assert router.acquire("voice-a") == 0
+    router.set_available(0, False)
+    assert router.acquire("voice-a") == 2
+    assert router.stats()["affinity_hits"] == 2 and router.stats()["affinity_misses"] == 3
+    assert router.stats()["in_flight"] == [2, 3, 2]
+    logger.info("PASS: Least-loaded router test passed")
+
+    return True
+
+
+def test_voice_affinity_key():
+    """Test affinity keys follow the reference voice content, not file names or other speaker fields"""
+    logger.info("Testing voice affinity keys...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for name, content in (("a.wav", b"voice-a"), ("upload-1234.wav", b"voice-a"), ("b.wav", b"voice-b")):
+            paths.append(os.path.join(tmp_dir, name))
+            with open(paths[-1], "wb") as f:
+                f.write(content)
+        key = voice_affinity_key([{"ref_audio": paths[0], "ref_text": "a"}])
+        # A re-upload of the same audio under a temp name is the same voice
+        assert voice_affinity_key([{"ref_audio": paths[1], "ref_text": "a", "language": "French"}]) == key
+        assert voice_affinity_key([{"ref_audio": paths[0], "ref_text": "a"}] * 2) == key
+        assert voice_affinity_key([{"ref_audio": paths[2], "ref_text": "a"}]) != key
+        assert voice_affinity_key([{"ref_audio": paths[0], "ref_text": "other"}]) != key
+        # ref_text is irrelevant in x-vector-only mode, as for the prompt cache
+        assert voice_affinity_key([{"ref_audio": paths[0], "ref_text": "a", "x_vector_only_mode": True}]) == \
+            voice_affinity_key([{"ref_audio": paths[0], "ref_text": "b", "x_vector_only_mode": True}])
+
+        design = {"design_text": "Hi", "design_instruct": "calm", "language": "English"}
+        mixed = voice_affinity_key([design, {"ref_audio": paths[0], "ref_text": "a"}])
+        assert voice_affinity_key([{"ref_audio": paths[1], "ref_text": "a"}, dict(design)]) == mixed
+        assert voice_affinity_key([dict(design, design_seed=3)]) != voice_affinity_key([design])
+    logger.info("PASS: Voice affinity key test passed")
+
+    return True
+
+
+def test_cpu_replicas_serve_concurrently():
+    """Test several CPU replica processes share concurrent requests and keep voice affinity"""
+    logger.info("Testing CPU engine pool...")
+
+    pool = EnginePool([ReplicaSpec("cpu", threads=1) for _ in range(3)], factory=FakeEngine).start()
+    try:
+        assert pool.wait_ready(timeout=120)
+        pids = {replica["pid"] for replica in pool.stats()["replicas"]}
+        assert len(pids) == 3 and os.getpid() not in pids
+
+        # Concurrent requests land on different replicas
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(lambda _: pool.render_voice_design("Hi", "English", "calm", ArraySink()), range(3)))
+        assert {int(audio[0]) for audio, sr in results} == pids
+
+        # The same voice keeps going to the same replica
+        speakers = [{"ref_audio": "voices/a.wav", "ref_text": "a"}]
+        report = {}
+        served = {int(pool.render_voice_clone(iter(["l1\n", "l2\n"]), speakers, ArraySink(), report=report)[0][0]) for _ in range(4)}
+        assert len(served) == 1 and report["lines"] == 2
+
+        # Chunk progress comes back from the replica while it renders
+        progress = []
+        pool.render_voice_clone(["l1\n", "l2\n", "l3\n"], speakers, ArraySink(), on_chunk=progress.append)
+        assert progress == [1, 2, 3]
+
+        # Render jobs get their chunk count from the plan and their progress from the replica
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = JobStore(tmp_dir)
+            runner = JobRunner(store, lambda: pool, progress_interval=0.0)
+            script = "[SPEAKER0] One.\n[SPEAKER1] Two.\n"
+            job_id = store.create("voice_clone", {"text": script, "speaker_configs": speakers * 2})
+            runner.run_job(store.claim())
+            job = store.get(job_id)
+            assert job["state"] == DONE and job["chunks_total"] == 2 and job["chunks_done"] == 2
+
+        try:
+            pool.render_voice_design("", "English", "calm", ArraySink())
+            assert False, "replica error was not raised"
+        except ValueError as e:
+            assert "Empty text" in str(e)
+        stats = pool.stats()
+        assert sum(r["completed"] for r in stats["replicas"]) == 9 and sum(r["failed"] for r in stats["replicas"]) == 1
+        # The job's speakers repeat the same voice, so it keeps the affinity too
+        assert stats["affinity_hits"] == 5 and all(r["in_flight"] == 0 for r in stats["replicas"])
+    finally:
+        pool.stop()
+
+    broken = EnginePool([ReplicaSpec("cpu", threads=1)], factory=broken_factory)
+    try:
+        future = broken.submit("design", text="Hi", language="English", instruct="calm")
+        assert "no weights" in str(future.exception(timeout=120))
+        assert not broken.ready and "no weights" in broken.stats()["replicas"][0]["error"]
+    finally:
+        broken.stop()
+    logger.info("PASS: CPU engine pool test passed")
+
+    return True
+
+
+def test_replica_serves_with_caller_priority():
+    """Test a replica renders requests concurrently under the caller's priority and reports deadlines by type"""
+    logger.info("Testing replica priority...")
+
+    pool = EnginePool([ReplicaSpec("cpu", threads=1)], factory=FakeEngine).start()
+    try:
+        assert pool.wait_ready(timeout=120)
+        with request_priority(BATCH, client="jobs", timeout=30):
+            audio, sr = pool.render_voice_design("priority", "English", "calm", ArraySink())
+        assert list(audio) == [CLASSES.index(BATCH), 4, 1]
+        audio, sr = pool.render_voice_design("priority", "English", "calm", ArraySink())
+        assert list(audio) == [0, 0, 0]
+        try:
+            pool.render_voice_design("late", "English", "calm", ArraySink())
+            assert False, "deadline was not reported"
+        except DeadlineExceededError:
+            pass
+
+        # Requests on one replica overlap, its priority scheduler orders their model calls
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: pool.render_voice_design("Hi", "English", "calm", ArraySink()), range(2)))
+        assert time.perf_counter() - started < 0.55
+    finally:
+        pool.stop()
+    logger.info("PASS: Replica priority test passed")
+
+    return True
+
+
+def test_default_factory_uses_registry():
+    """Test replica engines are built through the registry, so they get its schedulers"""
+    logger.info("Testing replica engine factory...")
+
+    from app.core import Qwen3TTSInnoFrance
+    from app.engine_pool import _default_factory
+    from app.engine_registry import registry
+    from app.priority import PriorityScheduler
+
+    saved = registry.factory, dict(registry._configs), dict(registry._engines), os.environ.get("WARMUP_ENABLED")
+    registry.factory = lambda config: Qwen3TTSInnoFrance(lazy_load=True, **config)
+    registry._engines.clear()
+    os.environ["WARMUP_ENABLED"] = "false"
+    try:
+        engine = _default_factory("cpu")
+        assert engine.device == "cpu" and registry.peek() is engine
+        assert isinstance(engine.priority, PriorityScheduler)
+    finally:
+        registry.factory, registry._configs, registry._engines = saved[0], saved[1], saved[2]
+        if saved[3] is None:
+            os.environ.pop("WARMUP_ENABLED", None)
+        else:
+            os.environ["WARMUP_ENABLED"] = saved[3]
+    logger.info("PASS: Replica engine factory test passed")
+
+    return True
+
+
+def test_crashed_replica_restarts():
+    """Test a replica crash fails its in-flight request, then the replica restarts and serves again"""
+    logger.info("Testing replica crash recovery...")
+
+    pool = EnginePool([ReplicaSpec("cpu", threads=1)], factory=FakeEngine).start()
+    try:
+        assert pool.wait_ready(timeout=120)
+        first_pid = pool.stats()["replicas"][0]["pid"]
+        try:
+            pool.render_voice_design("crash", "English", "calm", ArraySink())
+            assert False, "crash was not reported"
+        except WorkerCrashedError as e:
+            assert "exited with code 3" in str(e)
+
+        assert pool.wait_ready(timeout=120)
+        audio, sr = pool.render_voice_design("Hi", "English", "calm", ArraySink())
+        replica = pool.stats()["replicas"][0]
+        assert int(audio[0]) == replica["pid"] != first_pid
+        assert replica["crashes"] == 1 and replica["failed"] == 1 and replica["in_flight"] == 0
+    finally:
+        pool.stop()
+    logger.info("PASS: Replica crash recovery test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting engine pool tests...\n")
+
+    tests = [
+        test_router_prefers_affinity_within_slack,
+        test_voice_affinity_key,
+        test_cpu_replicas_serve_concurrently,
+        test_replica_serves_with_caller_priority,
+        test_default_factory_uses_registry,
+        test_crashed_replica_restarts,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
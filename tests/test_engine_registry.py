@@ -0,0 +1,156 @@
+import sys
+import os
+import logging
+from types import SimpleNamespace
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import engine_registry
+from app.engine_registry import EngineRegistry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeModels:
+    def stats(self):
+        return {"models": {"clone": {"state": "device", "bytes": 1000}, "design": {"state": "unloaded", "bytes": 0}}}
+
+
+def fake_factory(created):
+    def build(config):
+        created.append(config)
+        return SimpleNamespace(config=config, models=FakeModels(), scheduler=None, priority=None)
+    return build
+
+
+def test_engines_are_shared_by_configuration():
+    """Test names with the same configuration share one engine and setup runs once per engine"""
+    logger.info("Testing engine registry...")
+
+    created = []
+    registry = EngineRegistry(factory=fake_factory(created))
+    registry.configure("default", device="cuda:0")
+    registry.configure("alias", device="cuda:0")
+    registry.configure("cpu", device="cpu", lazy_load=True)
+    setups = []
+    registry.add_setup_hook(setups.append)
+
+    assert registry.peek("default") is None
+    engine = registry.get()
+    assert registry.get("alias") is engine and registry.get("default") is engine
+    assert registry.get("cpu") is not engine
+    assert created == [{"device": "cuda:0"}, {"device": "cpu", "lazy_load": True}]
+    assert setups == [engine, registry.get("cpu")]
+
+    stats = registry.stats()
+    assert stats["engine_count"] == 2 and stats["model_bytes"] == 2000
+    assert stats["engines"][0]["names"] == ["default", "alias"]
+    assert stats["engines"][0]["models"] == {"clone": "device", "design": "unloaded"}
+
+    for bad in (lambda: registry.get("missing"), lambda: registry.configure("x", devise="cpu")):
+        try:
+            bad()
+            assert False, "invalid engine lookup was accepted"
+        except (KeyError, ValueError):
+            pass
+    logger.info("PASS: Engine registry test passed")
+
+    return True
+
+
+def test_front_ends_resolve_one_engine():
+    """Test the API and web UI routers resolve the same process-wide engine"""
+    logger.info("Testing front ends share the engine...")
+
+    from app import api_fastapi, webapp_fastapi
+
+    created = []
+    saved = engine_registry.registry
+    engine_registry.registry = EngineRegistry(factory=fake_factory(created))
+    engine_registry.registry.configure("default", device="cpu")
+    api_fastapi.tts_engine = webapp_fastapi.tts_engine = None
+    try:
+        api_fastapi.init_tts_engine()
+        webapp_fastapi.init_tts_engine()
+        assert api_fastapi.tts_engine is webapp_fastapi.tts_engine and len(created) == 1
+    finally:
+        engine_registry.registry = saved
+        api_fastapi.tts_engine = webapp_fastapi.tts_engine = None
+    logger.info("PASS: Front ends share the engine test passed")
+
+    return True
+
+
+def test_status_endpoints_see_shared_engine():
+    """Test the API status endpoints report the engine created by another front end"""
+    logger.info("Testing status endpoints see the shared engine...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app import api_fastapi, webapp_fastapi
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    saved = engine_registry.registry, api_fastapi.engine_registry
+    engine_registry.registry = api_fastapi.engine_registry = EngineRegistry(factory=fake_factory([]))
+    engine_registry.registry.configure("default", device="cpu")
+    api_fastapi.tts_engine = webapp_fastapi.tts_engine = None
+    try:
+        assert client.get("/api/models").json() == {"engine_loaded": False}
+        assert client.get("/api/priority").json() == {"enabled": False}
+        assert client.get("/api/scheduler").json() == {"enabled": False}
+        # Only the web UI has rendered, the API module never resolved the engine
+        engine = webapp_fastapi.init_tts_engine()
+        engine.priority = SimpleNamespace(stats=lambda: {"slots": 1})
+        engine.scheduler = SimpleNamespace(stats=lambda: {"batches": 3})
+        assert api_fastapi.tts_engine is None
+        body = client.get("/api/models").json()
+        assert body["engine_loaded"] and body["models"]["clone"]["state"] == "device"
+        body = client.get("/api/priority").json()
+        assert body["enabled"] and body["slots"] == 1 and "voice-clone" in body["endpoint_classes"]
+        assert client.get("/api/scheduler").json() == {"enabled": True, "batches": 3}
+    finally:
+        engine_registry.registry, api_fastapi.engine_registry = saved
+        api_fastapi.tts_engine = webapp_fastapi.tts_engine = None
+    logger.info("PASS: Status endpoints see the shared engine test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting engine registry tests...\n")
+
+    tests = [
+        test_engines_are_shared_by_configuration,
+        test_front_ends_resolve_one_engine,
+        test_status_endpoints_see_shared_engine,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
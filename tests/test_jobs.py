@@ -0,0 +1,300 @@
+import sys
+import os
+import json
+import time
+import tempfile
+import logging
+import threading
+import numpy as np
+import soundfile as sf
+from types import SimpleNamespace
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.jobs import DONE, FAILED, QUEUED, RUNNING, JobRunner, JobStore, job_status
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders one short tone per line, optionally blocking until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        self.release.wait(30)
+        return [np.full(2400, 0.1, dtype=np.float32) for _ in text], 24000
+
+
+class FakeTokenizer:
+    """One code per 1920 samples holding the frame mean, quantised to 1/1000"""
+
+    def encode(self, audio, sr=None):
+        frames = int(np.ceil(len(audio) / 1920))
+        padded = np.zeros(frames * 1920, dtype=np.float32)
+        padded[:len(audio)] = audio
+        means = np.round(padded.reshape(frames, 1920).mean(axis=1) * 1000).astype(np.int64)
+        return SimpleNamespace(audio_codes=[np.repeat(means[:, None], 16, axis=1)])
+
+    def decode(self, encoded):
+        return [np.repeat(encoded["audio_codes"][0][:, 0] / 1000.0, 1920).astype(np.float32)], 24000
+
+
+def _make_engine(tmp_dir):
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    speakers = []
+    for name in ("narrator", "guest"):
+        ref_path = os.path.join(tmp_dir, f"{name}.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        speakers.append({"ref_audio": ref_path, "ref_text": name})
+    return tts, speakers
+
+
+def _wait_for(store, job_id, states, timeout=30.0, planned=False):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["state"] in states and (not planned or job["chunks_total"] is not None):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not reach {states}")
+
+
+def test_job_store_lifecycle():
+    """Test jobs are claimed oldest first, requeued after a restart and deleted after their TTL"""
+    logger.info("Testing job store...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = JobStore(tmp_dir)
+        first = store.create("voice_clone", {"text": "a"})
+        second = store.create("voice_clone", {"text": "b"})
+        assert store.claim()["id"] == first
+
+        # A new store on the same directory sees the running job and queues it again
+        store = JobStore(tmp_dir)
+        assert store.requeue_running() == 1
+        job = store.claim()
+        assert job["id"] == first and job["attempts"] == 2 and job["params"] == {"text": "a"}
+
+        store.update_progress(first, 2, 4)
+        status = job_status(store.get(first), now=job["started_at"] + 10)
+        assert status["progress"] == {"chunks_done": 2, "chunks_total": 4, "fraction": 0.5} and status["eta_seconds"] == 10.0
+
+        result_path = store.result_path(first)
+        with open(result_path, "wb") as f:
+            f.write(b"RIFF")
+        store.finish(first, result_path, 4)
+        assert store.claim()["id"] == second and store.claim() is None
+        store.fail(second, "boom")
+        assert store.counts() == {DONE: 1, FAILED: 1}
+
+        assert store.cleanup(ttl=3600) == 0
+        assert store.cleanup(ttl=3600, now=time.time() + 7200) == 2
+        assert store.counts() == {} and not os.path.exists(result_path)
+
+        # A job interrupted on its last attempt fails instead of running again
+        third = store.create("voice_clone", {"text": "c"})
+        store.claim()
+        assert store.requeue_running(max_attempts=2) == 1 and store.claim()["attempts"] == 2
+        assert store.requeue_running(max_attempts=2) == 0
+        job = store.get(third)
+        assert job["state"] == FAILED and job["error"] == "Gave up after 2 interrupted attempts"
+    logger.info("PASS: Job store test passed")
+
+    return True
+
+
+def test_job_runner_renders_and_resumes():
+    """Test the runner records plan-based progress, writes the result and resumes interrupted jobs"""
+    logger.info("Testing job runner...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts, speakers = _make_engine(tmp_dir)
+        store = JobStore(os.path.join(tmp_dir, "jobs"))
+        text = "[SPEAKER0] First line.\n[SPEAKER1] Second line.\n[SPEAKER0] Third line.\n"
+
+        # A job left running by a previous process is rendered when the runner starts
+        interrupted = store.create("voice_clone", {"text": text, "speaker_configs": speakers})
+        store.claim()
+        runner = JobRunner(store, lambda: tts, workers=2, poll_interval=0.05, progress_interval=0.0).start()
+        try:
+            job = _wait_for(store, interrupted, (DONE, FAILED))
+            assert job["state"] == DONE and job["attempts"] == 2, job["error"]
+            status = job_status(job)
+            assert status["progress"]["chunks_total"] == 3 and status["progress"]["chunks_done"] == 3
+            audio, sr = sf.read(job["result_path"])
+            assert sr == 24000 and len(audio) >= 3 * 2400
+
+            # Progress is visible while a job renders
+            tts.voice_clone_model.release.clear()
+            running = runner.submit("voice_clone", {"text": text, "speaker_configs": speakers, "speed": 1.0})
+            job = _wait_for(store, running, (RUNNING,), planned=True)
+            assert job_status(job)["progress"]["chunks_total"] == 3
+            assert not os.path.exists(store.result_path(running))
+            tts.voice_clone_model.release.set()
+            assert _wait_for(store, running, (DONE, FAILED))["state"] == DONE
+
+            failed = runner.submit("voice_clone", {"text": text, "speaker_configs": []})
+            job = _wait_for(store, failed, (DONE, FAILED))
+            assert job["state"] == FAILED and job["error"]
+            assert not [name for name in os.listdir(store.results_dir) if "partial" in name]
+            assert runner.stats()["jobs"] == {DONE: 2, FAILED: 1}
+        finally:
+            tts.voice_clone_model.release.set()
+            runner.stop()
+    logger.info("PASS: Job runner test passed")
+
+    return True
+
+
+def test_job_endpoints():
+    """Test submitting a job returns an id at once, then status, progress and the result are served"""
+    logger.info("Testing job endpoints...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    saved_engine, saved_runner = api_fastapi.tts_engine, api_fastapi.job_runner
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts, speakers = _make_engine(tmp_dir)
+        api_fastapi.tts_engine = tts
+        try:
+            api_fastapi.job_runner = None
+            assert client.post("/api/jobs", data={"text": "x", "speaker_configs": "[]"}).status_code == 503
+            assert client.get("/api/jobs").json() == {"enabled": False}
+
+            store = JobStore(os.path.join(tmp_dir, "jobs"))
+            api_fastapi.job_runner = JobRunner(store, api_fastapi._renderer, poll_interval=0.05).start()
+            tts.voice_clone_model.release.clear()
+            response = client.post("/api/jobs", data={"text": "[SPEAKER0] Hello there.\n", "speaker_configs": json.dumps(speakers)})
+            assert response.status_code == 202 and response.json()["state"] == QUEUED
+            job_id = response.json()["job_id"]
+            _wait_for(store, job_id, (RUNNING,))
+            assert client.get(f"/api/jobs/{job_id}/result").status_code == 409
+            tts.voice_clone_model.release.set()
+            _wait_for(store, job_id, (DONE, FAILED))
+
+            body = client.get(f"/api/jobs/{job_id}").json()
+            assert body["state"] == DONE and body["progress"]["fraction"] == 1.0
+            response = client.get(f"/api/jobs/{job_id}/result")
+            assert response.status_code == 200 and response.headers["content-type"] == "audio/wav"
+            assert response.content[:4] == b"RIFF"
+
+            # Uploaded files work the same as form fields
+            response = client.post("/api/jobs", files={
+                "text_file": ("script.txt", b"[SPEAKER1] From a file.\n"),
+                "speakers_config": ("speakers.json", json.dumps(speakers).encode("utf-8")),
+            })
+            assert response.status_code == 202
+            assert _wait_for(store, response.json()["job_id"], (DONE, FAILED))["state"] == DONE
+
+            assert client.post("/api/jobs", data={"text": "x"}).status_code == 400
+            assert client.post("/api/jobs", data={"text": "x", "speaker_configs": "{"}).status_code == 400
+            assert client.get("/api/jobs/missing").status_code == 404
+            assert client.get("/api/jobs/missing/result").status_code == 404
+            assert client.get("/api/jobs").json()["jobs"] == {DONE: 2}
+        finally:
+            tts.voice_clone_model.release.set()
+            if api_fastapi.job_runner is not None:
+                api_fastapi.job_runner.stop()
+            api_fastapi.tts_engine, api_fastapi.job_runner = saved_engine, saved_runner
+    logger.info("PASS: Job endpoints test passed")
+
+    return True
+
+
+def test_token_results():
+    """Test jobs store token results that are decoded to WAV on download"""
+    logger.info("Testing token job results...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    saved_engine, saved_runner = api_fastapi.tts_engine, api_fastapi.job_runner
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts, speakers = _make_engine(tmp_dir)
+        tts.voice_clone_model.model = SimpleNamespace(speech_tokenizer=FakeTokenizer())
+        api_fastapi.tts_engine = tts
+        store = JobStore(os.path.join(tmp_dir, "jobs"))
+        try:
+            try:
+                JobRunner(store, api_fastapi._renderer, result_format="mp3")
+                assert False, "unknown result format was accepted"
+            except ValueError:
+                pass
+            api_fastapi.job_runner = JobRunner(store, api_fastapi._renderer, poll_interval=0.05, result_format="tokens").start()
+            response = client.post("/api/jobs", data={"text": "[SPEAKER0] Hello there.\n[SPEAKER1] Hi.\n", "speaker_configs": json.dumps(speakers)})
+            job = _wait_for(store, response.json()["job_id"], (DONE, FAILED))
+            assert job["state"] == DONE and job["result_path"].endswith(".qtc")
+            # Two 2400 sample chunks as 16-bit WAV would take 9.6 KB
+            assert os.path.getsize(job["result_path"]) < 1000
+
+            response = client.get(f"/api/jobs/{job['id']}/result")
+            assert response.status_code == 200 and response.headers["content-type"] == "audio/wav"
+            with tempfile.NamedTemporaryFile(suffix=".wav", dir=tmp_dir, delete=False) as f:
+                f.write(response.content)
+            audio, sr = sf.read(f.name)
+            # The last frame of each chunk is averaged with padding
+            assert sr == 24000 and len(audio) == 4800 and np.max(np.abs(audio[:1920] - 0.1)) < 1e-3
+            assert api_fastapi.job_runner.stats()["result_format"] == "tokens"
+        finally:
+            if api_fastapi.job_runner is not None:
+                api_fastapi.job_runner.stop()
+            api_fastapi.tts_engine, api_fastapi.job_runner = saved_engine, saved_runner
+    logger.info("PASS: Token job results test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting job tests...\n")
+
+    tests = [
+        test_job_store_lifecycle,
+        test_job_runner_renders_and_resumes,
+        test_job_endpoints,
+        test_token_results,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
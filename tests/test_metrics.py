@@ -0,0 +1,160 @@
+import sys
+import os
+import tempfile
+import logging
+import numpy as np
+import soundfile as sf
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.core import Qwen3TTSInnoFrance
+from app.metrics import metrics_response
+from app.sinks import ArraySink
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeModel:
+    """Renders one second of audio per text"""
+
+    def generate_voice_design(self, text, language=None, instruct=None):
+        return [np.zeros(24000, dtype=np.float32) for _ in text], 24000
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = [text] if isinstance(text, str) else text
+        return [np.zeros(24000, dtype=np.float32) for _ in texts], 24000
+
+
+def _value(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def _scrape():
+    content, content_type = metrics_response()
+    assert content_type.startswith("text/plain")
+    return {family.name: family for family in text_string_to_metric_families(content.decode("utf-8"))}
+
+
+def test_engine_metrics():
+    """Test generation, chunk, prompt creation and model load metrics, and the scraped service state"""
+    logger.info("Testing engine metrics...")
+
+    from app import engine_registry
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.models.register("design", FakeModel)
+    tts.models.register("clone", FakeModel)
+    before = {
+        "chunks": _value("tts_chunks_total", {"model": "clone"}),
+        "audio": _value("tts_generated_audio_seconds_total", {"model": "clone", "language": "English"}),
+        "rtf": _value("tts_realtime_factor_count", {"model": "clone", "language": "English"}),
+        "design": _value("tts_generation_seconds_count", {"model": "design"}),
+        "prompts": _value("tts_prompt_creation_seconds_count"),
+        "loads": _value("tts_model_load_seconds_count", {"model": "clone"}),
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ref_path = os.path.join(tmp_dir, "narrator.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        speakers = [{"ref_audio": ref_path, "ref_text": "narrator"}, {"ref_audio": ref_path, "ref_text": "guest"}]
+        tts.render_voice_clone("[SPEAKER0] One.\n[SPEAKER1] Two.\n[SPEAKER0] Three.\n", speakers, ArraySink())
+        tts.render_voice_design("Hi", "English", "calm", ArraySink())
+
+    assert _value("tts_chunks_total", {"model": "clone"}) - before["chunks"] == 3
+    assert abs(_value("tts_generated_audio_seconds_total", {"model": "clone", "language": "English"}) - before["audio"] - 3.0) < 1e-6
+    assert _value("tts_realtime_factor_count", {"model": "clone", "language": "English"}) - before["rtf"] == 3
+    assert _value("tts_generation_seconds_count", {"model": "design"}) - before["design"] == 1
+    assert _value("tts_prompt_creation_seconds_count") - before["prompts"] == 2
+    assert _value("tts_model_load_seconds_count", {"model": "clone"}) - before["loads"] == 1
+
+    saved = engine_registry.registry
+    engine_registry.registry = engine_registry.EngineRegistry(factory=lambda config: tts)
+    engine_registry.registry.configure("default", device="cpu")
+    try:
+        engine_registry.registry.get()
+        families = _scrape()
+    finally:
+        engine_registry.registry = saved
+    samples = {(s.name, tuple(sorted(s.labels.items()))): s.value for f in families.values() for s in f.samples}
+    assert samples[("tts_cache_misses_total", (("cache", "prompt_cache"),))] == 2
+    assert ("tts_cache_hit_ratio", (("cache", "design_cache"),)) in samples
+    assert samples[("tts_model_bytes", (("model", "clone"), ("state", "device")))] == 0
+    assert samples[("tts_model_loads_total", (("model", "design"),))] == 1
+    assert "process_resident_memory_bytes" in families or sys.platform != "linux"
+    logger.info("PASS: Engine metrics test passed")
+
+    return True
+
+
+def test_http_metrics():
+    """Test the FastAPI and Flask apps serve /metrics and count requests per route template"""
+    logger.info("Testing HTTP metrics...")
+
+    from fastapi.testclient import TestClient
+    from app.main import app as fastapi_app
+    from app.api import app as flask_app
+
+    client = TestClient(fastapi_app)
+    labels = {"endpoint": "/api/health", "method": "GET", "status": "200"}
+    before = _value("tts_http_requests_total", labels)
+    assert client.get("/api/health").status_code == 200
+    client.get("/api/jobs/0123abcd")
+    response = client.get("/metrics")
+    assert response.status_code == 200 and "tts_http_requests_total" in response.text
+    assert _value("tts_http_requests_total", labels) - before == 1
+    # Path parameters stay out of the labels
+    assert 'endpoint="/api/jobs/{job_id}"' in response.text and "0123abcd" not in response.text
+    assert _value("tts_http_request_duration_seconds_count", {"endpoint": "/api/health", "method": "GET"}) >= 1
+
+    flask_client = flask_app.test_client()
+    labels = {"endpoint": "/health", "method": "GET", "status": "200"}
+    before = _value("tts_http_requests_total", labels)
+    assert flask_client.get("/health").status_code == 200
+    response = flask_client.get("/metrics")
+    assert response.status_code == 200 and b"tts_http_request_duration_seconds" in response.data
+    assert _value("tts_http_requests_total", labels) - before == 1
+    logger.info("PASS: HTTP metrics test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting metrics tests...\n")
+
+    tests = [
+        test_engine_metrics,
+        test_http_metrics,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,129 @@
+import sys
+import os
+import logging
+import numpy as np
+import torch
+from types import SimpleNamespace
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.model_manager import CPU, DEVICE, UNLOADED, ModelManager
+from app.sinks import ArraySink
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Wraps a small torch module like Qwen3TTSModel and renders silence"""
+
+    def __init__(self):
+        self.model = torch.nn.Linear(64, 64)
+        self.device = torch.device("cpu")
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        return [np.zeros(100, dtype=np.float32) for _ in texts], 24000
+
+
+def counting_loader(loads, name):
+    def load():
+        loads.append(name)
+        return FakeCloneModel()
+    return load
+
+
+def test_models_load_on_first_use():
+    """Test each model is loaded independently, only when a request needs it"""
+    logger.info("Testing per-model lazy loading...")
+
+    loads = []
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.models.register("design", counting_loader(loads, "design"))
+    tts.models.register("clone", counting_loader(loads, "clone"))
+    speakers = [{"ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"}]
+
+    tts.render_voice_clone("[SPEAKER0]Hello.[SPEAKER0]Again.", speakers, ArraySink())
+    assert loads == ["clone"]
+    assert tts.models.is_resident("clone") and not tts.models.is_resident("design")
+
+    stats = tts.models.stats()["models"]
+    assert stats["clone"]["state"] == DEVICE and stats["clone"]["bytes"] == (64 * 64 + 64) * 4
+    assert stats["design"]["state"] == UNLOADED and stats["design"]["bytes"] == 0
+    logger.info("PASS: Per-model lazy loading test passed")
+
+    return True
+
+
+def test_idle_models_move_down_tiers():
+    """Test idle models move to CPU RAM, then out of memory, and come back on use"""
+    logger.info("Testing idle eviction tiers...")
+
+    loads = []
+    manager = ModelManager(device="cpu", device_ttl=10, cpu_ttl=50)
+    manager.register("clone", counting_loader(loads, "clone"))
+    model = manager.get("clone")
+    start = manager._slots["clone"].last_used
+
+    assert manager.evict_idle(now=start + 5) == []
+    assert manager.evict_idle(now=start + 10) == [("clone", CPU)]
+    assert manager.peek("clone") is model and manager.stats()["models"]["clone"]["offloads"] == 1
+
+    # Moving back from CPU RAM does not reload
+    assert manager.get("clone") is model and loads == ["clone"]
+    start = manager._slots["clone"].last_used
+
+    # Past both TTLs the model is unloaded in one step
+    assert manager.evict_idle(now=start + 60) == [("clone", UNLOADED)]
+    assert manager.peek("clone") is None and manager.stats()["models"]["clone"]["bytes"] == 0
+    assert manager.get("clone") is not model and loads == ["clone", "clone"]
+
+    # Models in use and injected models are never evicted
+    with manager.use("clone"):
+        assert manager.evict_idle(now=start + 1000) == []
+    manager.set("clone", SimpleNamespace())
+    assert manager.evict_idle(now=manager._slots["clone"].last_used + 1000) == []
+    assert manager.stats()["models"]["clone"]["pinned"]
+    logger.info("PASS: Idle eviction tiers test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting model manager tests...\n")
+
+    tests = [
+        test_models_load_on_first_use,
+        test_idle_models_move_down_tiers,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
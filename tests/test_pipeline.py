@@ -0,0 +1,160 @@
+import sys
+import os
+import time
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.pipeline import RenderPipeline
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a ramp whose length is proportional to the text length"""
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        return [np.linspace(-0.5, 0.5, 100 * len(t), dtype=np.float32) for t in texts], 24000
+
+
+SCRIPT = "[SPEAKER0]Hello there.[SPEAKER1]General Kenobi.[SPEAKER0]You are a bold one."
+SPEAKERS = [
+    {"speaker_tag": "[SPEAKER0]", "ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"},
+    {"speaker_tag": "[SPEAKER1]", "ref_audio": (np.zeros(2400, dtype=np.float32), 24000), "ref_text": "one"},
+]
+
+
+def test_pipeline_preserves_order_and_overlaps():
+    """Test results come back in order while generation and post-processing overlap"""
+    logger.info("Testing render pipeline ordering and overlap...")
+
+    def source():
+        for i in range(6):
+            time.sleep(0.02)
+            yield i
+
+    def postprocess(i):
+        # Later items finish first to exercise reordering
+        time.sleep(0.01 * (6 - i))
+        return i * 10
+
+    pipeline = RenderPipeline(postprocess, workers=3, max_pending=3)
+    started = time.perf_counter()
+    assert list(pipeline.run(source())) == [0, 10, 20, 30, 40, 50]
+    elapsed = time.perf_counter() - started
+
+    stats = pipeline.stats()
+    assert stats["items"] == 6
+    # Sequential would take 0.12 s generation + 0.21 s post-processing
+    assert elapsed < 0.30
+    assert stats["postprocess"]["busy_seconds"] > 0.2
+    assert 0 < stats["generate"]["utilisation"] <= 1.0
+    logger.info("PASS: Render pipeline ordering and overlap test passed")
+
+    return True
+
+
+def test_pipeline_close_and_errors():
+    """Test early close stops the producer and source errors reach the consumer"""
+    logger.info("Testing render pipeline early close and error propagation...")
+
+    generated = []
+
+    def endless():
+        i = 0
+        while True:
+            generated.append(i)
+            yield i
+            i += 1
+
+    pipeline = RenderPipeline(lambda i: i, workers=1, max_pending=2)
+    iterator = pipeline.run(endless())
+    assert next(iterator) == 0
+    iterator.close()
+    count = len(generated)
+    time.sleep(0.05)
+    # Bounded queue: the producer ran at most a few items ahead and has stopped
+    assert len(generated) == count and count <= 5
+
+    def failing():
+        yield 1
+        raise RuntimeError("model crashed")
+
+    try:
+        list(RenderPipeline(lambda i: i).run(failing()))
+        assert False, "error was not propagated"
+    except RuntimeError as e:
+        assert "model crashed" in str(e)
+    logger.info("PASS: Render pipeline early close and error propagation test passed")
+
+    return True
+
+
+def test_engine_pipelined_matches_sequential():
+    """Test pipelined rendering gives the same chunks and fills the report"""
+    logger.info("Testing pipelined voice clone...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+
+    sequential = list(tts.iter_voice_clone(SCRIPT, SPEAKERS, speed=1.5, pipelined=False, target_sample_rate=16000, normalize=True))
+    report = {}
+    pipelined = list(tts.iter_voice_clone(SCRIPT, SPEAKERS, speed=1.5, pipelined=True, target_sample_rate=16000, normalize=True, report=report))
+    assert len(sequential) == len(pipelined) == 3
+    for (a, sr_a, meta_a), (b, sr_b, meta_b) in zip(sequential, pipelined):
+        assert sr_a == sr_b == 16000
+        assert meta_a == meta_b
+        assert np.allclose(a, b)
+        assert np.isclose(np.max(np.abs(b)), 0.95)
+    assert report["pipeline"]["items"] == 3
+
+    pcm, sr, _ = next(tts.iter_voice_clone(SCRIPT, SPEAKERS, pipelined=True, encoding="pcm16"))
+    assert isinstance(pcm, bytes) and len(pcm) == 2 * 100 * len("Hello there.")
+    logger.info("PASS: Pipelined voice clone test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting pipeline tests...\n")
+
+    tests = [
+        test_pipeline_preserves_order_and_overlaps,
+        test_pipeline_close_and_errors,
+        test_engine_pipelined_matches_sequential,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
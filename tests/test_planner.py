@@ -0,0 +1,216 @@
+import sys
+import os
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.planner import find_duplicates, plan_voice_clone, utterance_key
+from app.sinks import ArraySink
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a constant whose value is the text length"""
+
+    def __init__(self):
+        self.generated = []
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        self.generated.extend(texts)
+        return [np.full(100, len(t), dtype=np.float32) for t in texts], 24000
+
+
+SPEAKERS = [
+    {"ref_audio": "voices/narrator.wav", "ref_text": "narrator"},
+    {"design_text": "Hello, I am the guest.", "design_instruct": "A calm voice", "language": "French"},
+]
+SCRIPT = (
+    "[SPEAKER0]Welcome back.[SPEAKER1]Thank you.[SPEAKER0]Welcome back.\n"
+    "[SPEAKER1]Welcome back.[SPEAKER0]Welcome   back."
+)
+
+
+def test_find_duplicates():
+    """Test repeated utterances map to their first occurrence within the window"""
+    logger.info("Testing duplicate detection...")
+
+    keys = [utterance_key("[SPEAKER0]", "English", text) for text in ("a", "b", "a", "a  ", "b")]
+    assert find_duplicates(keys) == [None, None, 0, 0, 1]
+    assert find_duplicates(keys, window=0) == [None] * 5
+    # A repeat outside the window is rendered again and opens a new window
+    assert find_duplicates(keys, window=2) == [None, None, None, 2, None]
+    logger.info("PASS: Duplicate detection test passed")
+
+    return True
+
+
+def test_plan_voice_clone():
+    """Test the plan lists speakers, chunks, duplicates and estimates without loading models"""
+    logger.info("Testing synthesis plan...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    plan = tts.plan_voice_clone(SCRIPT, SPEAKERS, speed=2.0)
+    assert not tts.models.is_resident("clone") and not tts.models.is_resident("design")
+
+    assert [(s.speaker_tag, s.prompt_source) for s in plan.speakers] == [("[SPEAKER0]", "ref_audio"), ("[SPEAKER1]", "voice_design")]
+    assert plan.speakers[0].ref_audio == "voices/narrator.wav" and plan.speakers[0].cached is None
+    assert plan.speakers[1].cached is False and plan.speakers[1].estimated_compute_seconds > 0
+
+    # The French repeat is a different utterance, whitespace does not matter
+    assert [c.duplicate_of for c in plan.chunks] == [None, None, 0, None, 0]
+    assert [c.language for c in plan.chunks] == ["English", "French", "English", "French", "English"]
+    assert plan.chunks[2].estimated_compute_seconds == 0.0
+    # Speed 2.0 plays 1.7x faster, see effective_speed
+    assert abs(plan.chunks[0].estimated_audio_seconds - len("Welcome back.") / 15.0 / 1.7) < 1e-3
+
+    summary = plan.to_dict()["summary"]
+    assert summary["chunk_count"] == 5 and summary["rendered_chunk_count"] == 3 and summary["duplicate_chunk_count"] == 2
+
+    # Without an engine the plan is the same, only the design cache state is unknown
+    standalone = plan_voice_clone(SCRIPT, SPEAKERS, speed=2.0)
+    assert standalone.to_dict()["chunks"] == plan.to_dict()["chunks"]
+    assert standalone.speakers[1].cached is None and standalone.to_dict()["summary"] == summary
+    try:
+        plan_voice_clone(SCRIPT, SPEAKERS, speed=10.0)
+        assert False, "unsupported speed was planned"
+    except ValueError:
+        pass
+    logger.info("PASS: Synthesis plan test passed")
+
+    return True
+
+
+def test_duplicates_are_rendered_once():
+    """Test the render path generates a repeated utterance once and reuses its audio"""
+    logger.info("Testing in-script deduplication...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+    speakers = [{"ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"}]
+    script = "[SPEAKER0]Yes.[SPEAKER0]No.[SPEAKER0]Yes.[SPEAKER0]Yes."
+
+    for batch_size in (1, 4):
+        tts.voice_clone_model.generated = []
+        audio, sr = tts.render_voice_clone(script, speakers, ArraySink(), batch_size=batch_size)
+        assert sorted(tts.voice_clone_model.generated) == ["No.", "Yes."]
+        assert list(audio[::100]) == [4.0, 3.0, 4.0, 4.0]
+
+    tts.voice_clone_model.generated = []
+    tts.dedup_window = 0
+    tts.render_voice_clone(script, speakers, ArraySink())
+    assert len(tts.voice_clone_model.generated) == 4
+    logger.info("PASS: In-script deduplication test passed")
+
+    return True
+
+
+def test_plan_endpoint_builds_no_engine():
+    """Test /api/voice-clone/plan answers without creating an engine in the web process"""
+    logger.info("Testing plan endpoint without an engine...")
+
+    import json
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+    from app import engine_registry
+    from app.engine_registry import EngineRegistry
+
+    created = []
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    saved = api_fastapi.tts_engine, api_fastapi.engine_registry, engine_registry.registry
+    api_fastapi.tts_engine = None
+    api_fastapi.engine_registry = engine_registry.registry = EngineRegistry(factory=lambda config: created.append(config))
+    engine_registry.registry.configure("default", device="cpu")
+    try:
+        response = client.post("/api/voice-clone/plan", data={"text": SCRIPT, "speaker_configs": json.dumps(SPEAKERS)})
+        assert response.status_code == 200
+        body = response.json()
+        assert body == plan_voice_clone(SCRIPT, SPEAKERS).to_dict()
+        assert not created and api_fastapi.tts_engine is None
+    finally:
+        api_fastapi.tts_engine, api_fastapi.engine_registry, engine_registry.registry = saved
+    logger.info("PASS: Plan endpoint without an engine test passed")
+
+    return True
+
+
+def test_cli_dry_run_builds_no_engine():
+    """Test voice-clone --dry-run prints the plan without building an engine"""
+    logger.info("Testing CLI dry run...")
+
+    import json
+    import tempfile
+    from click.testing import CliRunner
+    import app.cli as cli
+
+    def fail_build(device, lazy_load):
+        raise AssertionError("dry run built an engine")
+
+    saved = cli._build_tts
+    cli._build_tts = fail_build
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            text_path = os.path.join(tmp_dir, "script.txt")
+            speakers_path = os.path.join(tmp_dir, "speakers.json")
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(SCRIPT)
+            with open(speakers_path, "w", encoding="utf-8") as f:
+                json.dump(SPEAKERS, f)
+            result = CliRunner().invoke(cli.main, ["voice-clone", "--text-file", text_path, "--speakers-config", speakers_path, "--dry-run"])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output) == plan_voice_clone(SCRIPT, SPEAKERS).to_dict()
+    finally:
+        cli._build_tts = saved
+    logger.info("PASS: CLI dry run test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting planner tests...\n")
+
+    tests = [
+        test_find_duplicates,
+        test_plan_voice_clone,
+        test_duplicates_are_rendered_once,
+        test_plan_endpoint_builds_no_engine,
+        test_cli_dry_run_builds_no_engine,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
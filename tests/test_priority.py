@@ -0,0 +1,229 @@
+import sys
+import os
+import time
+import logging
+import threading
+import numpy as np
+import soundfile as sf
+import tempfile
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.engine_registry import EngineRegistry, attach_priority
+from app.priority import BATCH, INTERACTIVE, DeadlineExceededError, PriorityScheduler, request_priority
+from app.sinks import ArraySink
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeModel:
+    """Logs every generate call and renders a short tone"""
+
+    def __init__(self, log, delay=0.0):
+        self.log = log
+        self.delay = delay
+
+    def generate_voice_design(self, text, language=None, instruct=None):
+        self.log.append("design")
+        return [np.full(2400, 0.1, dtype=np.float32) for _ in text], 24000
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        self.log.append("clone")
+        time.sleep(self.delay)
+        texts = [text] if isinstance(text, str) else text
+        return [np.full(2400, 0.1, dtype=np.float32) for _ in texts], 24000
+
+
+def _wait_waiting(scheduler, counts, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        classes = scheduler.stats()["classes"]
+        if all(classes[name]["waiting"] == n for name, n in counts.items()):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"waiters did not reach {counts}")
+
+
+def test_turn_order():
+    """Test turns go to interactive requests first, then the client with the least engine time, and deadlines expire"""
+    logger.info("Testing priority scheduler turn order...")
+
+    scheduler = PriorityScheduler()
+    order = []
+
+    def take_turn(priority_class, client, name, hold=0.0):
+        with request_priority(priority_class, client=client):
+            with scheduler.turn():
+                order.append(name)
+                time.sleep(hold)
+
+    expired = []
+
+    def expire():
+        try:
+            with request_priority(INTERACTIVE, client="d", timeout=0.1):
+                with scheduler.turn():
+                    pass
+        except DeadlineExceededError as e:
+            expired.append(e)
+
+    with request_priority(BATCH, client="x"):
+        with scheduler.turn():
+            threads = []
+            # Client a queues two chunks before client b's one, then an interactive request arrives
+            for priority_class, client, name in ((BATCH, "a", "a1"), (BATCH, "a", "a2"), (BATCH, "b", "b1"), (INTERACTIVE, "c", "c1")):
+                thread = threading.Thread(target=take_turn, args=(priority_class, client, name, 0.01))
+                thread.start()
+                threads.append(thread)
+                _wait_waiting(scheduler, {priority_class: 1 if priority_class == INTERACTIVE else len(threads)})
+            # Nested model calls run in the turn already held
+            with scheduler.turn():
+                pass
+            thread = threading.Thread(target=expire)
+            thread.start()
+            thread.join(10)
+            assert len(expired) == 1
+    for thread in threads:
+        thread.join(10)
+
+    # b1 goes before a2 because client a already had a turn
+    assert order == ["c1", "a1", "b1", "a2"], order
+    stats = scheduler.stats()
+    interactive, batch = stats["classes"][INTERACTIVE], stats["classes"][BATCH]
+    assert interactive["turns"] == 1 and interactive["expired"] == 1
+    assert batch["turns"] == 4 and batch["preempted"] == 1
+    assert batch["queue_wait_ms"]["histogram"]["+Inf"] == 4 and stats["in_use"] == 0
+    logger.info("PASS: Priority scheduler turn order test passed")
+
+    return True
+
+
+def test_design_interleaves_with_long_clone():
+    """Test a voice design request runs between the chunks of a long voice clone instead of after it"""
+    logger.info("Testing chunk-boundary preemption...")
+
+    log = []
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeModel(log, delay=0.05)
+    tts.voice_design_model = FakeModel(log)
+    tts.priority = PriorityScheduler()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ref_path = os.path.join(tmp_dir, "narrator.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        speakers = [{"ref_audio": ref_path, "ref_text": "narrator"}, {"ref_audio": ref_path, "ref_text": "guest"}]
+        script = "".join(f"[SPEAKER{i % 2}] Line number {i}.\n" for i in range(10))
+
+        def clone():
+            with request_priority(BATCH, client="audiobook"):
+                tts.render_voice_clone(script, speakers, ArraySink())
+
+        thread = threading.Thread(target=clone)
+        thread.start()
+        while log.count("clone") < 2:
+            time.sleep(0.01)
+        with request_priority(INTERACTIVE, client="web"):
+            audio, sr = tts.render_voice_design("Hi", "English", "calm", ArraySink())
+        thread.join(30)
+
+    assert len(audio) == 2400
+    assert log.count("clone") == 10 and log.index("design") < len(log) - 3, log
+    assert tts.priority.stats()["classes"][INTERACTIVE]["turns"] == 1
+    logger.info("PASS: Chunk-boundary preemption test passed")
+
+    return True
+
+
+def test_priority_endpoint_and_deadline():
+    """Test the API reports per-class metrics and answers 504 when a request's deadline passes"""
+    logger.info("Testing priority endpoint...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+    from app import concurrency
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    log = []
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_design_model = FakeModel(log)
+    attach_priority(tts)
+    saved = api_fastapi.tts_engine, concurrency._limiter, api_fastapi.engine_registry
+    api_fastapi.tts_engine = tts
+    # /api/priority reports the process-wide engine
+    api_fastapi.engine_registry = EngineRegistry(factory=lambda config: tts)
+    api_fastapi.engine_registry.get()
+    concurrency._limiter = concurrency.InferenceLimiter(concurrency=2, max_queue=2)
+    form = {"text": "Hello", "language": "English", "instruct": "calm"}
+    try:
+        assert client.post("/api/voice-design", data=form).status_code == 200
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with tts.priority.turn():
+                held.set()
+                release.wait(10)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait(10)
+        response = client.post("/api/voice-design", data=form, headers={"X-Request-Timeout": "0.2"})
+        assert response.status_code == 504
+        assert client.post("/api/voice-design", data=form, headers={"X-Request-Timeout": "soon"}).status_code == 400
+        release.set()
+        holder.join(10)
+
+        body = client.get("/api/priority").json()
+        assert body["enabled"] and body["endpoint_classes"]["voice-clone"] == BATCH
+        interactive = body["classes"][INTERACTIVE]
+        assert interactive["turns"] == 2 and interactive["expired"] == 1
+        assert interactive["queue_wait_ms"]["histogram"]["+Inf"] == 2
+    finally:
+        concurrency._limiter.shutdown()
+        api_fastapi.tts_engine, concurrency._limiter, api_fastapi.engine_registry = saved
+    logger.info("PASS: Priority endpoint test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting priority scheduler tests...\n")
+
+    tests = [
+        test_turn_order,
+        test_design_interleaves_with_long_clone,
+        test_priority_endpoint_and_deadline,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,326 @@
+import sys
+import os
+import time
+import tempfile
+import logging
+import numpy as np
+import torch
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.prompt_cache import VoicePromptCache, hash_reference_audio, estimate_prompt_bytes
+from app.prompt_store import VoicePromptStore
+from qwen_tts import VoiceClonePromptItem
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakePromptItem:
+    def __init__(self, size=16):
+        self.ref_code = torch.zeros(size, dtype=torch.int64)
+        self.ref_spk_embedding = torch.zeros(4, dtype=torch.float32)
+        self.ref_text = "ref"
+
+
+class FakeDesignModel:
+    def __init__(self):
+        self.design_calls = 0
+
+    def generate_voice_design(self, text, language=None, instruct=None):
+        self.design_calls += 1
+        return [torch.rand(4800).numpy()], 24000
+
+
+class FakeCloneModel:
+    def __init__(self):
+        self.prompt_calls = 0
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        self.prompt_calls += 1
+        return _make_prompt()
+
+
+def test_hash_reference_audio():
+    """Test prompt keys depend on audio content, text, mode and model"""
+    logger.info("Testing reference audio hashing...")
+
+    audio = np.linspace(-1, 1, 1000).astype(np.float32)
+    key = hash_reference_audio(audio, 24000, "hello", False)
+
+    assert key == hash_reference_audio(audio.copy(), 24000, "hello", False)
+    assert key != hash_reference_audio(audio, 16000, "hello", False)
+    assert key != hash_reference_audio(audio, 24000, "other", False)
+    assert key != hash_reference_audio(audio, 24000, "hello", True)
+    assert key != hash_reference_audio(audio, 24000, "hello", False, model="Qwen/Qwen3-TTS-12Hz-0.6B-Base")
+    # ref_text is irrelevant in x-vector-only mode
+    assert hash_reference_audio(audio, 24000, "a", True) == hash_reference_audio(audio, 24000, "b", True)
+    logger.info("PASS: Reference audio hashing test passed")
+
+    return True
+
+
+def test_lru_eviction():
+    """Test LRU eviction by entry count and byte budget"""
+    logger.info("Testing prompt cache LRU eviction...")
+
+    cache = VoicePromptCache(max_entries=2, max_bytes=1000)
+    cache.put("a", "A", nbytes=100)
+    cache.put("b", "B", nbytes=100)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", nbytes=100)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+
+    cache.put("d", "D", nbytes=950)
+    assert len(cache) == 1
+    assert cache.get("d") == "D"
+    assert cache.get("b") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 3
+    assert stats["bytes"] == 950
+    logger.info("PASS: Prompt cache LRU eviction test passed")
+
+    return True
+
+
+def test_estimate_prompt_bytes():
+    """Test prompt size estimation from tensors"""
+    logger.info("Testing prompt size estimation...")
+
+    size = estimate_prompt_bytes([FakePromptItem(size=10)])
+    assert size == 10 * 8 + 4 * 4 + 3
+    logger.info("PASS: Prompt size estimation test passed")
+
+    return True
+
+
+def test_engine_reuses_prompt():
+    """Test the engine creates one prompt for repeated reference audio"""
+    logger.info("Testing engine prompt reuse...")
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+
+    audio = np.random.rand(2400).astype(np.float32)
+    config = {"ref_audio": (audio, 24000), "ref_text": "reference"}
+    first = tts._build_speaker_prompt(config)
+    second = tts._build_speaker_prompt({"ref_audio": (audio.copy(), 24000), "ref_text": "reference"})
+
+    assert first is second
+    assert tts.voice_clone_model.prompt_calls == 1
+    assert tts.prompt_cache.stats()["hits"] == 1
+    logger.info("PASS: Engine prompt reuse test passed")
+
+    return True
+
+
+def _make_prompt(code_len=32):
+    return [VoiceClonePromptItem(
+        ref_code=torch.arange(code_len * 16, dtype=torch.int64).reshape(code_len, 16),
+        ref_spk_embedding=torch.rand(8),
+        x_vector_only_mode=False,
+        icl_mode=True,
+        ref_text="reference",
+    )]
+
+
+def test_prompt_store_roundtrip():
+    """Test prompts survive a save/load cycle through the store"""
+    logger.info("Testing prompt store round trip...")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = VoicePromptStore(store_dir)
+        prompt = _make_prompt()
+        store.put("abc", prompt, metadata={"source": "voice.wav"})
+
+        # A fresh store instance sees the prompt, as after a restart
+        loaded = VoicePromptStore(store_dir).get("abc")
+        assert loaded is not None
+        assert torch.equal(loaded[0].ref_code, prompt[0].ref_code)
+        assert torch.equal(loaded[0].ref_spk_embedding, prompt[0].ref_spk_embedding)
+        assert loaded[0].icl_mode and loaded[0].ref_text == "reference"
+        assert store.get("missing") is None
+
+        entries = store.list_entries()
+        assert len(entries) == 1
+        assert entries[0]["source"] == "voice.wav"
+        assert not [name for name in os.listdir(store_dir) if name.endswith(".tmp")]
+    logger.info("PASS: Prompt store round trip test passed")
+
+    return True
+
+
+def test_prompt_store_eviction():
+    """Test the store evicts least recently used prompts over budget"""
+    logger.info("Testing prompt store eviction...")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = VoicePromptStore(store_dir)
+        store.put("old", _make_prompt())
+        store.put("new", _make_prompt())
+        past = time.time() - 100
+        os.utime(os.path.join(store_dir, "old.json"), (past, past))
+
+        evicted = store.evict(max_bytes=store.total_bytes() - 1)
+        assert evicted == ["old"]
+        assert "old" not in store and "new" in store
+    logger.info("PASS: Prompt store eviction test passed")
+
+    return True
+
+
+def test_engine_uses_prompt_store():
+    """Test a new engine loads prompts from the store instead of recreating them"""
+    logger.info("Testing engine prompt store lookup...")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        audio = np.random.rand(2400).astype(np.float32)
+        config = {"ref_audio": (audio, 24000), "ref_text": "reference"}
+
+        first = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        first.voice_clone_model = FakeCloneModel()
+        first.voice_design_model = object()
+        first._build_speaker_prompt(config)
+
+        second = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        second.voice_clone_model = FakeCloneModel()
+        second.voice_design_model = object()
+        prompt = second._build_speaker_prompt(config)
+
+        assert second.voice_clone_model.prompt_calls == 0
+        assert prompt[0].ref_text == "reference"
+
+        # A stored prompt is loaded without loading the clone model
+        third = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        prompt = third._get_voice_clone_prompt((audio, 24000), "reference")
+        assert prompt[0].ref_text == "reference" and not third.models.is_resident("clone")
+
+        # Prompts of another clone model are created again
+        other = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        other.voice_clone_model_path = "Qwen/Qwen3-TTS-12Hz-0.6B-Base"
+        other.voice_clone_model = FakeCloneModel()
+        other.voice_design_model = object()
+        other._build_speaker_prompt(config)
+        assert other.voice_clone_model.prompt_calls == 1
+    logger.info("PASS: Engine prompt store lookup test passed")
+
+    return True
+
+
+def test_engine_reuses_designed_voice():
+    """Test designed reference voices are generated once per design and seed"""
+    logger.info("Testing designed voice reuse...")
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        config = {"design_text": "Hello", "design_instruct": "Calm voice", "language": "English"}
+
+        tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        tts.voice_clone_model = FakeCloneModel()
+        tts.voice_design_model = FakeDesignModel()
+        tts._build_speaker_prompt(config)
+        tts._build_speaker_prompt(dict(config))
+        assert tts.voice_design_model.design_calls == 1
+        assert tts.voice_clone_model.prompt_calls == 1
+
+        # A different seed is a different voice
+        tts._build_speaker_prompt(dict(config, design_seed=7))
+        assert tts.voice_design_model.design_calls == 2
+
+        # A restarted engine reloads the designed audio bit-exactly and hits the prompt store
+        tts._build_speaker_prompt(dict(config, design_seed=11))
+        restarted = Qwen3TTSInnoFrance(device="cpu", lazy_load=True, prompt_store_dir=store_dir)
+        restarted.voice_clone_model = FakeCloneModel()
+        restarted.voice_design_model = FakeDesignModel()
+        restarted._build_speaker_prompt(dict(config, design_seed=11))
+        assert restarted.voice_design_model.design_calls == 0
+        assert restarted.voice_clone_model.prompt_calls == 0
+
+        # Another design model generates its own voice for the same design and seed
+        restarted.voice_design_model_path = "Qwen/Qwen3-TTS-12Hz-0.6B-VoiceDesign"
+        assert restarted._design_cached(dict(config, design_seed=11)) is False
+        restarted._build_speaker_prompt(dict(config, design_seed=11))
+        assert restarted.voice_design_model.design_calls == 1
+    logger.info("PASS: Designed voice reuse test passed")
+
+    return True
+
+
+def test_designed_voice_seed_is_isolated():
+    """Test the design seed is set inside the engine turn and leaves the global random state alone"""
+    logger.info("Testing designed voice seeding...")
+
+    from app.priority import PriorityScheduler
+
+    audio = []
+    for _ in range(2):
+        tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+        tts.priority = PriorityScheduler()
+        tts.voice_design_model = FakeDesignModel()
+        seen = []
+        generate = tts.voice_design_model.generate_voice_design
+
+        def generate_in_turn(*args, **kwargs):
+            seen.append((torch.initial_seed(), tts.priority.stats()["in_use"]))
+            wavs, sr = generate(*args, **kwargs)
+            audio.append(wavs[0])
+            return wavs, sr
+
+        tts.voice_design_model.generate_voice_design = generate_in_turn
+        torch.manual_seed(123)
+        state = torch.get_rng_state()
+        tts._design_reference_voice("Hello", "Calm voice", "English", seed=5)
+        assert seen == [(5, 1)] and torch.equal(torch.get_rng_state(), state)
+    # Same seed, same voice
+    assert len(audio) == 2 and np.array_equal(audio[0], audio[1])
+    logger.info("PASS: Designed voice seeding test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting prompt cache tests...\n")
+
+    tests = [
+        test_hash_reference_audio,
+        test_lru_eviction,
+        test_estimate_prompt_bytes,
+        test_engine_reuses_prompt,
+        test_prompt_store_roundtrip,
+        test_prompt_store_eviction,
+        test_engine_uses_prompt_store,
+        test_engine_reuses_designed_voice,
+        test_designed_voice_seed_is_isolated,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,141 @@
+import sys
+import os
+import logging
+import threading
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.scheduler import MicroBatchScheduler
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeEngine:
+    """Records the size of every batched call"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def generate_design_batch(self, texts, languages, instructs):
+        if self.fail:
+            raise RuntimeError("model failure")
+        self.batches.append(("design", len(texts)))
+        return [np.full(len(t), i, dtype=np.float32) for i, t in enumerate(texts)], 24000
+
+    def generate_clone_batch(self, texts, languages, prompts):
+        self.batches.append(("clone", len(texts)))
+        return [np.full(len(t), p, dtype=np.float32) for t, p in zip(texts, prompts)], 24000
+
+
+def test_concurrent_requests_are_merged():
+    """Test concurrent requests inside one window share a model call"""
+    logger.info("Testing micro-batch merging...")
+
+    engine = FakeEngine()
+    scheduler = MicroBatchScheduler(engine, profile="throughput", max_wait_ms=200)
+    scheduler.start()
+
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def request(i):
+        barrier.wait()
+        results[i] = scheduler.submit_design("x" * (10 + i), "English", "calm").result(timeout=5)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.stop()
+
+    assert engine.batches == [("design", 4)]
+    for i in range(4):
+        audio, sr = results[i]
+        assert len(audio) == 10 + i and sr == 24000
+
+    stats = scheduler.stats()
+    assert stats["batches"] == 1 and stats["items"] == 4
+    assert stats["batch_size_histogram"] == {4: 1}
+    logger.info(f"PASS: Micro-batch merging test passed, queue wait {stats['queue_wait_ms']}")
+
+    return True
+
+
+def test_incompatible_items_are_split():
+    """Test design/clone items and very different lengths go to separate calls"""
+    logger.info("Testing micro-batch compatibility grouping...")
+
+    engine = FakeEngine()
+    scheduler = MicroBatchScheduler(engine, profile="throughput", max_wait_ms=100)
+    futures = [
+        scheduler.submit_clone("a" * 10, "English", 1),
+        scheduler.submit_clone("b" * 200, "English", 2),
+        scheduler.submit_design("c" * 10, "English", "calm"),
+        scheduler.submit_clone("d" * 11, "English", 3),
+    ]
+    values = [future.result(timeout=5)[0] for future in futures]
+    scheduler.stop()
+
+    assert sorted(engine.batches) == [("clone", 1), ("clone", 2), ("design", 1)]
+    assert values[1][0] == 2 and values[3][0] == 3
+    logger.info("PASS: Micro-batch compatibility grouping test passed")
+
+    return True
+
+
+def test_errors_reach_every_caller():
+    """Test a failed batch fails all waiting requests"""
+    logger.info("Testing micro-batch error propagation...")
+
+    scheduler = MicroBatchScheduler(FakeEngine(fail=True), profile="latency")
+    future = scheduler.submit_design("hello", "English", "calm")
+    try:
+        future.result(timeout=5)
+        raise AssertionError("expected failure")
+    except RuntimeError as e:
+        assert "model failure" in str(e)
+    scheduler.stop()
+    logger.info("PASS: Micro-batch error propagation test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting scheduler tests...\n")
+
+    tests = [
+        test_concurrent_requests_are_merged,
+        test_incompatible_items_are_split,
+        test_errors_reach_every_caller,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,158 @@
+import sys
+import os
+import time
+import tracemalloc
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.script_parser import SpeakerIndex, iter_script_segments
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def test_segments_match_extract_speakers():
+    """Test the streaming parser yields the same segments as _extract_speakers"""
+    logger.info("Testing streaming script parser...")
+
+    text = "[SPEAKER0]First speaker content.[SPEAKER1]Second speaker\ncontent.\n[SPEAKER0]First speaker speaks again."
+    tts = Qwen3TTSInnoFrance.__new__(Qwen3TTSInnoFrance)
+    speakers, texts = tts._extract_speakers(text)
+    assert list(iter_script_segments(text)) == list(zip(speakers, texts))
+    # Line iterables give the same result as the whole string
+    assert list(iter_script_segments(text.splitlines(keepends=True))) == list(zip(speakers, texts))
+
+    assert list(iter_script_segments("No tags at all.")) == [("[SPEAKER0]", "No tags at all.")]
+    assert list(iter_script_segments("Intro.\n[SPEAKER2]Hi.[SPEAKER1][SPEAKER3] Bye.")) == [
+        ("[SPEAKER0]", "Intro."), ("[SPEAKER2]", "Hi."), ("[SPEAKER3]", "Bye."),
+    ]
+
+    long_passage = ["[SPEAKER1]"] + ["line of text\n"] * 1000
+    segments = list(iter_script_segments(long_passage, max_segment_chars=1300))
+    assert len(segments) == 10 and all(tag == "[SPEAKER1]" for tag, _ in segments)
+    logger.info("PASS: Streaming script parser test passed")
+
+    return True
+
+
+def test_speaker_index():
+    """Test explicit, numeric and first-appearance default mapping"""
+    logger.info("Testing speaker index...")
+
+    configs = [{"speaker_tag": "[SPEAKER5]"}, {}, {"speaker_tag": "[SPEAKER1]"}]
+    index = SpeakerIndex(configs)
+    assert index.resolve("[SPEAKER5]") == 0
+    assert index.resolve("[SPEAKER1]") == 2
+    # Numeric fallback only for configs without an explicit tag
+    assert index.resolve("[SPEAKER1]") == 2
+    index = SpeakerIndex([{}, {}])
+    assert index.resolve("[SPEAKER1]") == 1
+    # Unknown tags map by order of first appearance, clamped to the last config
+    assert index.resolve("[SPEAKER7]") == 1
+    index = SpeakerIndex([{"speaker_tag": "[A]"}, {"speaker_tag": "[B]"}, {"speaker_tag": "[C]"}])
+    assert [index.resolve(tag) for tag in ("[SPEAKER9]", "[SPEAKER8]", "[SPEAKER9]")] == [0, 1, 0]
+    try:
+        SpeakerIndex([])
+        assert False, "empty configs were accepted"
+    except ValueError:
+        pass
+    logger.info("PASS: Speaker index test passed")
+
+    return True
+
+
+def test_large_script_is_flat():
+    """Test parse memory stays flat as the script grows"""
+    logger.info("Testing large script parsing...")
+
+    def script(turns):
+        for i in range(turns):
+            yield f"[SPEAKER{i % 3}]This is turn number {i} of a very long book-length script.\n"
+
+    peaks = []
+    for turns in (10000, 100000):
+        tracemalloc.start()
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_script_segments(script(turns)))
+        elapsed = time.perf_counter() - started
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert count == turns
+    assert peaks[1] < 2 * peaks[0] + 64 * 1024
+    assert elapsed < 10.0
+    logger.info("PASS: Large script parsing test passed")
+
+    return True
+
+
+def test_engine_builds_prompts_on_first_appearance():
+    """Test the engine builds a prompt only for speakers that appear, in script order"""
+    logger.info("Testing lazy speaker prompt building...")
+
+    class FakeCloneModel:
+        def __init__(self):
+            self.prompt_texts = []
+
+        def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+            self.prompt_texts.append(ref_text)
+            return [ref_text]
+
+        def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+            texts = text if isinstance(text, list) else [text]
+            return [np.zeros(10, dtype=np.float32) for _ in texts], 24000
+
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+    speakers = [
+        {"ref_audio": (np.full(2400, i, dtype=np.float32), 24000), "ref_text": f"voice {i}"}
+        for i in range(3)
+    ]
+    lines = ["[SPEAKER2]Hello.\n", "[SPEAKER0]Hi.\n", "[SPEAKER2]Bye.\n"]
+    chunks, prompts, _ = tts._prepare_clone_chunks(iter(lines), speakers)
+    assert tts.voice_clone_model.prompt_texts == ["voice 2", "voice 0"]
+    assert [tag for tag, _ in chunks] == ["[SPEAKER2]", "[SPEAKER0]", "[SPEAKER2]"]
+    logger.info("PASS: Lazy speaker prompt building test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting script parser tests...\n")
+
+    tests = [
+        test_segments_match_extract_speakers,
+        test_speaker_index,
+        test_large_script_is_flat,
+        test_engine_builds_prompts_on_first_appearance,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
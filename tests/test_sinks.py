@@ -0,0 +1,175 @@
+import sys
+import os
+import io
+import tempfile
+import logging
+import numpy as np
+import soundfile as sf
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.sinks import ArraySink, FileSink, SharedMemorySink, WavStreamSink, read_shared_audio, write_shared_audio
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeDesignModel:
+    def generate_voice_design(self, text, language=None, instruct=None):
+        texts = text if isinstance(text, list) else [text]
+        return [np.full(100 * len(t), 0.25, dtype=np.float32) for t in texts], 24000
+
+
+class FakeCloneModel:
+    """Renders each text as a ramp whose length is proportional to the text length"""
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        if any("fail" in t for t in texts):
+            raise RuntimeError("generation failed")
+        return [np.linspace(0, 0.5, 100 * len(t), dtype=np.float32) for t in texts], 24000
+
+
+SCRIPT = "[SPEAKER0]Hello there.[SPEAKER1]General Kenobi."
+SPEAKERS = [
+    {"speaker_tag": "[SPEAKER0]", "ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"},
+    {"speaker_tag": "[SPEAKER1]", "ref_audio": (np.zeros(2400, dtype=np.float32), 24000), "ref_text": "one"},
+]
+
+
+def _make_engine():
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = FakeDesignModel()
+    return tts
+
+
+def test_every_sink_receives_the_same_audio():
+    """Test one render path produces identical audio in every sink"""
+    logger.info("Testing render sinks...")
+
+    tts = _make_engine()
+    expected, sr = tts.render_voice_clone(SCRIPT, SPEAKERS, ArraySink())
+    assert sr == 24000 and len(expected) == 100 * len("Hello there.General Kenobi.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = tts.render_voice_clone(SCRIPT, SPEAKERS, FileSink(os.path.join(tmp_dir, "out.wav"), subtype="FLOAT"))
+        audio, _ = sf.read(path, dtype="float32")
+        assert np.allclose(audio, expected)
+
+    stream = tts.render_voice_clone(SCRIPT, SPEAKERS, WavStreamSink(io.BytesIO(), subtype="FLOAT"))
+    audio, _ = sf.read(stream, dtype="float32")
+    assert np.allclose(audio, expected)
+
+    handle = tts.render_voice_clone(SCRIPT, SPEAKERS, SharedMemorySink(initial_samples=10))
+    audio, shared_sr = read_shared_audio(handle)
+    assert shared_sr == 24000 and np.allclose(audio, expected)
+
+    # Shared audio is written into another sink in place, and the segment is freed
+    handle = tts.render_voice_clone(SCRIPT, SPEAKERS, SharedMemorySink(initial_samples=10))
+    sink = ArraySink()
+    write_shared_audio(handle, sink)
+    assert np.allclose(sink.close()[0], expected)
+    try:
+        read_shared_audio(handle)
+        assert False, "shared memory segment was not freed"
+    except FileNotFoundError:
+        pass
+
+    wav_stream = tts.render_voice_design("Bonjour", "French", "calm", WavStreamSink())
+    audio, _ = sf.read(wav_stream, dtype="float32")
+    assert len(audio) == 700
+    logger.info("PASS: Render sinks test passed")
+
+    return True
+
+
+def test_failed_render_leaves_no_partial_file():
+    """Test a failed render removes the partially written file"""
+    logger.info("Testing failed render cleanup...")
+
+    tts = _make_engine()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "out.wav")
+        try:
+            tts.render_voice_clone("[SPEAKER0]Hello.[SPEAKER1]This will fail.", SPEAKERS, FileSink(path))
+            assert False, "error was not propagated"
+        except RuntimeError:
+            pass
+        assert not os.path.exists(path)
+    logger.info("PASS: Failed render cleanup test passed")
+
+    return True
+
+
+def test_api_renders_into_response_body():
+    """Test the API endpoints render WAV bytes without temporary files"""
+    logger.info("Testing API render path...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+
+    api_fastapi.tts_engine = _make_engine()
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+
+    response = client.post("/api/voice-design", data={"text": "Bonjour", "language": "French", "instruct": "calm"})
+    assert response.status_code == 200 and response.headers["content-type"] == "audio/wav"
+    audio, sr = sf.read(io.BytesIO(response.content))
+    assert sr == 24000 and len(audio) == 700
+
+    response = client.post(
+        "/api/voice-clone-files",
+        files={
+            "text_file": ("script.txt", SCRIPT.encode("utf-8")),
+            "speakers_config": ("speakers.json", b'[{"speaker_tag": "[SPEAKER0]", "design_text": "a", "design_instruct": "b"}]'),
+        },
+    )
+    assert response.status_code == 200
+    api_fastapi.tts_engine = None
+    logger.info("PASS: API render path test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting sink tests...\n")
+
+    tests = [
+        test_every_sink_receives_the_same_audio,
+        test_failed_render_leaves_no_partial_file,
+        test_api_renders_into_response_body,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
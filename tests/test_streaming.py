@@ -0,0 +1,181 @@
+import sys
+import os
+import asyncio
+import logging
+import threading
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a ramp whose length is proportional to the text length"""
+
+    def __init__(self):
+        self.generate_calls = 0
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        self.generate_calls += 1
+        return [np.linspace(0, 1, 100 * len(t), dtype=np.float32) for t in texts], 24000
+
+
+def _make_engine():
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    tts.voice_design_model = object()
+    return tts
+
+
+SCRIPT = "[SPEAKER0]Hello there.[SPEAKER1]General Kenobi.[SPEAKER0]You are a bold one."
+SPEAKERS = [
+    {"speaker_tag": "[SPEAKER0]", "ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"},
+    {"speaker_tag": "[SPEAKER1]", "ref_audio": (np.zeros(2400, dtype=np.float32), 24000), "ref_text": "one", "language": "Chinese"},
+]
+
+
+def test_iter_voice_clone_is_incremental():
+    """Test chunks are generated only when the consumer asks for them"""
+    logger.info("Testing incremental voice clone iterator...")
+
+    tts = _make_engine()
+    iterator = tts.iter_voice_clone(SCRIPT, SPEAKERS)
+    assert tts.voice_clone_model.generate_calls == 0
+
+    audio, sr, meta = next(iterator)
+    assert tts.voice_clone_model.generate_calls == 1
+    assert sr == 24000 and len(audio) == 100 * len("Hello there.")
+    assert meta["speaker_tag"] == "[SPEAKER0]"
+    assert meta["chunk_index"] == 0 and meta["chunk_count"] == 3
+    assert meta["text"] == "Hello there."
+
+    rest = list(iterator)
+    assert [m["speaker_tag"] for _, _, m in rest] == ["[SPEAKER1]", "[SPEAKER0]"]
+    assert rest[0][2]["language"] == "Chinese"
+    logger.info("PASS: Incremental voice clone iterator test passed")
+
+    return True
+
+
+def test_whole_file_matches_stream():
+    """Test the in-memory method returns the concatenated stream"""
+    logger.info("Testing in-memory method consumes the stream...")
+
+    tts = _make_engine()
+    streamed = np.concatenate([audio for audio, _, _ in tts.iter_voice_clone(SCRIPT, SPEAKERS, speed=1.5)])
+    audio, sr = tts.voice_clone_with_speakers_in_memory(SCRIPT, SPEAKERS, speed=1.5)
+    assert np.allclose(streamed, audio)
+    logger.info("PASS: In-memory method consumes the stream test passed")
+
+    return True
+
+
+def test_aiter_voice_clone():
+    """Test the async iterator yields the same chunks"""
+    logger.info("Testing async voice clone iterator...")
+
+    tts = _make_engine()
+
+    async def collect():
+        return [meta["chunk_index"] async for _, _, meta in tts.aiter_voice_clone(SCRIPT, SPEAKERS, batch_size=4)]
+
+    assert asyncio.run(collect()) == [0, 1, 2]
+    logger.info("PASS: Async voice clone iterator test passed")
+
+    return True
+
+
+def test_aiter_voice_clone_cancelled_mid_chunk():
+    """Test cancelling the async iterator while a chunk generates closes the iterator once the chunk is done"""
+    logger.info("Testing async voice clone iterator cancellation...")
+
+    tts = _make_engine()
+    started, release, closed = threading.Event(), threading.Event(), threading.Event()
+    generate = tts.voice_clone_model.generate_voice_clone
+
+    def blocking_generate(*args, **kwargs):
+        if tts.voice_clone_model.generate_calls == 1:
+            started.set()
+            release.wait(10)
+        return generate(*args, **kwargs)
+
+    tts.voice_clone_model.generate_voice_clone = blocking_generate
+    iter_voice_clone = tts.iter_voice_clone
+
+    def tracked_iter_voice_clone(*args, **kwargs):
+        try:
+            yield from iter_voice_clone(*args, **kwargs)
+        finally:
+            closed.set()
+
+    tts.iter_voice_clone = tracked_iter_voice_clone
+
+    async def cancel_second_chunk():
+        chunks = tts.aiter_voice_clone(SCRIPT, SPEAKERS)
+        await chunks.__anext__()
+        second = asyncio.ensure_future(chunks.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+        second.cancel()
+        try:
+            await second
+            assert False, "cancelled chunk was returned"
+        except asyncio.CancelledError:
+            pass
+        assert not closed.is_set()
+        release.set()
+        assert await asyncio.get_running_loop().run_in_executor(None, closed.wait, 10)
+
+    try:
+        asyncio.run(cancel_second_chunk())
+    finally:
+        release.set()
+    assert tts.voice_clone_model.generate_calls == 2
+    logger.info("PASS: Async voice clone iterator cancellation test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting streaming tests...\n")
+
+    tests = [
+        test_iter_voice_clone_is_incremental,
+        test_whole_file_matches_stream,
+        test_aiter_voice_clone,
+        test_aiter_voice_clone_cancelled_mid_chunk,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,127 @@
+import sys
+import os
+import time
+import logging
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.text_splitter import split_text, text_weight
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalise(text):
+    return "".join(text.split())
+
+
+def test_sentences_keep_punctuation():
+    """Test sentence splitting keeps the original punctuation and text"""
+    logger.info("Testing sentence splitting...")
+
+    text = "Is it working? Yes! It works. \"Really.\" Sure..."
+    chunks = split_text(text, max_length=20)
+    assert all(text_weight(chunk) <= 20 for chunk in chunks)
+    assert _normalise("".join(chunks)) == _normalise(text)
+    assert chunks[0] == "Is it working?"
+    assert chunks[-1].endswith("Sure...")
+
+    assert split_text("Short text.", max_length=100) == ["Short text."]
+    # Decimal points and abbreviations without a following space are not sentence ends
+    assert split_text("Pi is 3.14159 and e is 2.71828, roughly.", max_length=30)[0].startswith("Pi is 3.14159")
+    logger.info("PASS: Sentence splitting test passed")
+
+    return True
+
+
+def test_long_sentences_fall_back():
+    """Test run-on sentences fall back to clauses, then whitespace, then characters"""
+    logger.info("Testing clause and whitespace fallback...")
+
+    run_on = "first clause, second clause; third clause: " * 40
+    chunks = split_text(run_on, max_length=50)
+    assert all(text_weight(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.endswith((",", ";", ":")) for chunk in chunks)
+
+    words = " ".join(["word"] * 500)
+    chunks = split_text(words, max_length=42)
+    assert all(text_weight(chunk) <= 42 for chunk in chunks)
+    assert all(chunk.split() == ["word"] * len(chunk.split()) for chunk in chunks)
+
+    unbroken = "x" * 1000
+    chunks = split_text(unbroken, max_length=300)
+    assert "".join(chunks) == unbroken and max(len(chunk) for chunk in chunks) <= 300
+    # Balanced sizes: no tiny trailing chunk
+    assert min(len(chunk) for chunk in chunks) >= 200
+    logger.info("PASS: Clause and whitespace fallback test passed")
+
+    return True
+
+
+def test_cjk_weighting():
+    """Test CJK characters count as longer than Latin characters"""
+    logger.info("Testing CJK weighting...")
+
+    assert text_weight("abc") == 3
+    assert text_weight("你好") == 6
+    text = "今天天气很好，我们去公园散步吧。你觉得怎么样？" * 20
+    chunks = split_text(text, max_length=90)
+    assert all(text_weight(chunk) <= 90 for chunk in chunks)
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    assert "".join(chunks) == text
+    logger.info("PASS: CJK weighting test passed")
+
+    return True
+
+
+def test_split_throughput():
+    """Test large inputs split in roughly linear time"""
+    logger.info("Testing split throughput...")
+
+    text = "The quick brown fox jumps over the lazy dog, again and again; it never stops. " * 20000
+    started = time.perf_counter()
+    chunks = split_text(text, max_length=300)
+    elapsed = time.perf_counter() - started
+    assert all(text_weight(chunk) <= 300 for chunk in chunks)
+    assert elapsed < 5.0
+    logger.info(f"PASS: Split throughput test passed, {len(text) / elapsed / 1e6:.1f}M chars/s")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting text splitter tests...\n")
+
+    tests = [
+        test_sentences_keep_punctuation,
+        test_long_sentences_fall_back,
+        test_cjk_weighting,
+        test_split_throughput,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,120 @@
+import sys
+import os
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.timestretch import TimeStretcher, effective_speed, time_stretch
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 24000
+
+
+def _tone(seconds=2.0, frequency=220.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def _dominant_frequency(audio):
+    spectrum = np.abs(np.fft.rfft(audio))
+    return np.fft.rfftfreq(len(audio), 1.0 / SAMPLE_RATE)[np.argmax(spectrum)]
+
+
+def test_time_stretch_preserves_pitch():
+    """Test duration follows the speed while the pitch stays the same"""
+    logger.info("Testing pitch-preserving time stretch...")
+
+    audio = _tone()
+    for speed in (0.5, 0.8, 1.5, 2.0, 3.0):
+        stretched = time_stretch(audio, speed, SAMPLE_RATE)
+        assert len(stretched) == round(len(audio) / speed)
+        assert abs(_dominant_frequency(stretched) - 220.0) < 2.0
+        # No gain change or clicks in the steady part
+        assert np.max(np.abs(stretched[1000:-1000])) < 0.51
+    assert time_stretch(audio, 1.0, SAMPLE_RATE) is audio
+    logger.info("PASS: Pitch-preserving time stretch test passed")
+
+    return True
+
+
+def test_streaming_matches_whole_signal():
+    """Test block-wise processing gives the same output for any block size"""
+    logger.info("Testing streaming time stretch...")
+
+    audio = np.random.default_rng(0).standard_normal(SAMPLE_RATE).astype(np.float32)
+    whole = time_stretch(audio, 1.7, SAMPLE_RATE, block_size=len(audio))
+    small = time_stretch(audio, 1.7, SAMPLE_RATE, block_size=777)
+    assert np.allclose(whole, small)
+
+    # Internal buffers stay bounded while streaming
+    stretcher = TimeStretcher(1.3, SAMPLE_RATE)
+    for _ in range(50):
+        stretcher.process(audio[:4800])
+        assert len(stretcher._input) < 4800 + 4 * stretcher.frame_length
+    stretcher.flush()
+
+    assert len(time_stretch(np.zeros(0, dtype=np.float32), 1.5, SAMPLE_RATE)) == 0
+    for speed in (0.4, 3.5):
+        try:
+            TimeStretcher(speed, SAMPLE_RATE)
+            assert False, "speed out of range was accepted"
+        except ValueError:
+            pass
+    logger.info("PASS: Streaming time stretch test passed")
+
+    return True
+
+
+def test_engine_keeps_speed_mapping():
+    """Test the engine softens speed-ups like the resampling implementation did, and slow-downs are exact"""
+    logger.info("Testing engine playback speed mapping...")
+
+    assert effective_speed(2.0) == 1.7 and effective_speed(1.0) == 1.0 and effective_speed(0.5) == 0.5
+    tts = Qwen3TTSInnoFrance.__new__(Qwen3TTSInnoFrance)
+    audio = _tone()
+    assert len(tts._adjust_audio_speed(audio, 2.0, SAMPLE_RATE)) == round(len(audio) / 1.7)
+    assert len(tts._adjust_audio_speed(audio, 0.8, SAMPLE_RATE)) == round(len(audio) / 0.8)
+    logger.info("PASS: Engine playback speed mapping test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting time stretch tests...\n")
+
+    tests = [
+        test_time_stretch_preserves_pitch,
+        test_streaming_matches_whole_signal,
+        test_engine_keeps_speed_mapping,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
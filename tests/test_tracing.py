@@ -0,0 +1,176 @@
+import sys
+import os
+import json
+import pstats
+import tempfile
+import logging
+import threading
+import numpy as np
+import soundfile as sf
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.concurrency import InferenceLimiter
+from app.core import Qwen3TTSInnoFrance
+from app.sinks import ArraySink
+from app.tracing import current_trace, span, start_trace
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders one second of audio per text"""
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = [text] if isinstance(text, str) else text
+        return [np.full(24000, 0.1, dtype=np.float32) for _ in texts], 24000
+
+
+def test_spans_nest_across_threads():
+    """Test spans nest, are no-ops outside a trace and follow renders onto executor and pipeline threads"""
+    logger.info("Testing trace spans...")
+
+    with span("ignored"):
+        assert current_trace() is None
+
+    def work(name):
+        with span(name):
+            pass
+
+    limiter = InferenceLimiter(concurrency=1, max_queue=0)
+    try:
+        with start_trace("test") as trace:
+            with span("outer"):
+                with span("inner"):
+                    pass
+            limiter.submit(work, "executor").result(5)
+            thread = threading.Thread(target=work, args=("worker",))
+            thread.start()
+            thread.join()
+    finally:
+        limiter.shutdown()
+    spans = {s["name"]: s for s in trace.spans}
+    assert spans["inner"]["parent"] == trace.spans.index(spans["outer"])
+    assert spans["outer"]["parent"] is None
+    # The limiter copies the caller's context, a plain thread does not
+    assert "executor" in spans and "worker" not in spans
+    header = trace.server_timing()
+    assert header.startswith(("outer;dur=", "inner;dur=")) and 'desc="1x"' in header and "total;dur=" in header
+
+    # Pipelined renders record post-processing stages from the worker threads
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ref_path = os.path.join(tmp_dir, "narrator.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        ref_text_path = os.path.join(tmp_dir, "narrator.txt")
+        with open(ref_text_path, "w", encoding="utf-8") as f:
+            f.write("narrator")
+        speakers = [{"ref_audio": ref_path, "ref_text_file": ref_text_path}, {"ref_audio": ref_path, "ref_text": "guest"}]
+        with start_trace("render") as trace:
+            tts.render_voice_clone("[SPEAKER0] One.\n[SPEAKER1] Two.\n[SPEAKER0] Three.\n", speakers, ArraySink(), speed=1.5, pipelined=True)
+    stages = {name: count for name, (_, count) in trace.totals.items()}
+    assert stages["generate"] == 3 and stages["speed"] == 3 and stages["write"] == 3
+    assert stages["prompt"] == 2 and stages["ref_audio"] == 2 and stages["ref_text"] == 1 and stages["encode"] == 1
+    threads = {s["thread"] for s in trace.spans if s["name"] == "speed"}
+    assert all(name.startswith("render-postprocess") for name in threads)
+    logger.info("PASS: Trace spans test passed")
+
+    return True
+
+
+def test_server_timing_and_profiles():
+    """Test responses carry Server-Timing, traces reach TRACE_LOG and X-Profile saves a cProfile dump"""
+    logger.info("Testing Server-Timing headers...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+    from app import concurrency
+    from app.tracing import TracingMiddleware
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    app.add_middleware(TracingMiddleware)
+    client = TestClient(app)
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.voice_clone_model = FakeCloneModel()
+    saved = api_fastapi.tts_engine, concurrency._limiter, os.environ.get("TRACE_LOG"), os.environ.get("PROFILE_DIR")
+    api_fastapi.tts_engine = tts
+    concurrency._limiter = InferenceLimiter(concurrency=1, max_queue=4)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ref_path = os.path.join(tmp_dir, "narrator.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        form = {"text": "[SPEAKER0] One.\n[SPEAKER1] Two.\n", "speaker_configs": json.dumps([{"ref_audio": ref_path, "ref_text": "a"}, {"ref_audio": ref_path, "ref_text": "b"}])}
+        os.environ["TRACE_LOG"] = os.path.join(tmp_dir, "traces.jsonl")
+        os.environ.pop("PROFILE_DIR", None)
+        try:
+            response = client.post("/api/voice-clone", data=form, headers={"X-Profile": "cprofile"})
+            assert response.status_code == 200 and response.content[:4] == b"RIFF"
+            timing = response.headers["Server-Timing"]
+            assert 'generate;dur=' in timing and 'desc="2x"' in timing and "prompt;dur=" in timing and "encode;dur=" in timing
+            trace_id = response.headers["X-Trace-Id"]
+            with open(os.environ["TRACE_LOG"], encoding="utf-8") as f:
+                record = json.loads(f.read().splitlines()[-1])
+            assert record["trace_id"] == trace_id and record["status"] == 200 and record["name"] == "POST /api/voice-clone"
+            assert record["stages"]["generate"]["count"] == 2 and record["profile"] is None
+
+            # Profiling is only honoured once PROFILE_DIR is set
+            os.environ["PROFILE_DIR"] = os.path.join(tmp_dir, "profiles")
+            response = client.post("/api/voice-clone", data=form, headers={"X-Profile": "cprofile"})
+            assert response.status_code == 200
+            path = os.path.join(os.environ["PROFILE_DIR"], f"{response.headers['X-Trace-Id']}.prof")
+            stats = pstats.Stats(path)
+            assert any(name == "render_voice_clone" for _, _, name in stats.stats)
+            assert client.get("/api/health", headers={"X-Profile": "bogus"}).headers["Server-Timing"].startswith("total;dur=")
+        finally:
+            concurrency._limiter.shutdown()
+            api_fastapi.tts_engine, concurrency._limiter = saved[0], saved[1]
+            for name, value in (("TRACE_LOG", saved[2]), ("PROFILE_DIR", saved[3])):
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    logger.info("PASS: Server-Timing headers test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting tracing tests...\n")
+
+    tests = [
+        test_spans_nest_across_threads,
+        test_server_timing_and_profiles,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,169 @@
+import sys
+import os
+import time
+import tempfile
+import logging
+import numpy as np
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.sinks import ArraySink
+from app.utterance_cache import UtteranceCache, hash_utterance, response_headers
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeCloneModel:
+    """Renders each text as a ramp whose length is proportional to the text length"""
+
+    def __init__(self):
+        self.generated = []
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        texts = text if isinstance(text, list) else [text]
+        self.generated.extend(texts)
+        return [np.linspace(-0.5, 0.5, 100 * len(t), dtype=np.float32) for t in texts], 24000
+
+
+SPEAKERS = [
+    {"ref_audio": (np.ones(2400, dtype=np.float32), 24000), "ref_text": "zero"},
+    {"ref_audio": (np.zeros(2400, dtype=np.float32), 24000), "ref_text": "one"},
+]
+
+
+def test_cache_store_and_evict():
+    """Test keys, lossless round trip and LRU eviction by size"""
+    logger.info("Testing utterance cache store...")
+
+    assert hash_utterance("p", "English", "Hello  world.") == hash_utterance("p", "English", " Hello world. ")
+    assert hash_utterance("p", "English", "Hello.") != hash_utterance("p", "French", "Hello.")
+    assert hash_utterance("p", "English", "Hello.", params={"model": "a"}) != hash_utterance("p", "English", "Hello.", params={"model": "b"})
+    assert hash_utterance("p", "English", "Hello.", seed=1) != hash_utterance("p", "English", "Hello.", seed=2)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio = np.random.default_rng(0).uniform(-1, 1, 24000).astype(np.float32)
+        cache = UtteranceCache(tmp_dir, max_bytes=int(3.5 * audio.nbytes))
+        assert cache.get("missing") is None
+        for key in ("a", "b", "c"):
+            cache.put(key, audio, 24000)
+            time.sleep(0.01)
+        loaded, sr = cache.get("a")
+        assert sr == 24000 and np.array_equal(loaded, audio)
+        time.sleep(0.01)
+        # "b" is now the least recently used entry
+        cache.put("d", audio, 24000)
+        assert "b" not in cache and "a" in cache and "d" in cache
+        assert cache.stats()["evictions"] >= 1
+        assert UtteranceCache(tmp_dir).stats()["bytes"] == cache.stats()["bytes"]
+
+        # Overwriting an entry replaces its size instead of adding to it
+        cache.put("a", audio[:2400], 24000)
+        assert cache.stats()["bytes"] == UtteranceCache(tmp_dir).stats()["bytes"]
+    logger.info("PASS: Utterance cache store test passed")
+
+    return True
+
+
+def test_rerender_only_generates_changed_lines():
+    """Test an edited script re-render splices cached chunks and only generates the changed line"""
+    logger.info("Testing incremental re-rendering...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+        tts.voice_clone_model = FakeCloneModel()
+        tts.voice_design_model = object()
+        tts.utterance_cache = UtteranceCache(tmp_dir)
+
+        lines = [f"[SPEAKER{i % 2}]This is line number {i}.\n" for i in range(20)]
+        report = {}
+        first, sr = tts.render_voice_clone(lines, SPEAKERS, ArraySink(), report=report)
+        assert len(tts.voice_clone_model.generated) == 20
+        assert report["utterance_cache"]["hits"] == 0 and report["utterance_cache"]["misses"] == 20
+
+        lines[7] = "[SPEAKER1]This line was edited.\n"
+        tts.voice_clone_model.generated = []
+        report = {}
+        second, sr = tts.render_voice_clone(lines, SPEAKERS, ArraySink(), speed=1.5, report=report)
+        assert tts.voice_clone_model.generated == ["This line was edited."]
+        stats = report["utterance_cache"]
+        assert stats["hits"] == 19 and stats["misses"] == 1 and abs(stats["hit_rate"] - 0.95) < 1e-9
+        assert response_headers(stats)["X-Utterance-Cache-Hits"] == "19"
+
+        # Cached audio is identical to freshly generated audio
+        tts.voice_clone_model.generated = []
+        third, _ = tts.render_voice_clone(lines, SPEAKERS, ArraySink(), speed=1.5)
+        assert tts.voice_clone_model.generated == [] and np.array_equal(second, third)
+    logger.info("PASS: Incremental re-rendering test passed")
+
+    return True
+
+
+def test_cache_key_covers_generation_settings():
+    """Test chunks are rendered again when the clone seed or sampling arguments change"""
+    logger.info("Testing utterance cache generation settings...")
+
+    class KwargsCloneModel(FakeCloneModel):
+        def generate_voice_clone(self, text, language=None, voice_clone_prompt=None, **kwargs):
+            self.kwargs = kwargs
+            return super().generate_voice_clone(text, language=language, voice_clone_prompt=voice_clone_prompt)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+        tts.voice_clone_model = KwargsCloneModel()
+        tts.voice_design_model = object()
+        tts.utterance_cache = UtteranceCache(tmp_dir)
+        script = "[SPEAKER0]Hello there."
+
+        tts.render_voice_clone(script, SPEAKERS, ArraySink())
+        tts.clone_seed = 7
+        tts.render_voice_clone(script, SPEAKERS, ArraySink())
+        tts.clone_generate_kwargs = {"temperature": 0.5}
+        tts.render_voice_clone(script, SPEAKERS, ArraySink())
+        assert len(tts.voice_clone_model.generated) == 3 and tts.voice_clone_model.kwargs == {"temperature": 0.5}
+        tts.render_voice_clone(script, SPEAKERS, ArraySink())
+        assert len(tts.voice_clone_model.generated) == 3
+    logger.info("PASS: Utterance cache generation settings test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting utterance cache tests...\n")
+
+    tests = [
+        test_cache_store_and_evict,
+        test_rerender_only_generates_changed_lines,
+        test_cache_key_covers_generation_settings,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
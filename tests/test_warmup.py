@@ -0,0 +1,152 @@
+import sys
+import os
+import json
+import tempfile
+import logging
+import numpy as np
+import soundfile as sf
+
+# Add project root directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import Qwen3TTSInnoFrance
+from app.warmup import DISABLED, FAILED, READY, Warmup
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FakeModel:
+    """Records generation calls and renders silence"""
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_voice_design(self, text, language=None, instruct=None):
+        self.calls.append("design")
+        return [np.zeros(2400, dtype=np.float32) for _ in text], 24000
+
+    def create_voice_clone_prompt(self, ref_audio, ref_text=None, x_vector_only_mode=False):
+        self.calls.append("prompt")
+        return [ref_text]
+
+    def generate_voice_clone(self, text, language=None, voice_clone_prompt=None):
+        self.calls.append("clone")
+        return [np.zeros(100, dtype=np.float32) for _ in text], 24000
+
+
+def _make_engine():
+    tts = Qwen3TTSInnoFrance(device="cpu", lazy_load=True)
+    tts.models.register("design", FakeModel)
+    tts.models.register("clone", FakeModel)
+    return tts
+
+
+def test_warmup_loads_and_exercises_models():
+    """Test the warmup loads each model, runs design and clone once and pre-builds voice prompts"""
+    logger.info("Testing warmup...")
+
+    tts = _make_engine()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ref_path = os.path.join(tmp_dir, "narrator.wav")
+        sf.write(ref_path, np.full(2400, 0.1, dtype=np.float32), 24000)
+        voices_path = os.path.join(tmp_dir, "voices.json")
+        with open(voices_path, "w", encoding="utf-8") as f:
+            json.dump([{"ref_audio": ref_path, "ref_text": "narrator"}], f)
+        warmup = Warmup(voices_path=voices_path)
+        assert not warmup.ready
+        warmup.start(lambda: tts).join()
+
+    assert warmup.state == READY and warmup.ready and warmup.error is None
+    assert set(warmup.timings) == {"engine", "load_design", "load_clone", "design", "clone_prompt", "clone", "voice_prompts", "total"}
+    assert tts.models.peek("design").calls == ["design"]
+    assert tts.models.peek("clone").calls == ["prompt", "clone", "prompt"]
+    logger.info("PASS: Warmup test passed")
+
+    return True
+
+
+def test_ready_endpoint():
+    """Test /ready returns 503 until the warmup has finished, then reports residency and the inference queue"""
+    logger.info("Testing readiness endpoint...")
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import app.api_fastapi as api_fastapi
+    from app import concurrency, engine_registry
+    from app.concurrency import InferenceLimiter
+
+    app = FastAPI()
+    app.include_router(api_fastapi.router, prefix="/api")
+    client = TestClient(app)
+    saved_warmup, saved_registry, saved_limiter = api_fastapi.warmup, api_fastapi.engine_registry, concurrency._limiter
+    concurrency._limiter = limiter = InferenceLimiter(concurrency=1, max_queue=4)
+    tts = _make_engine()
+    api_fastapi.engine_registry = engine_registry.EngineRegistry(factory=lambda config: tts)
+    api_fastapi.engine_registry.configure("default", device="cpu")
+    try:
+        api_fastapi.warmup = Warmup(models=["clone"])
+        response = client.get("/api/ready")
+        assert response.status_code == 503 and response.json()["warmup"]["state"] == "pending"
+        assert client.get("/api/health").status_code == 200
+
+        api_fastapi.warmup.run(api_fastapi.engine_registry.get())
+        body = client.get("/api/ready").json()
+        assert body["ready"] and body["models"]["clone"]["state"] == "device" and body["models"]["design"]["state"] == "unloaded"
+        assert body["queue_depth"] == 0 and "load_clone" in body["warmup"]["timings"]
+        # Without the design model the clone run warms up on a synthetic reference
+        assert tts.models.peek("clone").calls == ["prompt", "clone"] and "clone" in body["warmup"]["timings"]
+
+        # The depth is the inference queue's, not the clone batch scheduler's
+        limiter._admitted = 3
+        assert client.get("/api/ready").json()["queue_depth"] == 3
+        limiter._admitted = 0
+
+        api_fastapi.warmup = Warmup(enabled=False)
+        assert client.get("/api/ready").json()["warmup"]["state"] == DISABLED
+
+        failing = Warmup()
+        failing.start(lambda: 1 / 0).join()
+        api_fastapi.warmup = failing
+        response = client.get("/api/ready")
+        assert response.status_code == 503 and failing.state == FAILED and "division" in response.json()["warmup"]["error"]
+    finally:
+        api_fastapi.warmup, api_fastapi.engine_registry, concurrency._limiter = saved_warmup, saved_registry, saved_limiter
+    logger.info("PASS: Readiness endpoint test passed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    logger.info("Starting warmup tests...\n")
+
+    tests = [
+        test_warmup_loads_and_exercises_models,
+        test_ready_endpoint,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            logger.error(f"FAIL: Test failed: {e}\n")
+
+    logger.info(f"\nTest completion: {passed}/{total} tests passed")
+
+    if passed == total:
+        logger.info("All tests passed!")
+        return True
+    else:
+        logger.info("Some tests failed!")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)